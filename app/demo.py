@@ -2,27 +2,31 @@ import streamlit as st
 import pandas as pd
 from streamlit_autorefresh import st_autorefresh
 
+from financial_fraud.serving.champion import ChampionHolder
 from financial_fraud.serving.startup import (
-    load_champion_model,
     connect_feature_store,
     register_lua_scripts,
 )
 from financial_fraud.config import ONLINE_TRANSACTIONS, REPO_ID, REVISION, TRANSACTION_LOG
 from financial_fraud.io.hf import download_dataset_hf
-from financial_fraud.serving.steps.explain import top_factor_explainer
+from financial_fraud.stream.step_order import declares_step_order
 from financial_fraud.stream.stream import TxnStream
 from financial_fraud.serving.serve import serve
-from financial_fraud.stream.build_log import local_log
+from financial_fraud.stream.build_log import explain_log_row, local_log
 from financial_fraud.serving.warm_start import warm_start
 from financial_fraud.serving.warm_up_start_step import compute_start_step
+from financial_fraud.redis.sweep import IdleDestSweeper
 import json
 import time
+from functools import partial
 from pathlib import Path
 
 
 @st.cache_resource
-def get_model_and_ptr():
-    return load_champion_model()
+def get_champion():
+    # One holder per server: it swaps in a newly promoted champion in the background, and every
+    # rerun picks up whatever is current.
+    return ChampionHolder(fast_path=True, explain=True).start()
 
 
 @st.cache_resource
@@ -37,11 +41,9 @@ def get_lua_shas():
 
 
 @st.cache_resource
-def get_explainer_bundle(_model, model_run_id: str):
-    try:
-        return top_factor_explainer(_model)
-    except Exception:
-        return None
+def get_sweeper():
+    r, cfg = get_redis()
+    return IdleDestSweeper(r, cfg=cfg, lua_shas=get_lua_shas())
 
 
 @st.cache_data
@@ -81,7 +83,7 @@ def ensure_warm_started(*, r, cfg, lua_shas, warm_parquet_path: str, k: int = 48
     register_lua_scripts(r)
 
     start_step = compute_start_step(str(warm_parquet_path), k=k)
-    warm_start(r=r, cfg=cfg, lua_shas=lua_shas, start_step=start_step)
+    warm_start(r=r, cfg=cfg, lua_shas=lua_shas, start_step=start_step, mode="bulk")
 
     st.session_state[cache_key] = True
     st.session_state["warm_start_step"] = int(start_step)
@@ -96,6 +98,8 @@ def get_stream(parquet_path: str, start_step: int | None, batch_size: int) -> Tx
             parquet_path=parquet_path,
             start_step=start_step,
             batch_size=batch_size,
+            # Files written before data_setup recorded step order fall back to the sorted stream.
+            presorted=declares_step_order(parquet_path),
         )
     return st.session_state["stream"]
 
@@ -115,6 +119,8 @@ def handle_transaction(*, stream: TxnStream, deps) -> None:
         threshold=deps["threshold"],
         explainer_bundle=deps["explainer_bundle"],
         lua_shas=deps["lua_shas"],
+        # With an AsyncExplainer the logged row says "pending" until this fills it in.
+        on_explained=partial(explain_log_row, st.session_state["log_rows"]),
     )
 
     if result is None:
@@ -124,6 +130,11 @@ def handle_transaction(*, stream: TxnStream, deps) -> None:
     out, log = result
     st.session_state["last_out"] = out
     st.session_state["log_rows"] = local_log(st.session_state["log_rows"], log, max_len=200)
+    # The explanation may have landed before the row was logged.
+    explain_log_row(st.session_state["log_rows"], out)
+
+    if stream.last_step is not None:
+        get_sweeper().tick(stream.last_step)
 
 
 def main():
@@ -133,9 +144,8 @@ def main():
     st.session_state.setdefault("last_out", None)
     st.session_state.setdefault("is_streaming", False)
 
-    model, champ_ptr, threshold = get_model_and_ptr()
-    run_id = str(champ_ptr.get("run_id", champ_ptr.get("path_in_repo", "unknown")))
-    explainer_bundle = get_explainer_bundle(model, run_id)
+    champion = get_champion().current
+    st.caption(f"Champion: {champion.run_id}")
 
     r, cfg = get_redis()
     lua_shas = get_lua_shas()
@@ -190,12 +200,12 @@ def main():
     stream = get_stream(logs_path, start_step=stream_start_step, batch_size=batch_size)
 
     deps = {
-        "model": model,
-        "threshold": threshold,
+        "model": champion.model,
+        "threshold": champion.threshold,
         "r": r,
         "cfg": cfg,
         "lua_shas": lua_shas,
-        "explainer_bundle": explainer_bundle,
+        "explainer_bundle": champion.explainer_bundle,
     }
 
     c1, c2 = st.columns(2)
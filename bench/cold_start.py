@@ -0,0 +1,210 @@
+"""Cold start of a serving process: import time of the serving entry modules and time to first score.
+
+Every run is a fresh interpreter, timed from spawn: boot (interpreter + site), import of the serving
+modules, model load (the champion, a local joblib file, or a run memory-mapped from the artifact
+cache), Redis connect + script registration, explainer, the first serve() and a second one for
+comparison. The import stage must stay within --import-budget-ms and must not load the
+modules that are only needed on other paths (shap, duckdb, huggingface_hub, and sklearn until a
+pipeline is unpickled); the exit code is 1 when either fails.
+"""
+
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import time
+from dataclasses import replace
+from time import perf_counter
+
+SERVING_MODULES = (
+    "financial_fraud.serving.startup",
+    "financial_fraud.serving.serve",
+    "financial_fraud.serving.service",
+)
+LAZY_MODULES = ("shap", "duckdb", "huggingface_hub", "sklearn")
+STAGES = ("boot", "import", "model", "redis", "explainer", "first_score")
+
+
+def _child(
+    spawned_at: float,
+    *,
+    model_path: str | None,
+    cache_run: str | None,
+    cache_dir: str | None,
+    db: int,
+    explain: bool,
+    explain_async: bool,
+) -> dict:
+    """Runs in the fresh interpreter; the transactions arrive as JSON on stdin."""
+    ms: dict[str, float] = {"boot": (time.time() - spawned_at) * 1e3}
+    txs = json.loads(sys.stdin.read())
+
+    t = perf_counter()
+    for name in SERVING_MODULES:
+        importlib.import_module(name)
+    ms["import"] = (perf_counter() - t) * 1e3
+    loaded_at_import = [m for m in LAZY_MODULES if m in sys.modules]
+
+    from financial_fraud.redis.connect import redis_config
+    from financial_fraud.redis.store import FeatureStore
+    from financial_fraud.serving.serve import serve
+    from financial_fraud.serving.startup import (
+        load_cached_model, load_champion_model, load_model_file, register_lua_scripts,
+    )
+
+    t = perf_counter()
+    if cache_run:
+        from financial_fraud.io.artifact_cache import ArtifactCache
+
+        cache = ArtifactCache(cache_dir) if cache_dir else None
+        model, threshold = load_cached_model(cache_run, fast_path=True, cache=cache)
+    elif model_path:
+        model, threshold = load_model_file(model_path)
+    else:
+        model, _, threshold = load_champion_model(fast_path=True)
+    ms["model"] = (perf_counter() - t) * 1e3
+
+    t = perf_counter()
+    cfg = replace(redis_config(), db=db)
+    store = FeatureStore(cfg)
+    lua_shas = register_lua_scripts(store)
+    ms["redis"] = (perf_counter() - t) * 1e3
+
+    t = perf_counter()
+    explainer_bundle = None
+    if explain:
+        from financial_fraud.serving.steps.explain import top_factor_explainer
+
+        if explain_async:
+            from financial_fraud.serving.explain_worker import AsyncExplainer
+
+            explainer_bundle = AsyncExplainer(lambda: top_factor_explainer(model))
+        else:
+            explainer_bundle = top_factor_explainer(model)
+    ms["explainer"] = (perf_counter() - t) * 1e3
+
+    kwargs = dict(r=store, cfg=cfg, model=model, threshold=threshold, explainer_bundle=explainer_bundle, lua_shas=lua_shas)
+    t = perf_counter()
+    serve(txs[0], **kwargs)
+    ms["first_score"] = (perf_counter() - t) * 1e3
+    ms["time_to_first_score"] = (time.time() - spawned_at) * 1e3
+
+    t = perf_counter()
+    for tx in txs[1:]:
+        serve(tx, **kwargs)
+    ms["next_score"] = (perf_counter() - t) * 1e3 / max(len(txs) - 1, 1)
+    if explain and explain_async:
+        explainer_bundle.close()
+
+    return {"ms": ms, "loaded_at_import": loaded_at_import, "loaded_at_end": [m for m in LAZY_MODULES if m in sys.modules]}
+
+
+def _spawn(
+    txs: list[dict],
+    *,
+    model_path: str | None,
+    cache_run: str | None,
+    cache_dir: str | None,
+    db: int,
+    explain: bool,
+    explain_async: bool,
+) -> dict:
+    cmd = [sys.executable, __file__, "--db", str(db)]
+    for flag, value in (("--model-path", model_path), ("--cache-run", cache_run), ("--cache-dir", cache_dir)):
+        if value:
+            cmd += [flag, value]
+    if explain:
+        cmd.append("--explain")
+    if explain_async:
+        cmd.append("--explain-async")
+    cmd += ["--child", repr(time.time())]
+    proc = subprocess.run(cmd, input=json.dumps(txs, default=str), capture_output=True, text=True, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"cold start run failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _median(values: list[float]) -> float:
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--model-path", default=None, help="Local joblib model/artifact instead of the champion.")
+    p.add_argument("--cache-run", default=None, help="Load this run from the local artifact cache (mmap, no network).")
+    p.add_argument("--cache-dir", default=None, help="Artifact cache root (defaults to ARTIFACT_CACHE_DIR).")
+    p.add_argument("--parquet", default=None, help="Transactions to score (defaults to the online transactions).")
+    p.add_argument("--scores", type=int, default=20, help="serve() calls per run; the first is the cold one.")
+    p.add_argument("--explain", action="store_true", help="Also build the top-factor explainer before scoring.")
+    p.add_argument("--explain-async", action="store_true", help="With --explain: build it on an AsyncExplainer's thread instead.")
+    p.add_argument("--db", type=int, default=None, help="Redis db (defaults to BENCH_DB).")
+    p.add_argument("--import-budget-ms", type=float, default=1000.0)
+    p.add_argument("--json", default=None, help="Write the per-run timings and medians to this path.")
+    args = p.parse_args()
+
+    if args.child is not None:
+        result = _child(
+            float(args.child),
+            model_path=args.model_path,
+            cache_run=args.cache_run,
+            cache_dir=args.cache_dir,
+            db=args.db,
+            explain=args.explain,
+            explain_async=args.explain_async,
+        )
+        print(json.dumps(result))
+        return
+
+    from financial_fraud.config import BENCH_DB, ONLINE_TRANSACTIONS, REPO_ID, REVISION
+    from financial_fraud.io.hf import download_dataset_hf
+    from financial_fraud.stream.stream import TxnStream
+
+    parquet_path = args.parquet or download_dataset_hf(repo_id=REPO_ID, filename=ONLINE_TRANSACTIONS, revision=REVISION)
+    stream = TxnStream(parquet_path=str(parquet_path))
+    txs: list[dict] = []
+    while len(txs) < max(1, args.scores) and (tx := stream.next_one()) is not None:
+        txs.append(tx)
+
+    db = BENCH_DB if args.db is None else args.db
+    runs = [
+        _spawn(
+            txs,
+            db=db,
+            model_path=args.model_path,
+            cache_run=args.cache_run,
+            cache_dir=args.cache_dir,
+            explain=args.explain,
+            explain_async=args.explain_async,
+        )
+        for _ in range(args.runs)
+    ]
+
+    keys = STAGES + ("time_to_first_score", "next_score")
+    medians = {k: _median([r["ms"][k] for r in runs]) for k in keys}
+    for i, r in enumerate(runs):
+        print(f"run {i}: " + " ".join(f"{k}={r['ms'][k]:.0f}ms" for k in keys))
+    print("median: " + " ".join(f"{k}={v:.1f}ms" for k, v in medians.items()))
+
+    loaded = sorted({m for r in runs for m in r["loaded_at_import"]})
+    print(f"loaded by the serving imports: {loaded or 'none of ' + ', '.join(LAZY_MODULES)}")
+    print(f"loaded by the end of the run: {runs[-1]['loaded_at_end']}")
+
+    ok = medians["import"] <= args.import_budget_ms and not loaded
+    print(
+        f"Cold start passed: import {medians['import']:.0f}ms within {args.import_budget_ms:.0f}ms budget"
+        if ok
+        else f"Cold start FAILED: import {medians['import']:.0f}ms (budget {args.import_budget_ms:.0f}ms), loaded {loaded}"
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "median_ms": medians, "import_budget_ms": args.import_budget_ms}, f, indent=2)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Memory per dest entity for the v1 hash, v2 hash and packed layouts."""
+
+import argparse
+import random
+from dataclasses import replace
+
+from financial_fraud.config import BENCH_DB
+from financial_fraud.redis.connect import connect_redis, redis_config
+from financial_fraud.serving.warm_start_bulk import DestRing, PackedDestRing
+
+
+def _history(rng: random.Random, *, N: int, n_tx: int) -> list[tuple[int, float]]:
+    step = rng.randint(0, 500)
+    out = []
+    for _ in range(n_tx):
+        step += rng.choice([0, 0, 1, 1, 2, 3, 5, 10, N])
+        out.append((step, round(rng.uniform(0, 2e5), 2)))
+    return out
+
+
+def _fold(ring_cls, history: list[tuple[int, float]], *, N: int):
+    ring = ring_cls(N=N, step=history[0][0])
+    for step, amount in history:
+        ring.advance(step)
+        ring.add(amount)
+    return ring
+
+
+def _v1_state(ring: DestRing) -> dict[str, str]:
+    m, L = ring.m, ring.last_seen
+    state = {
+        "dest_schema_N": str(ring.N),
+        "dest_last_seen_step": str(L),
+        "dest_cnt_cur": str(ring.cnt[L % m]),
+        "dest_sum_cur": ring.sums[L % m],
+    }
+    for i in range(1, ring.N + 1):
+        state[f"dest_cnt_b{i}"] = str(ring.cnt[(L - i) % m])
+        state[f"dest_sum_b{i}"] = ring.sums[(L - i) % m]
+    return state
+
+
+def _measure(r, prefix: str, writes, *, sample: int = 200) -> tuple[float, float, str]:
+    r.flushdb()
+    before = r.info("memory")["used_memory"]
+    pipe = r.pipeline(transaction=False)
+    for i, write in enumerate(writes):
+        write(pipe, f"{prefix}dest:M{i:09d}")
+        if i % 5_000 == 4_999:
+            pipe.execute()
+    pipe.execute()
+    n = len(writes)
+    per_key = (r.info("memory")["used_memory"] - before) / n
+
+    keys = [f"{prefix}dest:M{i:09d}" for i in range(0, n, max(1, n // sample))]
+    usage = sum(r.memory_usage(k) for k in keys) / len(keys)
+    encoding = r.object("encoding", keys[0])
+    r.flushdb()
+    return per_key, usage, encoding
+
+
+def main(*, n_dests: int = 20_000, Ns: tuple[int, ...] = (24, 48), n_tx: int = 30, seed: int = 0) -> None:
+    cfg = replace(redis_config(), db=BENCH_DB)
+    r = connect_redis(cfg)
+    info = r.info("server")
+    print(f"redis {info['redis_version']} db={BENCH_DB} dests={n_dests} tx_per_dest={n_tx}")
+    print(f"{'N':>4} {'layout':>8} {'encoding':>10} {'used_memory/key':>16} {'MEMORY USAGE':>13}")
+
+    for N in Ns:
+        rng = random.Random(seed)
+        histories = [_history(rng, N=N, n_tx=n_tx) for _ in range(n_dests)]
+        hash_rings = [_fold(DestRing, h, N=N) for h in histories]
+        packed_rings = [_fold(PackedDestRing, h, N=N) for h in histories]
+
+        layouts = {
+            "v1 hash": [lambda p, k, s=_v1_state(ring): p.hset(k, mapping=s) for ring in hash_rings],
+            "v2 hash": [lambda p, k, s=ring.state(): p.hset(k, mapping=s) for ring in hash_rings],
+            "packed": [lambda p, k, s=ring.state(): p.set(k, s) for ring in packed_rings],
+        }
+        for name, writes in layouts.items():
+            per_key, usage, encoding = _measure(r, cfg.live_prefix, writes)
+            print(f"{N:>4} {name:>8} {encoding:>10} {per_key:>16.0f} {usage:>13.0f}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--dests", type=int, default=20_000)
+    p.add_argument("--N", type=int, nargs="+", default=[24, 48])
+    p.add_argument("--tx-per-dest", type=int, default=30)
+    args = p.parse_args()
+    main(n_dests=args.dests, Ns=tuple(args.N), n_tx=args.tx_per_dest)
@@ -0,0 +1,315 @@
+"""Replay online transactions through serve() at a controlled rate; report latency percentiles and throughput.
+
+Open loop: every transaction gets an intended send time from --tps or --time-scale and its latency
+is measured from that time, so a slow reply cannot hold back the schedule and hide queueing.
+--max sends as fast as the lanes drain and reports service time instead. Transactions are spread
+over --lanes threads by destination, so every dest still sees its transactions in stream order.
+--hot-reload serves from a ChampionHolder: repoint champion.json mid-run and the per-window
+percentiles show what the background load and the swap cost. --shadow RUN_ID... scores cached
+candidate runs in shadow on the same feature rows (ShadowScorer) and writes their side log under
+--shadow-log; compare the percentiles with and without it at the same --tps.
+"""
+
+import argparse
+import json
+import queue
+import threading
+from dataclasses import replace
+from pathlib import Path
+from time import perf_counter, sleep
+
+import numpy as np
+
+from financial_fraud.config import BENCH_DB, ONLINE_TRANSACTIONS, REPO_ID, REVISION, SHADOW_LOG_DIR
+from financial_fraud.io.hf import download_dataset_hf
+from financial_fraud.redis.connect import redis_config
+from financial_fraud.redis.store import FeatureStore
+from financial_fraud.serving.dispatch import dest_partition
+from financial_fraud.serving.champion import ChampionHolder
+from financial_fraud.serving.serve import serve
+from financial_fraud.serving.shadow import ShadowScorer
+from financial_fraud.serving.startup import champion_run_id, load_champion_model, load_model_file, register_lua_scripts
+from financial_fraud.serving.explain_worker import AsyncExplainer
+from financial_fraud.serving.steps.explain import top_factor_explainer
+from financial_fraud.serving.timing import StageTimer
+from financial_fraud.stream.stream import TxnStream
+
+PERCENTILES = (50, 95, 99, 99.9)
+STEP_SECONDS = 3600  # one step of the transaction log is one hour
+
+
+def _schedule(stream: TxnStream, *, tps: float | None, time_scale: float | None, limit: int | None):
+    """Yield (intended offset in seconds or None for --max, tx) in stream order."""
+    first_step = None
+    offset = 0.0
+    i = 0
+    while limit is None or i < limit:
+        tx = stream.next_one()
+        if tx is None:
+            return
+        if tps:
+            offset = i / tps
+        elif time_scale:
+            step = tx.get("step")
+            if step is not None:
+                first_step = step if first_step is None else first_step
+                offset = (step - first_step) * STEP_SECONDS / time_scale
+        yield (offset if tps or time_scale else None), tx
+        i += 1
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: list[float] = []
+        self.window: list[float] = []
+        self.skipped = 0
+        self.errors = 0
+        self.champions: dict[str, int] = {}
+
+    def add(self, seconds: float, *, skipped: bool, run_id: str | None = None) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+            self.window.append(seconds)
+            self.skipped += skipped
+            if run_id is not None:
+                self.champions[run_id] = self.champions.get(run_id, 0) + 1
+
+    def error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def take_window(self) -> list[float]:
+        with self._lock:
+            window, self.window = self.window, []
+        return window
+
+
+def _lane(inbox: queue.Queue, *, rec: _Recorder, serve_kwargs: dict, holder: ChampionHolder | None = None) -> None:
+    while (item := inbox.get()) is not None:
+        due, tx = item
+        start = perf_counter()
+        kwargs, run_id = serve_kwargs, None
+        if holder is not None:
+            # One snapshot per transaction: a swap lands between transactions, never inside one.
+            champ = holder.current
+            run_id = champ.run_id
+            kwargs = {
+                **serve_kwargs,
+                "model": champ.model,
+                "threshold": serve_kwargs.get("threshold", champ.threshold),
+                "explainer_bundle": champ.explainer_bundle,
+            }
+        try:
+            result = serve(tx, **kwargs)
+        except Exception:
+            rec.error()
+            continue
+        rec.add(perf_counter() - (start if due is None else due), skipped=result is None, run_id=run_id)
+
+
+def _percentiles_ms(latencies: list[float]) -> dict[str, float]:
+    if not latencies:
+        return {f"p{p:g}": float("nan") for p in PERCENTILES}
+    values = np.percentile(np.asarray(latencies), PERCENTILES) * 1e3
+    return {f"p{p:g}": float(v) for p, v in zip(PERCENTILES, values)}
+
+
+def _fmt(pcts: dict[str, float]) -> str:
+    return " ".join(f"{k}={v:.2f}ms" for k, v in pcts.items())
+
+
+def run(
+    *,
+    parquet_path: str,
+    serve_kwargs: dict,
+    lanes: int = 8,
+    tps: float | None = None,
+    time_scale: float | None = None,
+    limit: int | None = None,
+    duration: float | None = None,
+    start_step: int | None = None,
+    report_every: float = 5.0,
+    holder: ChampionHolder | None = None,
+) -> dict:
+    stream = TxnStream(parquet_path=parquet_path, start_step=start_step)
+    rec = _Recorder()
+    open_loop = bool(tps or time_scale)
+    # Open loop never blocks the scheduler; --max bounds the lanes so the file is not read ahead.
+    inboxes = [queue.Queue(maxsize=0 if open_loop else 256) for _ in range(lanes)]
+    threads = [
+        threading.Thread(target=_lane, args=(q,), kwargs={"rec": rec, "serve_kwargs": serve_kwargs, "holder": holder}, daemon=True)
+        for q in inboxes
+    ]
+    for t in threads:
+        t.start()
+
+    sent = 0
+    t0 = perf_counter()
+    next_report = t0 + report_every
+    for offset, tx in _schedule(stream, tps=tps, time_scale=time_scale, limit=limit):
+        due = None
+        if offset is not None:
+            due = t0 + offset
+            delay = due - perf_counter()
+            if delay > 0:
+                sleep(delay)
+        now = perf_counter()
+        if duration is not None and now - t0 >= duration:
+            break
+        inboxes[dest_partition(tx.get("nameDest"), lanes)].put((due, tx))
+        sent += 1
+
+        if now >= next_report:
+            window = rec.take_window()
+            backlog = sum(q.qsize() for q in inboxes)
+            print(
+                f"[{now - t0:7.1f}s] sent={sent} done={len(rec.latencies)} "
+                f"tps={len(window) / report_every:.0f} backlog={backlog} {_fmt(_percentiles_ms(window))}"
+                + (f" champion={holder.current.run_id}" if holder is not None else ""),
+                flush=True,
+            )
+            next_report += report_every
+
+    for q in inboxes:
+        q.put(None)
+    for t in threads:
+        t.join()
+    seconds = perf_counter() - t0
+
+    return {
+        "mode": "max" if not open_loop else ("tps" if tps else "time_scale"),
+        "target_tps": tps,
+        "time_scale": time_scale,
+        "lanes": lanes,
+        "sent": sent,
+        "completed": len(rec.latencies),
+        "skipped_invalid": rec.skipped,
+        "errors": rec.errors,
+        "seconds": seconds,
+        "achieved_tps": len(rec.latencies) / seconds if seconds > 0 else 0.0,
+        "latency_ms": {**_percentiles_ms(rec.latencies), "max": 1e3 * max(rec.latencies, default=float("nan"))},
+        "latency_from": "intended send time" if open_loop else "dispatch (service time)",
+        "champions": rec.champions,
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    rate = p.add_mutually_exclusive_group(required=True)
+    rate.add_argument("--tps", type=float, help="Target transactions per second.")
+    rate.add_argument("--time-scale", type=float, help="Replay step times, compressed by this factor (3600: one step per second).")
+    rate.add_argument("--max", action="store_true", help="As fast as possible; reports service time.")
+    p.add_argument("--parquet", default=None, help=f"Defaults to {ONLINE_TRANSACTIONS} from the dataset repo.")
+    p.add_argument("--start-step", type=int, default=None)
+    p.add_argument("--limit", type=int, default=None, help="Stop after this many transactions.")
+    p.add_argument("--duration", type=float, default=None, help="Stop sending after this many seconds.")
+    p.add_argument("--lanes", type=int, default=8, help="Serving threads; each dest is pinned to one.")
+    p.add_argument("--model-path", default=None, help="Local joblib model/artifact instead of the champion.")
+    p.add_argument("--hot-reload", action="store_true", help="Serve from a ChampionHolder that swaps in a newly promoted champion.")
+    p.add_argument("--pointer", default=None, help="With --hot-reload: watch this local champion.json instead of the registry's.")
+    p.add_argument("--poll-s", type=float, default=5.0, help="With --hot-reload: seconds between champion pointer checks.")
+    p.add_argument("--threshold", type=float, default=None, help="Override the model threshold.")
+    p.add_argument("--explain", action="store_true", help="Compute SHAP explanations for flagged transactions.")
+    p.add_argument("--explain-async", action="store_true", help="With --explain: batch them on a background thread (AsyncExplainer).")
+    p.add_argument("--shadow", nargs="+", default=None, metavar="RUN_ID", help="Also score these cached runs in shadow (ShadowScorer).")
+    p.add_argument("--shadow-log", default=SHADOW_LOG_DIR, help="With --shadow: directory for the Parquet side log.")
+    p.add_argument("--db", type=int, default=BENCH_DB)
+    p.add_argument("--flush", action="store_true", help="FLUSHDB the target db first.")
+    p.add_argument("--report-every", type=float, default=5.0)
+    p.add_argument("--stages", action="store_true", help="Time each serve() stage and report its percentiles.")
+    p.add_argument("--prometheus", default=None, help="Write the stage histograms in Prometheus text format to this path.")
+    p.add_argument("--json", default=None, help="Write the summary to this path.")
+    args = p.parse_args()
+
+    parquet_path = args.parquet or download_dataset_hf(repo_id=REPO_ID, filename=ONLINE_TRANSACTIONS, revision=REVISION)
+
+    cfg = replace(redis_config(), db=args.db)
+    store = FeatureStore(cfg, max_connections=args.lanes)
+    if args.flush:
+        store.flushdb()
+    serve_kwargs = {"r": store, "cfg": cfg, "lua_shas": register_lua_scripts(store)}
+
+    holder = explainer = shadow = None
+    if args.hot_reload:
+        # Model, threshold and explainer come from the holder's current champion per transaction.
+        holder = ChampionHolder(
+            pointer_path=args.pointer, explain=args.explain, explain_async=args.explain_async, poll_s=args.poll_s
+        ).start()
+        if args.threshold is not None:
+            serve_kwargs["threshold"] = args.threshold
+    else:
+        if args.model_path:
+            model, threshold = load_model_file(args.model_path)
+            run_id = Path(args.model_path).stem
+        else:
+            model, champion_ptr, threshold = load_champion_model(fast_path=True)
+            run_id = champion_run_id(champion_ptr)
+        if args.threshold is not None:
+            threshold = args.threshold
+        serve_kwargs.update(
+            model=model,
+            threshold=threshold,
+            explainer_bundle=top_factor_explainer(model) if args.explain else None,
+        )
+        if args.explain and args.explain_async:
+            explainer = serve_kwargs["explainer_bundle"] = AsyncExplainer(serve_kwargs["explainer_bundle"])
+    if args.shadow:
+        shadow = serve_kwargs["shadow"] = ShadowScorer.from_cache(
+            args.shadow,
+            champion_run_id=(lambda: holder.current.run_id) if holder is not None else run_id,
+            log_dir=args.shadow_log,
+        )
+        print(f"shadow candidates: {shadow.ready()}")
+    timer = StageTimer() if args.stages or args.prometheus else None
+    if timer is not None:
+        serve_kwargs["timer"] = timer
+
+    summary = run(
+        parquet_path=str(parquet_path),
+        serve_kwargs=serve_kwargs,
+        lanes=args.lanes,
+        tps=args.tps,
+        time_scale=args.time_scale,
+        limit=args.limit,
+        duration=args.duration,
+        start_step=args.start_step,
+        report_every=args.report_every,
+        holder=holder,
+    )
+    print(
+        f"{summary['mode']}: sent={summary['sent']} completed={summary['completed']} "
+        f"invalid={summary['skipped_invalid']} errors={summary['errors']} "
+        f"seconds={summary['seconds']:.1f} tps={summary['achieved_tps']:.0f}"
+    )
+    print(f"latency ({summary['latency_from']}): {_fmt(summary['latency_ms'])}")
+    print(f"pool: {store.pool_stats()['total']}")
+    if holder is not None:
+        holder.close()
+        summary["holder"] = holder.stats()
+        print(f"champions: {summary['champions']} holder: {summary['holder']}")
+    if explainer is not None:
+        explainer.close()
+        summary["explainer"] = explainer.stats()
+        print(f"explainer: {summary['explainer']}")
+    if shadow is not None:
+        shadow.close()
+        summary["shadow"] = {**shadow.stats(), "log": str(shadow.log_path)}
+        print(f"shadow: {summary['shadow']}")
+    if timer is not None:
+        summary["stages_ms"] = timer.snapshot()
+        for stage, snap in summary["stages_ms"].items():
+            print(
+                f"  {stage:>9}: n={snap['count']} mean={snap['mean_ms']:.3f}ms "
+                + " ".join(f"{k[:-3]}={v:.3f}ms" for k, v in snap.items() if k.startswith("p"))
+            )
+    if args.prometheus:
+        with open(args.prometheus, "w") as f:
+            f.write(timer.to_prometheus())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,10 @@ Split initial data to simulate transaction history and online transactions.
 """
 
 import pandas as pd
+import pyarrow as pa
 from pathlib import Path
 from financial_fraud.io.hf import download_dataset_hf, upload_dataset_hf
+from financial_fraud.stream.step_order import step_sorting_columns
 
 def main():
     raw = download_dataset_hf(
@@ -29,8 +31,11 @@ def main():
     out_online = Path("data/bronze/online.parquet")
     out_offline.parent.mkdir(parents=True, exist_ok=True)
 
-    offline.to_parquet(out_offline, index=False)
-    online.to_parquet(out_online, index=False)
+    # Rows are in step order; record it so TxnStream(presorted=True) can trust the row groups.
+    # Column indices differ per frame (online has no isFraud), so each uses its own schema.
+    for frame, out in ((offline, out_offline), (online, out_online)):
+        sorting = step_sorting_columns(pa.Schema.from_pandas(frame, preserve_index=False))
+        frame.to_parquet(out, index=False, sorting_columns=sorting)
 
     upload_dataset_hf(
         local_path=out_offline,
@@ -19,6 +19,7 @@ from financial_fraud.modeling.evaluate import evaluate
 from financial_fraud.modeling.gate_broken import gate_broken
 from financial_fraud.modeling.trainers.make_trainer import make_trainer, available_trainers
 from financial_fraud.modeling.bundle.model_artifact import ModelArtifact
+from financial_fraud.modeling.tree_ensemble import export_tree_ensemble, verify_tree_ensemble
 
 from financial_fraud.logging_utils import setup_logging
 
@@ -61,6 +62,12 @@ def parse_args() -> argparse.Namespace:
         help="Run role. Baseline runs are not promotable.",
     )
     p.add_argument("--upload", action="store_true")
+    p.add_argument(
+        "--compress",
+        type=int,
+        default=0,
+        help="joblib compression level for model.joblib; 0 keeps it memory-mappable when serving.",
+    )
     p.add_argument(
         "--log-level",
         default="INFO",
@@ -69,7 +76,7 @@ def parse_args() -> argparse.Namespace:
     return p.parse_args()
 
 
-def main(*, modeltype: str, role: str, upload: bool = False) -> None:
+def main(*, modeltype: str, role: str, upload: bool = False, compress: int = 0) -> None:
     t0 = perf_counter()
     run_id = make_run_id()
 
@@ -176,6 +183,20 @@ def main(*, modeltype: str, role: str, upload: bool = False) -> None:
         threshold=tuned_threshold,
     )
 
+    t_trees = perf_counter()
+    clf = artifact.named_steps["clf"]
+    tree_ensemble = export_tree_ensemble(clf)
+    if tree_ensemble is not None:
+        max_diff = verify_tree_ensemble(tree_ensemble, clf, artifact[:-1].transform(X_hold))
+        log.info(
+            "trees_exported trees=%d nodes=%d max_depth=%d max_abs_diff=%.3g seconds=%.3f",
+            tree_ensemble.n_trees,
+            len(tree_ensemble.feature),
+            tree_ensemble.max_depth,
+            max_diff,
+            perf_counter() - t_trees,
+        )
+
     bundle_dir = ARTIFACT_RUNS_DIR / run_id
     bundle_dir.mkdir(parents=True, exist_ok=True)
 
@@ -201,6 +222,8 @@ def main(*, modeltype: str, role: str, upload: bool = False) -> None:
         threshold=tuned_threshold,
         feature_names=feature_names,
         cfg=cfg,
+        tree_ensemble=tree_ensemble,
+        compress=compress,
     )
     log.info("bundle_written dir=%s seconds=%.3f", bundle_dir, perf_counter() - t_bundle)
 
@@ -221,7 +244,7 @@ if __name__ == "__main__":
     args = parse_args()
     setup_logging(args.log_level)
     try:
-        main(modeltype=args.model_type, role=args.role, upload=args.upload)
+        main(modeltype=args.model_type, role=args.role, upload=args.upload, compress=args.compress)
     except Exception:
         log.exception("train_failed")
         raise
@@ -0,0 +1,110 @@
+"""Check that the fast top-factor attributions pick the same top factor as shap on the holdout."""
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import shap
+
+from financial_fraud.config import REPO_ID, REVISION, TRAIN_DATA
+from financial_fraud.io.hf import download_dataset_hf
+from financial_fraud.modeling.config import GAP_STEPS, TARGET_COL, TRAIN_END_FRAC, TUNE_END_FRAC
+from financial_fraud.modeling.splits import time_split
+from financial_fraud.serving.steps.attribution import fast_attribution
+
+from common import load_model
+
+
+def _shap_values(explainer, X: np.ndarray) -> np.ndarray:
+    sv = explainer.shap_values(X)
+    return np.asarray(sv[1] if isinstance(sv, list) else sv)
+
+
+def main(
+    *,
+    model_path: str | None = None,
+    parquet_path: str | None = None,
+    rows: int = 20_000,
+    seed: int = 0,
+    threshold: float | None = None,
+    min_agreement: float = 0.99,
+) -> bool:
+    model, model_threshold = load_model(model_path)
+    threshold = model_threshold if threshold is None else threshold
+    pipe = getattr(model, "pipeline", model)
+    clf = pipe.named_steps["clf"]
+
+    fast = fast_attribution(model)
+    if fast is None:
+        print(f"Attribution check skipped: {type(clf).__name__} has no fast attribution")
+        return True
+
+    if parquet_path is None:
+        parquet_path = download_dataset_hf(repo_id=REPO_ID, filename=TRAIN_DATA, revision=REVISION)
+    _, _, _, _, X_hold, _ = time_split(
+        pd.read_parquet(parquet_path),
+        target_col=TARGET_COL,
+        train_frac=TRAIN_END_FRAC,
+        tune_frac=TUNE_END_FRAC,
+        gap_steps=GAP_STEPS,
+    )
+    rng = np.random.default_rng(seed)
+    if len(X_hold) > rows:
+        X_hold = X_hold.iloc[np.sort(rng.choice(len(X_hold), size=rows, replace=False))]
+
+    prep = pipe[:-1]
+    X = np.asarray(prep.transform(X_hold), dtype=np.float64)
+    if hasattr(clf, "coef_"):
+        # LinearAttribution's baseline is the all-zero preprocessed row.
+        reference = shap.LinearExplainer(clf, (np.zeros(X.shape[1]), np.eye(X.shape[1])))
+    else:
+        reference = shap.TreeExplainer(clf)
+
+    t0 = perf_counter()
+    got = fast.shap_values(X)
+    fast_s = perf_counter() - t0
+    t0 = perf_counter()
+    expected = _shap_values(reference, X)
+    shap_s = perf_counter() - t0
+
+    diff = float(np.max(np.abs(got - expected))) if len(X) else 0.0
+    same = np.argmax(np.abs(got), axis=1) == np.argmax(np.abs(expected), axis=1)
+    flagged = clf.predict_proba(X)[:, 1] >= threshold if threshold is not None else np.zeros(len(X), dtype=bool)
+    agreement = float(same.mean()) if len(X) else 1.0
+    flagged_agreement = float(same[flagged].mean()) if flagged.any() else None
+
+    print(
+        f"{type(fast).__name__} vs {type(reference).__name__}: rows={len(X)} max_abs_diff={diff:.3g} agreement={agreement:.4f} "
+        f"flagged={int(flagged.sum())} flagged_agreement="
+        + (f"{flagged_agreement:.4f}" if flagged_agreement is not None else "n/a")
+        + f" fast_us_per_row={fast_s / max(len(X), 1) * 1e6:.1f} shap_us_per_row={shap_s / max(len(X), 1) * 1e6:.1f}"
+    )
+
+    ok = agreement >= min_agreement and (flagged_agreement is None or flagged_agreement >= min_agreement)
+    print(
+        f"Attribution check passed: top factor agrees with shap on >= {min_agreement:.0%} of holdout rows"
+        if ok
+        else f"Attribution check FAILED (min_agreement={min_agreement})"
+    )
+    return ok
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--model-path", default=None, help="Local joblib model/artifact instead of the champion.")
+    p.add_argument("--parquet", default=None, help="Local feature table (defaults to the HF train table).")
+    p.add_argument("--rows", type=int, default=20_000, help="Holdout rows to sample.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--threshold", type=float, default=None, help="Override the model threshold for the flagged subset.")
+    p.add_argument("--min-agreement", type=float, default=0.99, help="Ties can flip the top factor; anything lower is a bug.")
+    args = p.parse_args()
+    ok = main(
+        model_path=args.model_path,
+        parquet_path=args.parquet,
+        rows=args.rows,
+        seed=args.seed,
+        threshold=args.threshold,
+        min_agreement=args.min_agreement,
+    )
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,76 @@
+"""Helpers shared by the parity checks: model loading, transaction input, reference serve() and dest state."""
+
+import zlib
+from typing import Any
+
+from redis.client import NEVER_DECODE
+
+from financial_fraud.redis.connect import connect_redis
+from financial_fraud.serving.serve import serve
+from financial_fraud.serving.startup import load_champion_model, load_model_file, register_lua_scripts
+from financial_fraud.stream.stream import TxnStream
+
+
+def load_model(model_path: str | None):
+    """(model, threshold) from a local joblib artifact, or the champion."""
+    if model_path is None:
+        model, _, threshold = load_champion_model(fast_path=True)
+        return model, threshold
+    return load_model_file(model_path)
+
+
+def read_txs(parquet_path: str, *, limit: int, dests: int | None) -> list[dict[str, Any]]:
+    """The first limit transactions in stream order; dests folds nameDest onto that many ids so
+    the same dest shows up many times inside one batch."""
+    stream = TxnStream(parquet_path=parquet_path)
+    txs = []
+    while len(txs) < limit and (tx := stream.next_one()) is not None:
+        if dests and isinstance(tx.get("nameDest"), str):
+            tx["nameDest"] = f"C{zlib.crc32(tx['nameDest'].encode()) % dests}"
+        txs.append(tx)
+    return txs
+
+
+def reference(txs, *, cfg, model, threshold, explainer_bundle) -> tuple[list[dict[str, Any] | None], dict[str, Any]]:
+    """serve() one transaction at a time from an empty store; returns the outs and the final dest state."""
+    r = connect_redis(cfg)
+    r.flushdb()
+    lua_shas = register_lua_scripts(r)
+    outs = []
+    for tx in txs:
+        result = serve(tx, r=r, cfg=cfg, model=model, threshold=threshold, explainer_bundle=explainer_bundle, lua_shas=lua_shas)
+        outs.append(None if result is None else result[0])
+    return outs, dest_hashes(r, cfg)
+
+
+def compare(ref: list, got: list, *, atol: float) -> list[int]:
+    """Positions where got differs from ref: validity, decision, explanation, tx, or proba beyond atol."""
+    bad = []
+    for i, (a, b) in enumerate(zip(ref, got)):
+        if a is None or b is None:
+            same = a is None and b is None
+        else:
+            same = (
+                abs(a["proba"] - b["proba"]) <= atol
+                and a["decision"] == b["decision"]
+                and a["explanation"] == b["explanation"]
+                and a["tx"] == b["tx"]
+            )
+        if not same:
+            bad.append(i)
+    return bad + list(range(min(len(ref), len(got)), max(len(ref), len(got))))
+
+
+def dest_hashes(r, cfg, batch: int = 5_000) -> dict[str, Any]:
+    keys = sorted(r.scan_iter(match=f"{cfg.live_prefix}dest:*", count=batch))
+    out: dict[str, Any] = {}
+    for i in range(0, len(keys), batch):
+        chunk = keys[i:i + batch]
+        pipe = r.pipeline(transaction=False)
+        for k in chunk:
+            if cfg.dest_encoding == "packed":
+                pipe.execute_command("GET", k, **{NEVER_DECODE: True})
+            else:
+                pipe.hgetall(k)
+        out.update(zip(chunk, pipe.execute()))
+    return out
@@ -0,0 +1,98 @@
+"""Check that DestDispatcher (dest-partitioned worker processes) returns what sequential serve() returns, in order."""
+
+import argparse
+from dataclasses import replace
+
+import pyarrow as pa
+
+from financial_fraud.config import ONLINE_TRANSACTIONS, REPO_ID, REVISION, WARM_CHECK_DB
+from financial_fraud.io.hf import download_dataset_hf
+from financial_fraud.redis.connect import connect_redis, parity_redis_config
+from financial_fraud.serving.dispatch import DestDispatcher
+from financial_fraud.serving.steps.explain import top_factor_explainer
+
+from common import compare, dest_hashes, load_model, read_txs, reference
+
+
+def main(
+    *,
+    model_path: str | None = None,
+    parquet_path: str | None = None,
+    limit: int = 5_000,
+    dests: int | None = 200,
+    workers: tuple[int, ...] = (1, 3),
+    chunk: int = 257,
+    explain: bool = False,
+    threshold: float | None = None,
+    atol: float = 1e-9,
+) -> bool:
+    if parquet_path is None:
+        parquet_path = download_dataset_hf(repo_id=REPO_ID, filename=ONLINE_TRANSACTIONS, revision=REVISION)
+    model, model_threshold = load_model(model_path)
+    threshold = model_threshold if threshold is None else threshold
+    txs = read_txs(str(parquet_path), limit=limit, dests=dests)
+
+    ref_cfg = replace(parity_redis_config(), shards=())
+    check_cfg = replace(ref_cfg, db=WARM_CHECK_DB)
+    explainer_bundle = top_factor_explainer(model) if explain else None
+    ref, ref_state = reference(txs, cfg=ref_cfg, model=model, threshold=threshold, explainer_bundle=explainer_bundle)
+
+    # First half row by row through score(), second half as one Arrow table through score_many().
+    half = len(txs) // 2
+    table = pa.Table.from_pylist(txs[half:])
+    ok = True
+    for n in workers:
+        r = connect_redis(check_cfg)
+        r.flushdb()
+        with DestDispatcher(
+            cfg=check_cfg,
+            model=model,
+            threshold=threshold,
+            explain=explain,
+            workers=n,
+            chunk=chunk,
+        ) as dispatcher:
+            scored = list(dispatcher.score(txs[:half]))
+            outs, audit = dispatcher.score_many(table)
+
+        seqs = [seq for seq, _ in scored]
+        bad = compare(ref[:half], [out for _, out in scored], atol=atol)
+        bad += [half + i for i in compare([o for o in ref[half:] if o is not None], outs, atol=atol)]
+        state = dest_hashes(r, check_cfg)
+        state_diff = sum(ref_state[key] != state.get(key) for key in ref_state) + len(state.keys() - ref_state.keys())
+        in_order = seqs == list(range(half)) and len(audit) == len(outs)
+
+        print(
+            f"workers={n}: txs={len(txs)} chunk={chunk} in_order={in_order} "
+            f"differing={len(bad)} dest_state_differing={state_diff}"
+        )
+        if bad:
+            print(f"  differing positions: {bad[:10]}")
+        ok = ok and in_order and not bad and not state_diff
+
+    print(f"Dispatch check passed: outputs and dest state match sequential serve() for workers={list(workers)}" if ok else "Dispatch check FAILED")
+    return ok
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--model-path", default=None, help="Local joblib model/artifact instead of the champion.")
+    p.add_argument("--parquet", default=None, help=f"Defaults to {ONLINE_TRANSACTIONS} from the dataset repo.")
+    p.add_argument("--limit", type=int, default=5_000)
+    p.add_argument("--dests", type=int, default=200, help="Fold dests onto this many ids (0 keeps them).")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 3])
+    p.add_argument("--chunk", type=int, default=257)
+    p.add_argument("--explain", action="store_true", help="Also compare SHAP explanations of flagged transactions.")
+    p.add_argument("--threshold", type=float, default=None, help="Override the model threshold.")
+    args = p.parse_args()
+    ok = main(
+        model_path=args.model_path,
+        parquet_path=args.parquet,
+        limit=args.limit,
+        dests=args.dests or None,
+        workers=tuple(args.workers),
+        chunk=args.chunk,
+        explain=args.explain,
+        threshold=args.threshold,
+    )
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,109 @@
+"""Check the fused ring-buffer scripts (hash and packed) against the v1 advance -> read -> add path.
+
+parity/lua_v1 holds the dest scripts as they were before the ring layout (shift-by-gap buckets).
+Random per-dest step/amount sequences run through every path on the parity db; the features
+returned before each add must agree to within tol (running window sums carry rounding from
+amounts that have left the window, ~1e-9 for 1e7-sized amounts in the packed doubles). Some keys start on v1 and switch to the fused script
+midway, which exercises the lazy v1 -> v2 migration.
+"""
+
+import argparse
+import random
+from dataclasses import replace
+from pathlib import Path
+
+from financial_fraud.redis.connect import connect_redis, parity_redis_config
+from financial_fraud.redis.infra import dest_script, make_entity_key
+from financial_fraud.redis.reader import read_entity
+from financial_fraud.serving.startup import register_lua_scripts
+from financial_fraud.serving.steps.dest_aggregates import dest_aggregates, fused_aggregates
+
+V1_DIR = Path(__file__).parent / "lua_v1"
+PATHS = ("fused_hash", "fused_packed", "split_hash", "migrated")
+GAPS = (0, 0, 0, 1, 1, 2, 3, 5, 10, 23, 24, 25, 40)
+
+
+def _v1_features(r, cfg, v1: dict[str, str], dest_id: str, step: int, amount: float) -> dict[str, float]:
+    key = make_entity_key(cfg.live_prefix, "dest", dest_id)
+    N = int(cfg.dest_bucket_N)
+    r.evalsha(v1["advance"], 1, key, step, N)
+    feats = dest_aggregates(dest_state=read_entity(r, cfg=cfg, dest_id=dest_id), N=N)
+    r.evalsha(v1["add"], 1, key, step, amount, N)
+    return feats
+
+
+def _fused_features(r, cfg, shas: dict[str, str], dest_id: str, step: int, amount: float) -> dict[str, float]:
+    key = make_entity_key(cfg.live_prefix, "dest", dest_id)
+    reply = r.evalsha(shas[dest_script("dest_fused", cfg.dest_encoding)], 1, key, step, amount, int(cfg.dest_bucket_N))
+    return fused_aggregates(reply)
+
+
+def _split_features(r, cfg, shas: dict[str, str], dest_id: str, step: int, amount: float) -> dict[str, float]:
+    key = make_entity_key(cfg.live_prefix, "dest", dest_id)
+    N = int(cfg.dest_bucket_N)
+    r.evalsha(shas["dest_advance"], 1, key, step, N)
+    feats = dest_aggregates(dest_state=read_entity(r, cfg=cfg, dest_id=dest_id), N=N)
+    r.evalsha(shas["dest_add"], 1, key, step, amount, N)
+    return feats
+
+
+def _sequence(rng: random.Random, n: int) -> list[tuple[int, float]]:
+    step = rng.randint(0, 50)
+    out = []
+    for _ in range(n):
+        step += rng.choice(GAPS)
+        amount = round(rng.choice([rng.uniform(0, 100), rng.uniform(0, 1e7), 0.0]), 2)
+        out.append((step, amount))
+    return out
+
+
+def main(*, dests: int = 300, seed: int = 0, tol: float = 1e-6) -> bool:
+    cfg = parity_redis_config()
+    r = connect_redis(cfg)
+    r.flushdb()
+    shas = register_lua_scripts(r)
+    v1 = {name: r.script_load((V1_DIR / f"{name}.lua").read_text(encoding="utf-8")) for name in ("advance", "add")}
+    packed_cfg = replace(cfg, dest_encoding="packed")
+
+    rng = random.Random(seed)
+    ops = 0
+    worst = {p: 0.0 for p in PATHS}
+    mismatches: list[tuple] = []
+    for d in range(dests):
+        seq = _sequence(rng, rng.randint(1, 120))
+        switch = rng.randint(0, len(seq))
+        for i, (step, amount) in enumerate(seq):
+            ref = _v1_features(r, cfg, v1, f"v1:{d}", step, amount)
+            got = {
+                "fused_hash": _fused_features(r, cfg, shas, f"fh:{d}", step, amount),
+                "fused_packed": _fused_features(r, packed_cfg, shas, f"fp:{d}", step, amount),
+                "split_hash": _split_features(r, cfg, shas, f"sh:{d}", step, amount),
+                "migrated": (
+                    _v1_features(r, cfg, v1, f"mg:{d}", step, amount) if i < switch
+                    else _fused_features(r, cfg, shas, f"mg:{d}", step, amount)
+                ),
+            }
+            ops += 1
+            for path, feats in got.items():
+                for f, expected in ref.items():
+                    err = abs(feats[f] - expected)
+                    worst[path] = max(worst[path], err)
+                    if err > tol:
+                        mismatches.append((path, d, i, step, f, expected, feats[f]))
+
+    print(f"{ops} transactions over {dests} dests; max abs diff vs v1: " + " ".join(f"{p}={worst[p]:.3g}" for p in PATHS))
+    if mismatches:
+        print(f"Ring check FAILED: {len(mismatches)} mismatches (first 20):")
+        for m in mismatches[:20]:
+            print(m)
+        return False
+    print("Ring check passed: fused hash/packed, split and migrated paths match v1")
+    return True
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--dests", type=int, default=300)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    raise SystemExit(0 if main(dests=args.dests, seed=args.seed) else 1)
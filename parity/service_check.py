@@ -0,0 +1,111 @@
+"""Check that ScoringService (micro-batched, concurrent callers) returns what sequential serve() returns."""
+
+import argparse
+import asyncio
+import random
+from dataclasses import replace
+
+from financial_fraud.config import ONLINE_TRANSACTIONS, REPO_ID, REVISION, WARM_CHECK_DB
+from financial_fraud.io.hf import download_dataset_hf
+from financial_fraud.redis.connect import connect_redis, parity_redis_config
+from financial_fraud.serving.service import ScoringService
+from financial_fraud.serving.steps.explain import top_factor_explainer
+
+from common import compare, dest_hashes, load_model, read_txs, reference
+
+
+async def _run_service(txs, *, cfg, model, threshold, explainer_bundle, max_batch: int, seed: int):
+    """Submit every transaction as its own concurrent request, in stream order, in bursts of random
+    size and spacing; the store's scripts are flushed halfway through."""
+    r = connect_redis(cfg)
+    r.flushdb()
+    rng = random.Random(seed)
+    async with ScoringService(
+        cfg=cfg,
+        model=model,
+        threshold=threshold,
+        explainer_bundle=explainer_bundle,
+        max_batch=max_batch,
+        max_wait_ms=1.0,
+    ) as svc:
+        tasks = []
+        flushed = False
+        i = 0
+        while i < len(txs):
+            burst = rng.choice((1, 3, max_batch // 2, max_batch, 3 * max_batch))
+            tasks.extend(asyncio.create_task(svc.score(tx)) for tx in txs[i:i + burst])
+            i += burst
+            if not flushed and i >= len(txs) // 2:
+                r.script_flush()
+                flushed = True
+            await asyncio.sleep(rng.choice((0.0, 0.0005, 0.003)))
+        outs = await asyncio.gather(*tasks)
+        stats = {"batches": svc.batches, "script_reloads": svc.script_reloads}
+    return list(outs), dest_hashes(r, cfg), stats
+
+
+def main(
+    *,
+    model_path: str | None = None,
+    parquet_path: str | None = None,
+    limit: int = 5_000,
+    dests: int | None = 200,
+    max_batch: int = 64,
+    explain: bool = False,
+    threshold: float | None = None,
+    seed: int = 0,
+    atol: float = 1e-9,
+) -> bool:
+    if parquet_path is None:
+        parquet_path = download_dataset_hf(repo_id=REPO_ID, filename=ONLINE_TRANSACTIONS, revision=REVISION)
+    model, model_threshold = load_model(model_path)
+    threshold = model_threshold if threshold is None else threshold
+    explainer_bundle = top_factor_explainer(model) if explain else None
+    txs = read_txs(str(parquet_path), limit=limit, dests=dests)
+
+    ref_cfg = replace(parity_redis_config(), shards=())
+    check_cfg = replace(ref_cfg, db=WARM_CHECK_DB)
+    kwargs = {"model": model, "threshold": threshold, "explainer_bundle": explainer_bundle}
+    ref, ref_state = reference(txs, cfg=ref_cfg, **kwargs)
+    got, got_state, stats = asyncio.run(
+        _run_service(txs, cfg=check_cfg, max_batch=max_batch, seed=seed, **kwargs)
+    )
+
+    bad = compare(ref, got, atol=atol)
+    state_diff = sum(ref_state[key] != got_state.get(key) for key in ref_state) + len(got_state.keys() - ref_state.keys())
+    print(
+        f"service: txs={len(txs)} invalid={sum(o is None for o in ref)} flagged={sum(bool(o and o['decision']) for o in ref)} "
+        f"batches={stats['batches']} script_reloads={stats['script_reloads']} differing={len(bad)} dest_state_differing={state_diff}"
+    )
+    ok = not bad and not state_diff and stats["script_reloads"] >= 1
+    if ok:
+        print(f"Service check passed: {len(txs)} outputs match sequential serve()")
+    else:
+        print("Service check FAILED")
+        for i in bad[:5]:
+            print(i, ref[i] if i < len(ref) else None, got[i] if i < len(got) else None)
+    return ok
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--model-path", default=None, help="Local joblib model/artifact instead of the champion.")
+    p.add_argument("--parquet", default=None, help=f"Defaults to {ONLINE_TRANSACTIONS} from the dataset repo.")
+    p.add_argument("--limit", type=int, default=5_000)
+    p.add_argument("--dests", type=int, default=200, help="Fold dests onto this many ids (0 keeps them).")
+    p.add_argument("--max-batch", type=int, default=64)
+    p.add_argument("--explain", action="store_true", help="Also compare SHAP explanations of flagged transactions.")
+    p.add_argument("--threshold", type=float, default=None, help="Override the model threshold.")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    ok = main(
+        model_path=args.model_path,
+        parquet_path=args.parquet,
+        limit=args.limit,
+        dests=args.dests or None,
+        max_batch=args.max_batch,
+        explain=args.explain,
+        threshold=args.threshold,
+        seed=args.seed,
+    )
+    raise SystemExit(0 if ok else 1)
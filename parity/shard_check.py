@@ -0,0 +1,141 @@
+"""Check the shard ring (stable, balanced, minimal movement) and that a sharded store holds the same features as one node."""
+
+import argparse
+import random
+from dataclasses import replace
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import redis
+
+from financial_fraud.config import REDIS_SHARDS, REPO_ID, REVISION, TRANSACTION_LOG
+from financial_fraud.io.hf import download_dataset_hf
+from financial_fraud.redis.connect import connect_redis, parity_redis_config
+from financial_fraud.redis.sharded import ShardedRedis
+from financial_fraud.redis.store import FeatureStore
+from financial_fraud.serving.startup import register_lua_scripts
+from financial_fraud.serving.steps.entity_features import get_entity_features_many
+from financial_fraud.serving.warm_start import warm_start
+from financial_fraud.serving.warm_up_start_step import compute_start_step
+
+from common import dest_hashes
+
+
+def _ring(names: list[str]) -> ShardedRedis:
+    # Routing only: clients connect lazily and are never used.
+    return ShardedRedis([redis.Redis() for _ in names], names=names)
+
+
+def ring_check(*, names: list[str], n_keys: int = 100_000, seed: int = 0, max_skew: float = 1.3) -> bool:
+    rng = random.Random(seed)
+    keys = [f"fraud:live:dest:C{rng.randrange(10**10)}" for _ in range(n_keys)]
+
+    ring = _ring(names)
+    owner = [names[ring.shard_index(k)] for k in keys]
+    shuffled = list(reversed(names))
+    reordered = _ring(shuffled)
+    unstable = sum(o != shuffled[reordered.shard_index(k)] for k, o in zip(keys, owner))
+
+    share = {name: owner.count(name) / n_keys for name in names}
+    skew = max(share.values()) * len(names)
+
+    grown = _ring([*names, "new:0"])
+    moved = [(o, grown.names[grown.shard_index(k)]) for k, o in zip(keys, owner)]
+    moved = [(a, b) for a, b in moved if a != b]
+    stray = sum(b != "new:0" for _, b in moved)
+    moved_frac = len(moved) / n_keys
+
+    print(
+        f"ring: nodes={len(names)} keys={n_keys} shares={ {k: round(v, 3) for k, v in share.items()} } "
+        f"skew={skew:.3f} unstable={unstable} moved_on_add={moved_frac:.3f} stray_moves={stray}"
+    )
+    ok = not unstable and skew <= max_skew and not stray and moved_frac <= 2.0 / (len(names) + 1)
+    if not ok:
+        print(f"Ring check FAILED (max_skew={max_skew}, moves allowed <= {2.0 / (len(names) + 1):.3f})")
+    return ok
+
+
+def store_check(*, shards: list[str], parquet_path: str, k: int, seed: int, n_items: int = 5_000) -> bool:
+    start_step = compute_start_step(parquet_path, k=k)
+    single = replace(parity_redis_config(), shards=())
+    sharded = replace(single, shards=tuple(shards))
+
+    r1 = connect_redis(single)
+    r1.flushdb()
+    s1 = register_lua_scripts(r1)
+    warm_start(r=r1, cfg=single, lua_shas=s1, start_step=start_step, mode="replay", parquet_path=parquet_path)
+
+    r2 = FeatureStore(sharded)
+    r2.flushdb()
+    s2 = register_lua_scripts(r2)
+    warm_start(r=r2, cfg=sharded, lua_shas=s2, start_step=start_step, mode="pipelined", parquet_path=parquet_path)
+
+    ref, got = dest_hashes(r1, single), dest_hashes(r2, sharded)
+    misrouted = sum(
+        r2.client.shard_index(key) != i
+        for i, node in enumerate(r2.client.nodes)
+        for key in node.scan_iter(match=f"{sharded.live_prefix}dest:*", count=5_000)
+    )
+    sizes = [node.dbsize() for node in r2.client.nodes]
+
+    # Live updates on top: known and new dests, steps moving forward, scripts flushed halfway.
+    rng = random.Random(seed)
+    known = [key[len(f"{single.live_prefix}dest:"):] for key in ref]
+    last = pc.max(pq.read_table(parquet_path, columns=["step"]).column("step")).as_py()
+    items = [
+        (rng.choice(known) if known and rng.random() < 0.8 else f"M{rng.randrange(10**9)}", last + 1 + i // 50, round(rng.uniform(1, 1e5), 2))
+        for i in range(n_items)
+    ]
+    half = n_items // 2
+    a = get_entity_features_many(r=r1, cfg=single, items=items, lua_shas=s1)
+    b = get_entity_features_many(r=r2, cfg=sharded, items=items[:half], lua_shas=s2)
+    for node in r2.client.nodes:
+        node.script_flush()
+    b += get_entity_features_many(r=r2, cfg=sharded, items=items[half:], lua_shas=s2)
+
+    diff = sum(x != y for x, y in zip(a, b))
+    after = dest_hashes(r1, single) == dest_hashes(r2, sharded)
+    print(
+        f"store: shards={len(shards)} keys={len(got)} per_node={sizes} misrouted={misrouted} "
+        f"features_differ={diff}/{n_items} script_reloads={r2.script_reloads}"
+    )
+    ok = ref == got and not misrouted and not diff and after and r2.script_reloads >= 1
+    if not ok:
+        missing = len(set(ref) - set(got))
+        differing = sum(ref[key] != got.get(key) for key in ref)
+        print(f"Store check FAILED: missing={missing} differing={differing} state_equal_after_updates={after}")
+    r2.close()
+    return ok
+
+
+def main(
+    *,
+    shards: list[str] | None = None,
+    parquet_path: str | None = None,
+    k: int = 48,
+    seed: int = 0,
+) -> bool:
+    shards = list(shards or REDIS_SHARDS)
+    names = shards or ["10.0.0.1:6379", "10.0.0.2:6379", "10.0.0.3:6379"]
+    ok = ring_check(names=names, seed=seed)
+
+    if not shards:
+        print("store check skipped: no shards given (--shards or REDIS_SHARDS)")
+    else:
+        if parquet_path is None:
+            parquet_path = download_dataset_hf(repo_id=REPO_ID, filename=TRANSACTION_LOG, revision=REVISION)
+        ok = store_check(shards=shards, parquet_path=str(parquet_path), k=k, seed=seed) and ok
+
+    print("Shard check passed" if ok else "Shard check FAILED")
+    return ok
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--shards", nargs="*", default=None, help="host:port of each shard (defaults to REDIS_SHARDS).")
+    p.add_argument("--parquet", default=None, help="Local transaction log (defaults to the HF offline log).")
+    p.add_argument("--k", type=int, default=48)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    ok = main(shards=args.shards, parquet_path=args.parquet, k=args.k, seed=args.seed)
+    raise SystemExit(0 if ok else 1)
@@ -6,9 +6,9 @@ import pandas as pd
 from financial_fraud.io.hf import download_dataset_hf
 from financial_fraud.config import REPO_ID, TRAIN_DATA, REVISION
 from financial_fraud.redis.connect import connect_redis, parity_redis_config
-from financial_fraud.redis.lua.lua_scripts import SCRIPT_DEST_ADD, SCRIPT_DEST_ADVANCE
 from financial_fraud.redis.infra import make_entity_key
 from financial_fraud.serving.steps.entity_features import get_entity_features
+from financial_fraud.serving.startup import register_lua_scripts
 
 
 FEATURES = [
@@ -75,9 +75,7 @@ def main(num_dests: int = 10):
     r = connect_redis(cfg)
     r.flushdb()
 
-    sha_adv = r.script_load(SCRIPT_DEST_ADVANCE)
-    sha_add = r.script_load(SCRIPT_DEST_ADD)
-    lua_shas = {"dest_advance": sha_adv, "dest_add": sha_add}
+    lua_shas = register_lua_scripts(r)
 
     mismatches: list[dict] = []
     summary: list[dict] = []
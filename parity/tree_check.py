@@ -0,0 +1,116 @@
+"""Check that the native TreeEnsemble evaluator scores like the LightGBM/XGBoost classifier it was exported from."""
+
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from financial_fraud.config import REPO_ID, REVISION, TRAIN_DATA
+from financial_fraud.io.hf import download_dataset_hf
+from financial_fraud.modeling.config import TARGET_COL
+from financial_fraud.modeling.tree_ensemble import TreeEnsemble, export_tree_ensemble
+from financial_fraud.serving.plan import PlannedModel, probe_frame
+from financial_fraud.serving.startup import load_champion_model
+
+
+def _max_diff(got: np.ndarray, expected: np.ndarray) -> float:
+    return float(np.max(np.abs(got - expected))) if len(expected) else 0.0
+
+
+def _threshold_rows(ens: TreeEnsemble, X: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    """Rows of X with one split feature set exactly on, just below or just above a split threshold."""
+    split = np.flatnonzero(ens.child[0::2] != np.arange(len(ens.feature)))
+    nodes = rng.choice(split, size=n)
+    out = X[rng.integers(0, len(X), size=n)].copy()
+    thr = ens.threshold[nodes]
+    side = rng.integers(-1, 2, size=n)
+    values = np.where(side < 0, np.nextafter(thr, -np.inf), np.where(side > 0, np.nextafter(thr, np.inf), thr))
+    out[np.arange(n), ens.feature[nodes]] = values
+    return out
+
+
+def main(
+    *,
+    model_path: str | None = None,
+    trees_path: str | None = None,
+    parquet_path: str | None = None,
+    rows: int = 50_000,
+    seed: int = 0,
+    atol: float = 1e-6,
+) -> bool:
+    if model_path is None:
+        model, _, _ = load_champion_model(fast_path=True)
+        native = getattr(model, "native", None)
+        pipe = getattr(model, "pipeline", model)
+    else:
+        artifact = joblib.load(model_path)
+        pipe = getattr(artifact, "model", artifact)
+        native = None
+    if trees_path is not None:
+        native = TreeEnsemble.load_npz(trees_path)
+
+    clf = pipe.named_steps["clf"]
+    if native is None:
+        native = export_tree_ensemble(clf)
+    if native is None:
+        print(f"Tree check skipped: {type(clf).__name__} has no native tree evaluator")
+        return True
+
+    if parquet_path is None:
+        parquet_path = download_dataset_hf(repo_id=REPO_ID, filename=TRAIN_DATA, revision=REVISION)
+    # The gold train table also carries txn_id, which the feature spec rejects (see time_split).
+    df = pd.read_parquet(parquet_path).drop(columns=[TARGET_COL, "txn_id"], errors="ignore")
+    rng = np.random.default_rng(seed)
+    if len(df) > rows:
+        df = df.iloc[np.sort(rng.choice(len(df), size=rows, replace=False))].reset_index(drop=True)
+
+    X = np.asarray(pipe[:-1].transform(df), dtype=np.float64)
+    X_missing = X.copy()
+    X_missing[rng.random(X.shape) < 0.1] = np.nan
+    X_split = _threshold_rows(native, X, rng, min(rows, 20_000))
+
+    # End to end through the serving plan: raw rows in, the classifier replaced by the native walk.
+    planned = PlannedModel.from_pipeline(pipe, native=native)
+    frame = pd.concat([df, probe_frame(planned.plan)], ignore_index=True)
+
+    checks = {
+        "rows": _max_diff(native.predict_proba(X)[:, 1], clf.predict_proba(X)[:, 1]),
+        "missing": _max_diff(native.predict_proba(X_missing)[:, 1], clf.predict_proba(X_missing)[:, 1]),
+        "thresholds": _max_diff(native.predict_proba(X_split)[:, 1], clf.predict_proba(X_split)[:, 1]),
+        "planned": _max_diff(
+            planned.predict_proba_rows(frame.to_dict(orient="records"))[:, 1],
+            pipe.predict_proba(frame)[:, 1],
+        ),
+    }
+    print(
+        f"{native.source}: trees={native.n_trees} nodes={len(native.feature)} max_depth={native.max_depth} "
+        f"rows={len(X)} " + " ".join(f"{name}={diff:.3g}" for name, diff in checks.items())
+    )
+
+    bad = {name: diff for name, diff in checks.items() if not diff <= atol}
+    if bad:
+        print(f"Tree check FAILED (atol={atol}): {bad}")
+        return False
+    print(f"Tree check passed ({native.source}): native evaluator within {atol} of {type(clf).__name__}.predict_proba")
+    return True
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--model-path", default=None, help="Local joblib model/artifact instead of the champion.")
+    p.add_argument("--trees", default=None, help="trees.npz to check instead of exporting from the classifier.")
+    p.add_argument("--parquet", default=None, help="Local feature table (defaults to the HF train table).")
+    p.add_argument("--rows", type=int, default=50_000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--atol", type=float, default=1e-6)
+    args = p.parse_args()
+    ok = main(
+        model_path=args.model_path,
+        trees_path=args.trees,
+        parquet_path=args.parquet,
+        rows=args.rows,
+        seed=args.seed,
+        atol=args.atol,
+    )
+    raise SystemExit(0 if ok else 1)
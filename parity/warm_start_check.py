@@ -0,0 +1,77 @@
+"""Check that bulk/pipelined/parallel warm start write the same dest hashes as the sequential replay."""
+
+import argparse
+from dataclasses import replace
+from time import perf_counter
+
+from financial_fraud.io.hf import download_dataset_hf
+from financial_fraud.config import REPO_ID, TRANSACTION_LOG, REVISION, WARM_CHECK_DB
+from financial_fraud.redis.connect import connect_redis, parity_redis_config
+from financial_fraud.redis.reader import decode_dest_state
+from financial_fraud.serving.startup import register_lua_scripts
+from financial_fraud.serving.warm_start import warm_start
+from financial_fraud.serving.warm_up_start_step import compute_start_step
+
+from common import dest_hashes
+
+
+def main(
+    *,
+    k: int = 48,
+    parquet_path: str | None = None,
+    mode: str = "bulk",
+    workers: int = 1,
+    encoding: str = "hash",
+) -> bool:
+    if parquet_path is None:
+        parquet_path = download_dataset_hf(repo_id=REPO_ID, filename=TRANSACTION_LOG, revision=REVISION)
+    start_step = compute_start_step(str(parquet_path), k=k)
+
+    replay_cfg = replace(parity_redis_config(), dest_encoding=encoding)
+    check_cfg = replace(replay_cfg, db=WARM_CHECK_DB)
+
+    timings = {}
+    stores = {}
+    for name, run_mode, n_workers, cfg in (("replay", "replay", 1, replay_cfg), ("check", mode, workers, check_cfg)):
+        r = connect_redis(cfg)
+        r.flushdb()
+        lua_shas = register_lua_scripts(r)
+
+        t0 = perf_counter()
+        applied = warm_start(r=r, cfg=cfg, lua_shas=lua_shas, start_step=start_step, mode=run_mode, parquet_path=str(parquet_path), workers=n_workers)
+        seconds = perf_counter() - t0
+        timings[name] = (applied, seconds)
+        stores[name] = dest_hashes(r, cfg)
+        print(f"{run_mode:>9} x{n_workers}: applied={applied} keys={len(stores[name])} seconds={seconds:.2f} tps={applied / seconds:.0f}")
+
+    replay, other = stores["replay"], stores["check"]
+    missing = sorted(set(replay) - set(other))
+    extra = sorted(set(other) - set(replay))
+    diff = [key for key in replay.keys() & other.keys() if replay[key] != other[key]]
+
+    ok = timings["replay"][0] == timings["check"][0] and not missing and not extra and not diff
+    if ok:
+        print(f"Warm start check passed ({mode} x{workers} vs replay, {encoding}): {len(replay)} dest hashes identical")
+    else:
+        print(f"Warm start check FAILED: missing={len(missing)} extra={len(extra)} differing={len(diff)}")
+        for key in sorted(diff)[:10]:
+            if encoding == "packed":
+                replay[key], other[key] = decode_dest_state(replay[key]), decode_dest_state(other[key])
+            fields = sorted(
+                f for f in replay[key].keys() | other[key].keys()
+                if replay[key].get(f) != other[key].get(f)
+            )
+            print(key, {f: (replay[key].get(f), other[key].get(f)) for f in fields})
+    return ok
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--k", type=int, default=48)
+    p.add_argument("--parquet", default=None, help="Local transaction log (defaults to the HF offline log).")
+    p.add_argument("--mode", choices=["bulk", "pipelined"], default="bulk", help="Mode compared against replay.")
+    p.add_argument("--workers", type=int, default=1, help="Worker processes for the compared mode (pipelined only).")
+    p.add_argument("--encoding", choices=["hash", "packed"], default="hash", help="Dest state encoding.")
+    args = p.parse_args()
+    ok = main(k=args.k, parquet_path=args.parquet, mode=args.mode, workers=args.workers, encoding=args.encoding)
+    raise SystemExit(0 if ok else 1)
@@ -8,17 +8,29 @@ TRAIN_DATA = "data/gold/train.parquet"
 
 DUCKDB_PATH = "data/db/fraud.duckdb"
 
+# Content-addressed local copies of run bundle files (io/artifact_cache.py).
+ARTIFACT_CACHE_DIR = "~/.cache/financial_fraud/artifacts"
+
+# Parquet side logs of candidate scores taken in shadow next to the champion (serving/shadow.py).
+SHADOW_LOG_DIR = "data/shadow"
+
 REDIS_HOST = "127.0.0.1"
 REDIS_PORT = 6380
 REDIS_DB = 1
+# "host:port" per node; when set, dest keys are spread across these nodes instead of REDIS_HOST.
+REDIS_SHARDS: tuple[str, ...] = ()
 
 PARITY_DB = 2
+WARM_CHECK_DB = 3
+BENCH_DB = 4
 
 REDIS_BASE_PREFIX = "fraud:features:"
 REDIS_LIVE_PREFIX = f"{REDIS_BASE_PREFIX}LIVE:"
 REDIS_RUN_META_PREFIX = f"{REDIS_BASE_PREFIX}RUN_META:"
 
 DEST_BUCKET_N = 24
+DEST_SCHEMA_VERSION = 2
+DEST_ENCODING = "hash"
 
 LABEL_COL = "is_fraud"
 
@@ -0,0 +1,123 @@
+"""
+Content-addressed local cache of run bundle files, so serving can start without the registry.
+
+Layout under the cache root:
+
+    objects/<sha256>                         file contents, stored once, read-only
+    runs/<run_id>.json                       {filename: sha256} of the run's cached files
+    refs/<repo_id>/<revision>/champion.json  last champion pointer read from the registry
+
+Run folders are never overwritten on the registry (upload_model_bundle refuses an existing one), so
+a run's manifest stays valid once written. Objects are never modified in place, which is what lets
+every process on the host memory-map the same model file and share its pages.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from financial_fraud.config import ARTIFACT_CACHE_DIR
+
+
+def file_sha256(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json(path: Path, obj: Any) -> None:
+    # Several workers may start at once: a per-process tmp name keeps their writes from mixing.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+class ArtifactCache:
+    """Run files keyed by (run_id, filename) -> sha256 -> object; plain paths, so it pickles to workers."""
+
+    def __init__(self, root: str | Path = ARTIFACT_CACHE_DIR) -> None:
+        self.root = Path(root).expanduser()
+
+    def object_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256
+
+    def manifest(self, run_id: str) -> dict[str, str]:
+        p = self._manifest_path(run_id)
+        if not p.exists():
+            return {}
+        return json.loads(p.read_text(encoding="utf-8"))
+
+    def get(self, run_id: str, filename: str, *, verify: bool = False) -> Optional[Path]:
+        """Cached copy of the run's file, or None if it is not cached (or, with verify, no longer
+        matches its hash)."""
+        sha = self.manifest(run_id).get(filename)
+        if sha is None:
+            return None
+        path = self.object_path(sha)
+        if not path.exists() or (verify and file_sha256(path) != sha):
+            return None
+        return path
+
+    def put(self, run_id: str, filename: str, src: str | Path) -> Path:
+        """Copy src into the cache as the run's filename and return the cached path."""
+        sha = file_sha256(src)
+        dest = self.object_path(sha)
+        if not dest.exists():
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dest.with_name(f"{sha}.{os.getpid()}.tmp")
+            shutil.copyfile(src, tmp)
+            tmp.chmod(0o444)
+            tmp.replace(dest)
+
+        manifest = self.manifest(run_id)
+        if manifest.get(filename) != sha:
+            manifest[filename] = sha
+            _write_json(self._manifest_path(run_id), manifest)
+        return dest
+
+    def put_bundle(self, run_id: str, bundle_dir: str | Path) -> dict[str, str]:
+        """Cache every file of a local run bundle (e.g. one the train job just wrote)."""
+        for p in sorted(Path(bundle_dir).iterdir()):
+            if p.is_file() and not p.name.endswith(".tmp"):
+                self.put(run_id, p.name, p)
+        return self.manifest(run_id)
+
+    def fetch(
+        self,
+        run_id: str,
+        filename: str,
+        *,
+        download: Callable[[], Optional[str | Path]],
+        offline: bool = False,
+    ) -> Optional[Path]:
+        """Cached copy of the run's file, downloading and caching it on a miss unless offline.
+        download returns a local path, or None when the registry has no such file."""
+        path = self.get(run_id, filename)
+        if path is not None or offline:
+            return path
+        src = download()
+        return self.put(run_id, filename, src) if src is not None else None
+
+    def read_ref(self, repo_id: str, revision: str, name: str) -> Optional[dict[str, Any]]:
+        p = self._ref_path(repo_id, revision, name)
+        if not p.exists():
+            return None
+        return json.loads(p.read_text(encoding="utf-8"))
+
+    def write_ref(self, repo_id: str, revision: str, name: str, obj: dict[str, Any]) -> None:
+        if self.read_ref(repo_id, revision, name) != obj:
+            _write_json(self._ref_path(repo_id, revision, name), obj)
+
+    def _manifest_path(self, run_id: str) -> Path:
+        return self.root / "runs" / f"{run_id}.json"
+
+    def _ref_path(self, repo_id: str, revision: str, name: str) -> Path:
+        return self.root / "refs" / repo_id / revision / name
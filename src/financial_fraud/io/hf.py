@@ -1,13 +1,15 @@
 from __future__ import annotations
 from pathlib import Path
-from huggingface_hub import hf_hub_download, HfApi
 from typing import Optional, Any
 import json
-from huggingface_hub.utils import EntryNotFoundError
-import joblib
+
+# huggingface_hub and joblib are imported inside the functions: importing the serving path should
+# not pay for them (about 0.3 s) before the first download.
 
 def download_dataset_hf(repo_id: str, filename: str, revision: str = "main") -> str:
     """Download a single file from a Hugging Face dataset repo using the normal HF cache."""
+    from huggingface_hub import hf_hub_download
+
     return hf_hub_download(
         repo_id=repo_id,
         filename=filename,
@@ -30,6 +32,8 @@ def upload_dataset_hf(
     if not p.is_file():
         raise IsADirectoryError(f"Expected a file, got: {p}")
 
+    from huggingface_hub import HfApi
+
     api = HfApi()
     api.upload_file(
         path_or_fileobj=str(p),
@@ -59,6 +63,8 @@ def upload_model_bundle(
     if run_id != inferred:
         raise ValueError(f"run_id mismatch: arg={run_id} folder={inferred}")
 
+    from huggingface_hub import HfApi
+
     path_in_repo = f"runs/{run_id}"
     api = HfApi()
 
@@ -93,6 +99,9 @@ def read_model_json(
     path_in_repo: str,
 ) -> Optional[dict[str, Any]]:
     """Download and parse a JSON file from a Hugging Face model repo (returns None if missing)."""
+    from huggingface_hub import hf_hub_download
+    from huggingface_hub.utils import EntryNotFoundError
+
     try:
         local_file = hf_hub_download(
             repo_id=repo_id,
@@ -122,6 +131,8 @@ def upload_model_json_hf(
     dest = path_in_repo or p.name
     msg = commit_message or f"Upload {dest}"
 
+    from huggingface_hub import HfApi
+
     api = HfApi()
     api.upload_file(
         path_or_fileobj=str(p),
@@ -132,8 +143,26 @@ def upload_model_json_hf(
         commit_message=msg,
     )
     
+def download_model_file_hf(*, repo_id: str, revision: str, path_in_repo: str) -> Optional[str]:
+    """Download one file from a Hugging Face model repo (returns None if missing)."""
+    from huggingface_hub import hf_hub_download
+    from huggingface_hub.utils import EntryNotFoundError
+
+    try:
+        return hf_hub_download(
+            repo_id=repo_id,
+            repo_type="model",
+            revision=revision,
+            filename=path_in_repo,
+        )
+    except EntryNotFoundError:
+        return None
+
 def load_model_hf(*, repo_id: str, revision: str, path_in_repo: str) -> Any:
     """Download a model artifact from HF and load it with joblib."""
+    import joblib
+    from huggingface_hub import hf_hub_download
+
     local_file = hf_hub_download(
         repo_id=repo_id,
         repo_type="model",
@@ -14,7 +14,9 @@ from financial_fraud.modeling.bundle.write_metadata import (
     write_metadata_json,
 )
 from financial_fraud.modeling.bundle.write_model import write_model_joblib
+from financial_fraud.modeling.bundle.write_trees import write_trees_npz
 from financial_fraud.modeling.bundle.model_artifact import ModelArtifact
+from financial_fraud.modeling.tree_ensemble import TreeEnsemble
 
 
 def write_bundle(
@@ -28,8 +30,13 @@ def write_bundle(
     threshold: Optional[float] = None,
     feature_names: list[str] | None = None,
     cfg: Any = None,
+    tree_ensemble: Optional[TreeEnsemble] = None,
+    compress: int = 0,
 ) -> Path:
-    write_model_joblib(bundle_dir, artifact_obj)
+    write_model_joblib(bundle_dir, artifact_obj, compress=compress)
+
+    if tree_ensemble is not None:
+        write_trees_npz(bundle_dir, tree_ensemble)
 
     metrics_payload = assemble_metrics_payload(
         run_id=artifact_obj.run_id,
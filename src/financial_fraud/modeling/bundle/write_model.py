@@ -8,13 +8,15 @@ from typing import Any
 import joblib
 
 
-def write_model_joblib(bundle_dir: Path, artifact_obj: Any) -> Path:
+def write_model_joblib(bundle_dir: Path, artifact_obj: Any, *, compress: int = 0) -> Path:
+    """compress=0 (joblib's default) keeps the NumPy arrays loadable with joblib.load(mmap_mode="r");
+    a compressed model.joblib is smaller to upload but every loading process reads its own copy."""
     bundle_dir.mkdir(parents=True, exist_ok=True)
 
     model_path = bundle_dir / "model.joblib"
     tmp_path = model_path.with_suffix(model_path.suffix + ".tmp")
 
-    joblib.dump(artifact_obj, tmp_path)
+    joblib.dump(artifact_obj, tmp_path, compress=compress)
     tmp_path.replace(model_path)
 
     return model_path
\ No newline at end of file
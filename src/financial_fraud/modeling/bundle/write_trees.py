@@ -0,0 +1,12 @@
+"""Write flattened tree ensemble into bundle."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from financial_fraud.modeling.tree_ensemble import TreeEnsemble
+
+
+def write_trees_npz(bundle_dir: Path, ensemble: TreeEnsemble) -> Path:
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    return ensemble.save_npz(bundle_dir / "trees.npz")
@@ -7,9 +7,10 @@ from __future__ import annotations
 import redis
 
 from financial_fraud.redis.infra import RedisConfig
+from financial_fraud.redis.sharded import ShardedRedis, parse_shard
 from financial_fraud.config import (
-    REDIS_HOST, REDIS_PORT, REDIS_DB,
-    REDIS_LIVE_PREFIX, REDIS_RUN_META_PREFIX, DEST_BUCKET_N, PARITY_DB
+    REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_SHARDS,
+    REDIS_LIVE_PREFIX, REDIS_RUN_META_PREFIX, DEST_BUCKET_N, DEST_ENCODING, PARITY_DB
 )
 
 def redis_config() -> RedisConfig:
@@ -20,6 +21,8 @@ def redis_config() -> RedisConfig:
         live_prefix=REDIS_LIVE_PREFIX,
         run_meta_prefix=REDIS_RUN_META_PREFIX,
         dest_bucket_N=DEST_BUCKET_N,
+        dest_encoding=DEST_ENCODING,
+        shards=REDIS_SHARDS,
     )
     
 def parity_redis_config() -> RedisConfig:
@@ -30,9 +33,18 @@ def parity_redis_config() -> RedisConfig:
         live_prefix=REDIS_LIVE_PREFIX,
         run_meta_prefix=REDIS_RUN_META_PREFIX,
         dest_bucket_N=DEST_BUCKET_N,
+        dest_encoding=DEST_ENCODING,
+        shards=REDIS_SHARDS,
     )
 
-def connect_redis(cfg: RedisConfig) -> redis.Redis:
-    r = redis.Redis(host=cfg.host, port=cfg.port, db=cfg.db, decode_responses=True)
+def connect_redis(cfg: RedisConfig) -> redis.Redis | ShardedRedis:
+    if cfg.shards:
+        nodes = [
+            redis.Redis(host=host, port=port, db=cfg.db, decode_responses=True)
+            for host, port in map(parse_shard, cfg.shards)
+        ]
+        r = ShardedRedis(nodes, names=cfg.shards)
+    else:
+        r = redis.Redis(host=cfg.host, port=cfg.port, db=cfg.db, decode_responses=True)
     r.ping()
     return r
\ No newline at end of file
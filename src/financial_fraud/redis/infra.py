@@ -2,6 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+# "hash": one hash field per slot/total. "packed": one fixed-width binary string per dest.
+DEST_ENCODINGS = ("hash", "packed")
+
 
 @dataclass(frozen=True)
 class RedisConfig:
@@ -11,6 +14,17 @@ class RedisConfig:
     live_prefix: str
     run_meta_prefix: str
     dest_bucket_N: int
+    dest_encoding: str = "hash"
+    shards: tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        if self.dest_encoding not in DEST_ENCODINGS:
+            raise ValueError(f"Unknown dest encoding {self.dest_encoding!r}. Options: {list(DEST_ENCODINGS)}")
+
+
+def dest_script(name: str, encoding: str) -> str:
+    """lua_shas key of a dest script for the given state encoding."""
+    return name if encoding == "hash" else f"{name}_{encoding}"
 
 
 def make_entity_key(prefix: str, entity_type: str, entity_id: str) -> str:
@@ -0,0 +1,4 @@
+-- Store a stream checkpoint. Sent as EVALSHA inside a batch's MULTI/EXEC: if the scripts are
+-- gone, the checkpoint fails with NOSCRIPT together with the batch's dest updates.
+redis.call("SET", KEYS[1], ARGV[1])
+return 1
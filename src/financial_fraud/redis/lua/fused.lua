@@ -0,0 +1,31 @@
+-- Advance ring-buffer, read pre-add aggregates, then add current transaction (one round trip).
+local key    = KEYS[1]
+local step   = tonumber(ARGV[1])
+local amount = tonumber(ARGV[2])
+local N      = tonumber(ARGV[3])
+
+local cnt_1h, sum_1h, cnt_24h, sum_24h = 0, "0", 0, "0"
+local added = 1
+
+local status, last_seen = ring_prepare(key, N)
+if status == 1 then
+  if ring_advance(key, N, last_seen, step) == 1 then
+    last_seen = step
+  end
+  cnt_1h, sum_1h, cnt_24h, sum_24h = ring_read(key, N, last_seen)
+  ring_add(key, N, last_seen, amount)
+elseif status == 0 then
+  ring_init(key, N, step)
+  ring_add(key, N, step, amount)
+else
+  added = 0
+end
+
+-- Lua numbers are truncated to integers in replies, so sums go back as strings.
+return {
+  cnt_1h,
+  cnt_24h,
+  sum_1h,
+  sum_24h,
+  added,
+}
@@ -7,10 +7,30 @@ from typing import Final
 
 _LUA_PKG = "financial_fraud.redis.lua"
 
-SCRIPT_DEST_ADVANCE: Final[str] = (
-    resources.files(_LUA_PKG).joinpath("advance.lua").read_text(encoding="utf-8")
-)
 
-SCRIPT_DEST_ADD: Final[str] = (
-    resources.files(_LUA_PKG).joinpath("add.lua").read_text(encoding="utf-8")
-)
+def _read(name: str) -> str:
+    return resources.files(_LUA_PKG).joinpath(name).read_text(encoding="utf-8")
+
+
+# Redis scripts cannot import each other, so the shared ring-buffer helpers are prepended.
+_RING: Final[str] = _read("ring.lua")
+_RING_PACKED: Final[str] = _read("ring_packed.lua")
+
+SCRIPT_DEST_ADVANCE: Final[str] = _RING + "\n" + _read("advance.lua")
+
+SCRIPT_DEST_ADD: Final[str] = _RING + "\n" + _read("add.lua")
+
+SCRIPT_DEST_FUSED: Final[str] = _RING + "\n" + _read("fused.lua")
+
+SCRIPT_DEST_MIGRATE: Final[str] = _RING + "\n" + _read("migrate.lua")
+
+SCRIPT_DEST_SWEEP: Final[str] = _read("sweep.lua")
+
+SCRIPT_CHECKPOINT: Final[str] = _read("checkpoint.lua")
+
+# Same script bodies over the packed binary layout.
+SCRIPT_DEST_ADVANCE_PACKED: Final[str] = _RING_PACKED + "\n" + _read("advance.lua")
+
+SCRIPT_DEST_ADD_PACKED: Final[str] = _RING_PACKED + "\n" + _read("add.lua")
+
+SCRIPT_DEST_FUSED_PACKED: Final[str] = _RING_PACKED + "\n" + _read("fused.lua")
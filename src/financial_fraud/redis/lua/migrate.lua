@@ -0,0 +1,14 @@
+-- Rewrite a v1 dest hash into the v2 ring layout; returns 1 if migrated, 0 if already v2 or missing, -1 on width mismatch.
+local key = KEYS[1]
+local N   = tonumber(ARGV[1])
+
+local version = tonumber(redis.call("HGET", key, VERSION_FIELD))
+if version == SCHEMA_VERSION then
+  return 0
+end
+
+local status = ring_prepare(key, N)
+if status == 1 then
+  return 1
+end
+return status
@@ -0,0 +1,165 @@
+-- Dest ring-buffer (schema v2), prepended to every dest script by lua_scripts.py.
+-- Slot j holds the step t with t % (N + 1) == j; the head is dest_last_seen_step % (N + 1).
+-- dest_cnt_win / dest_sum_win are running totals over steps last_seen-N .. last_seen-1.
+local SCHEMA_VERSION = 2
+local SCHEMA_FIELD = "dest_schema_N"
+local VERSION_FIELD = "dest_schema_v"
+local LAST_SEEN_FIELD = "dest_last_seen_step"
+local CNT_WIN = "dest_cnt_win"
+local SUM_WIN = "dest_sum_win"
+
+local function cnt_slot(j)
+  return "dest_cnt_s"..j
+end
+
+local function sum_slot(j)
+  return "dest_sum_s"..j
+end
+
+local function negate(s)
+  if string.sub(s, 1, 1) == "-" then
+    return string.sub(s, 2)
+  end
+  return "-"..s
+end
+
+local function ring_init(key, n, step)
+  local args = {
+    SCHEMA_FIELD, n,
+    VERSION_FIELD, SCHEMA_VERSION,
+    LAST_SEEN_FIELD, step,
+    CNT_WIN, 0,
+    SUM_WIN, 0,
+  }
+  for j = 0, n do
+    args[#args + 1] = cnt_slot(j)
+    args[#args + 1] = 0
+    args[#args + 1] = sum_slot(j)
+    args[#args + 1] = 0
+  end
+  redis.call("HSET", key, unpack(args))
+end
+
+-- v1 layout: dest_cnt_cur/dest_sum_cur plus dest_cnt_b{i}/dest_sum_b{i} for step last_seen-i.
+local function ring_migrate_v1(key, n, last_seen)
+  local m = n + 1
+  local names = {"dest_cnt_cur", "dest_sum_cur"}
+  for i = 1, n do
+    names[#names + 1] = "dest_cnt_b"..i
+    names[#names + 1] = "dest_sum_b"..i
+  end
+  local old = redis.call("HMGET", key, unpack(names))
+  redis.call("HDEL", key, unpack(names))
+
+  ring_init(key, n, last_seen)
+
+  local args = {}
+  local win_cnt = 0
+  for i = 0, n do
+    local c = tonumber(old[2 * i + 1]) or 0
+    if c > 0 then
+      local j = (last_seen - i) % m
+      args[#args + 1] = cnt_slot(j)
+      args[#args + 1] = c
+      args[#args + 1] = sum_slot(j)
+      args[#args + 1] = old[2 * i + 2]
+      if i > 0 then
+        win_cnt = win_cnt + c
+        redis.call("HINCRBYFLOAT", key, SUM_WIN, old[2 * i + 2])
+      end
+    end
+  end
+  args[#args + 1] = CNT_WIN
+  args[#args + 1] = win_cnt
+  redis.call("HSET", key, unpack(args))
+end
+
+-- Returns 0 if the key is missing, -1 if it has another width (or no last seen step),
+-- otherwise 1 and the last seen step. v1 hashes are migrated in place first.
+local function ring_prepare(key, n)
+  local f = redis.call("HMGET", key, SCHEMA_FIELD, VERSION_FIELD, LAST_SEEN_FIELD)
+  if not f[1] then
+    if redis.call("EXISTS", key) == 0 then
+      return 0
+    end
+    return -1
+  end
+
+  local last_seen = tonumber(f[3])
+  if tonumber(f[1]) ~= n or not last_seen then
+    return -1
+  end
+
+  if tonumber(f[2]) ~= SCHEMA_VERSION then
+    ring_migrate_v1(key, n, last_seen)
+  end
+  return 1, last_seen
+end
+
+-- Move the head to step. Only slots that fall out of the window are read and cleared.
+local function ring_advance(key, n, last_seen, step)
+  local gap = step - last_seen
+  if gap <= 0 then
+    return 0
+  end
+
+  local m = n + 1
+  local args = {LAST_SEEN_FIELD, step}
+
+  if gap > n then
+    for j = 0, n do
+      args[#args + 1] = cnt_slot(j)
+      args[#args + 1] = 0
+      args[#args + 1] = sum_slot(j)
+      args[#args + 1] = 0
+    end
+    args[#args + 1] = CNT_WIN
+    args[#args + 1] = 0
+    args[#args + 1] = SUM_WIN
+    args[#args + 1] = 0
+    redis.call("HSET", key, unpack(args))
+    return 1
+  end
+
+  local head = last_seen % m
+  local cur = redis.call("HMGET", key, cnt_slot(head), sum_slot(head))
+  local delta = tonumber(cur[1]) or 0
+  if delta > 0 then
+    redis.call("HINCRBYFLOAT", key, SUM_WIN, cur[2])
+  end
+
+  for t = last_seen - n, step - n - 1 do
+    local j = t % m
+    local e = redis.call("HMGET", key, cnt_slot(j), sum_slot(j))
+    local c = tonumber(e[1]) or 0
+    if c > 0 then
+      delta = delta - c
+      redis.call("HINCRBYFLOAT", key, SUM_WIN, negate(e[2]))
+      args[#args + 1] = cnt_slot(j)
+      args[#args + 1] = 0
+      args[#args + 1] = sum_slot(j)
+      args[#args + 1] = 0
+    end
+  end
+
+  if redis.call("HINCRBY", key, CNT_WIN, delta) == 0 then
+    args[#args + 1] = SUM_WIN
+    args[#args + 1] = 0
+  end
+
+  redis.call("HSET", key, unpack(args))
+  return 1
+end
+
+-- Pre-add aggregates relative to last_seen: (cnt_1h, sum_1h, cnt_24h, sum_24h), sums as strings.
+local function ring_read(key, n, last_seen)
+  local prev = (last_seen - 1) % (n + 1)
+  local f = redis.call("HMGET", key, cnt_slot(prev), sum_slot(prev), CNT_WIN, SUM_WIN)
+  return tonumber(f[1]) or 0, f[2] or "0", tonumber(f[3]) or 0, f[4] or "0"
+end
+
+local function ring_add(key, n, last_seen, amount)
+  local head = last_seen % (n + 1)
+  redis.call("HINCRBY", key, cnt_slot(head), 1)
+  redis.call("HINCRBYFLOAT", key, sum_slot(head), amount)
+end
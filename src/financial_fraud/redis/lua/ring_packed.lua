@@ -0,0 +1,100 @@
+-- Dest ring-buffer (schema v2) packed into one binary string, prepended to the dest scripts.
+-- Same slots, head and window as ring.lua; sums are doubles instead of HINCRBYFLOAT strings.
+-- Layout (little-endian): header "<I2I2i4I4d" (N, version, last_seen, cnt_win, sum_win)
+-- followed by N + 1 slots "<I4d" (cnt, sum). Slot j starts at byte HEADER_SIZE + SLOT_SIZE * j.
+local SCHEMA_VERSION = 2
+local HEADER = "<I2I2i4I4d"
+local HEADER_SIZE = 20
+local SLOT = "<I4d"
+local SLOT_SIZE = 12
+
+local function slot_pos(j)
+  return HEADER_SIZE + SLOT_SIZE * j
+end
+
+local function read_slot(blob, j)
+  local c, s = struct.unpack(SLOT, blob, slot_pos(j) + 1)
+  return c, s
+end
+
+local function ring_init(key, n, step)
+  local parts = {struct.pack(HEADER, n, SCHEMA_VERSION, step, 0, 0)}
+  local empty = struct.pack(SLOT, 0, 0)
+  for j = 0, n do
+    parts[#parts + 1] = empty
+  end
+  redis.call("SET", key, table.concat(parts))
+end
+
+-- Returns 0 if the key is missing, -1 if it has another width or version,
+-- otherwise 1 and the last seen step.
+local function ring_prepare(key, n)
+  local head = redis.call("GETRANGE", key, 0, HEADER_SIZE - 1)
+  if #head == 0 then
+    return 0
+  end
+  if #head < HEADER_SIZE then
+    return -1
+  end
+
+  local width, version, last_seen = struct.unpack(HEADER, head)
+  if width ~= n or version ~= SCHEMA_VERSION then
+    return -1
+  end
+  return 1, last_seen
+end
+
+-- Move the head to step. Only slots that fall out of the window are rewritten.
+local function ring_advance(key, n, last_seen, step)
+  local gap = step - last_seen
+  if gap <= 0 then
+    return 0
+  end
+
+  if gap > n then
+    ring_init(key, n, step)
+    return 1
+  end
+
+  local m = n + 1
+  local blob = redis.call("GET", key)
+  local _, _, _, cnt_win, sum_win = struct.unpack(HEADER, blob)
+  local empty = struct.pack(SLOT, 0, 0)
+
+  local cur_cnt, cur_sum = read_slot(blob, last_seen % m)
+  if cur_cnt > 0 then
+    cnt_win = cnt_win + cur_cnt
+    sum_win = sum_win + cur_sum
+  end
+
+  for t = last_seen - n, step - n - 1 do
+    local j = t % m
+    local c, s = read_slot(blob, j)
+    if c > 0 then
+      cnt_win = cnt_win - c
+      sum_win = sum_win - s
+      redis.call("SETRANGE", key, slot_pos(j), empty)
+    end
+  end
+
+  if cnt_win == 0 then
+    sum_win = 0
+  end
+
+  redis.call("SETRANGE", key, 0, struct.pack(HEADER, n, SCHEMA_VERSION, step, cnt_win, sum_win))
+  return 1
+end
+
+-- Pre-add aggregates relative to last_seen: (cnt_1h, sum_1h, cnt_24h, sum_24h), sums as strings.
+local function ring_read(key, n, last_seen)
+  local blob = redis.call("GET", key)
+  local _, _, _, cnt_win, sum_win = struct.unpack(HEADER, blob)
+  local c, s = read_slot(blob, (last_seen - 1) % (n + 1))
+  return c, string.format("%.17g", s), cnt_win, string.format("%.17g", sum_win)
+end
+
+local function ring_add(key, n, last_seen, amount)
+  local pos = slot_pos(last_seen % (n + 1))
+  local c, s = struct.unpack(SLOT, redis.call("GETRANGE", key, pos, pos + SLOT_SIZE - 1))
+  redis.call("SETRANGE", key, pos, struct.pack(SLOT, c + 1, s + amount))
+end
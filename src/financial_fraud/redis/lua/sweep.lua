@@ -0,0 +1,23 @@
+-- Delete a dest key idle for more than N steps at current_step; it would only ever read as zeros.
+-- Works on both encodings: hash (dest_last_seen_step field) and packed (i4 at byte 4).
+local key     = KEYS[1]
+local current = tonumber(ARGV[1])
+local N       = tonumber(ARGV[2])
+
+local kind = redis.call("TYPE", key)["ok"]
+local last_seen
+if kind == "hash" then
+  last_seen = tonumber(redis.call("HGET", key, "dest_last_seen_step"))
+elseif kind == "string" then
+  local head = redis.call("GETRANGE", key, 0, 7)
+  if #head == 8 then
+    local _, _, ls = struct.unpack("<I2I2i4", head)
+    last_seen = ls
+  end
+end
+
+if last_seen and current - last_seen > N then
+  redis.call("UNLINK", key)
+  return 1
+end
+return 0
@@ -0,0 +1,67 @@
+"""
+Migrate dest hashes to the current ring-buffer schema.
+
+The dest scripts migrate a v1 hash the first time they touch it; this rewrites every key up front.
+"""
+
+from __future__ import annotations
+
+import logging
+
+import redis
+
+from financial_fraud.redis.infra import RedisConfig
+
+log = logging.getLogger(__name__)
+
+
+def migrate_dest_schema(
+    r: redis.Redis,
+    *,
+    cfg: RedisConfig,
+    lua_shas: dict[str, str],
+    batch: int = 1_000,
+) -> dict[str, int]:
+    """Run migrate.lua over every dest key; returns counts of migrated, current and mismatched keys."""
+    sha = lua_shas["dest_migrate"]
+    N = int(cfg.dest_bucket_N)
+    counts = {"migrated": 0, "current": 0, "mismatched": 0}
+
+    def flush(keys: list[str]) -> None:
+        pipe = r.pipeline(transaction=False)
+        for k in keys:
+            pipe.evalsha(sha, 1, k, N)
+        for res in pipe.execute():
+            if res == 1:
+                counts["migrated"] += 1
+            elif res == 0:
+                counts["current"] += 1
+            else:
+                counts["mismatched"] += 1
+
+    keys: list[str] = []
+    for k in r.scan_iter(match=f"{cfg.live_prefix}dest:*", count=batch):
+        keys.append(k)
+        if len(keys) >= batch:
+            flush(keys)
+            keys = []
+    if keys:
+        flush(keys)
+
+    log.info(
+        "dest_schema_migrated migrated=%d current=%d mismatched=%d",
+        counts["migrated"],
+        counts["current"],
+        counts["mismatched"],
+    )
+    return counts
+
+
+if __name__ == "__main__":
+    from financial_fraud.redis.connect import connect_redis, redis_config
+    from financial_fraud.serving.startup import register_lua_scripts
+
+    logging.basicConfig(level=logging.INFO)
+    cfg = redis_config()
+    r = connect_redis(cfg)
+    print(migrate_dest_schema(r, cfg=cfg, lua_shas=register_lua_scripts(r)))
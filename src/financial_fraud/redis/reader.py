@@ -4,10 +4,37 @@ Read entities from redis.
 
 from __future__ import annotations
 
+import struct
+
 import redis
+from redis.client import NEVER_DECODE
 
 from financial_fraud.redis.infra import RedisConfig, make_entity_key
 
+# Packed dest layout written by ring_packed.lua (little-endian, no padding).
+PACKED_HEADER = struct.Struct("<HHiId")  # N, schema version, last_seen, cnt_win, sum_win
+PACKED_SLOT = struct.Struct("<Id")  # cnt, sum
+
+
+def decode_dest_state(blob: bytes) -> dict[str, str]:
+    """Decode a packed dest string into the same fields the hash layout stores."""
+    N, version, last_seen, cnt_win, sum_win = PACKED_HEADER.unpack_from(blob, 0)
+    expected = PACKED_HEADER.size + PACKED_SLOT.size * (N + 1)
+    if len(blob) != expected:
+        raise ValueError(f"Packed dest state is {len(blob)} bytes, expected {expected} for N={N}")
+
+    state = {
+        "dest_schema_N": str(N),
+        "dest_schema_v": str(version),
+        "dest_last_seen_step": str(last_seen),
+        "dest_cnt_win": str(cnt_win),
+        "dest_sum_win": repr(sum_win),
+    }
+    for j, (cnt, s) in enumerate(PACKED_SLOT.iter_unpack(blob[PACKED_HEADER.size:])):
+        state[f"dest_cnt_s{j}"] = str(cnt)
+        state[f"dest_sum_s{j}"] = repr(s)
+    return state
+
 
 def read_entity(
     r: redis.Redis,
@@ -16,4 +43,7 @@ def read_entity(
     dest_id: str,
 ) -> dict[str, str]:
     dest_key = make_entity_key(cfg.live_prefix, "dest", dest_id)
+    if cfg.dest_encoding == "packed":
+        blob = r.execute_command("GET", dest_key, **{NEVER_DECODE: True})
+        return decode_dest_state(blob) if blob else {}
     return r.hgetall(dest_key) or {}
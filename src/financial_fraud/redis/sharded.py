@@ -0,0 +1,137 @@
+"""
+Client-side sharded feature store: route each key to one of several Redis nodes by consistent hashing.
+
+ShardedRedis stands in for redis.Redis on the paths the feature store uses (single-key commands,
+EVALSHA, non-transactional pipelines, SCAN). Every dest script touches only KEYS[1], so no
+command ever spans nodes.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Any, Iterator, Sequence
+
+import redis
+
+_VNODES = 128
+
+
+def _point(s: str) -> int:
+    return int.from_bytes(hashlib.md5(s.encode("utf-8")).digest()[:8], "big")
+
+
+def parse_shard(spec: str) -> tuple[str, int]:
+    """"host:port" -> (host, port)."""
+    host, _, port = spec.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Shard must be 'host:port', got {spec!r}")
+    return host, int(port)
+
+
+def _key_of(name: str, args: Sequence[Any]) -> Any:
+    if name in ("evalsha", "eval"):
+        if len(args) < 3 or int(args[1]) < 1:
+            raise ValueError(f"Sharded {name} needs at least one key")
+        return args[2]
+    if name == "execute_command":
+        return args[1]
+    if not args:
+        raise ValueError(f"Cannot route {name!r} without a key")
+    return args[0]
+
+
+class ShardedRedis:
+    def __init__(self, nodes: Sequence[redis.Redis], *, names: Sequence[str]) -> None:
+        if not nodes or len(nodes) != len(names):
+            raise ValueError("ShardedRedis needs one name per node")
+        self.nodes = list(nodes)
+        self.names = list(names)
+        ring = sorted((_point(f"{name}#{v}"), i) for i, name in enumerate(names) for v in range(_VNODES))
+        self._points = [p for p, _ in ring]
+        self._owners = [i for _, i in ring]
+        self._pool = ThreadPoolExecutor(max_workers=len(nodes), thread_name_prefix="shard")
+
+    def shard_index(self, key: str) -> int:
+        i = bisect.bisect(self._points, _point(key)) % len(self._points)
+        return self._owners[i]
+
+    def node_for(self, key: str) -> redis.Redis:
+        return self.nodes[self.shard_index(key)]
+
+    def __getattr__(self, name: str):
+        def routed(*args, **kwargs):
+            return getattr(self.node_for(_key_of(name, args)), name)(*args, **kwargs)
+        return routed
+
+    def _all(self, name: str, *args, **kwargs) -> list[Any]:
+        return list(self._pool.map(lambda n: getattr(n, name)(*args, **kwargs), self.nodes))
+
+    def ping(self) -> bool:
+        return all(self._all("ping"))
+
+    def flushdb(self) -> bool:
+        return all(self._all("flushdb"))
+
+    def close(self) -> None:
+        self._all("close")
+        self._pool.shutdown(wait=False)
+
+    def script_load(self, script: str) -> str:
+        shas = set(self._all("script_load", script))
+        if len(shas) != 1:
+            raise RuntimeError(f"Nodes returned different SHAs for one script: {sorted(shas)}")
+        return shas.pop()
+
+    def scan(self, cursor: int = 0, match: str | None = None, count: int | None = None) -> tuple[int, list[Any]]:
+        """SCAN across nodes one after another; the cursor encodes node index and node cursor."""
+        n = len(self.nodes)
+        node, node_cursor = cursor % n, cursor // n
+        node_cursor, keys = self.nodes[node].scan(cursor=node_cursor, match=match, count=count)
+        if node_cursor == 0:
+            node += 1
+            if node == n:
+                return 0, keys
+        return node_cursor * n + node, keys
+
+    def scan_iter(self, match: str | None = None, count: int | None = None) -> Iterator[Any]:
+        return chain.from_iterable(node.scan_iter(match=match, count=count) for node in self.nodes)
+
+    def pipeline(self, transaction: bool = False) -> "ShardedPipeline":
+        if transaction:
+            raise ValueError("Sharded pipelines cannot be transactional")
+        return ShardedPipeline(self)
+
+
+class ShardedPipeline:
+    """Queue commands per node; execute() runs the node pipelines concurrently and returns replies in call order."""
+
+    def __init__(self, sharded: ShardedRedis) -> None:
+        self._sharded = sharded
+        self._order: list[tuple[int, int]] = []
+        self._pipes: dict[int, Any] = {}
+
+    def __getattr__(self, name: str):
+        def queued(*args, **kwargs):
+            shard = self._sharded.shard_index(_key_of(name, args))
+            pipe = self._pipes.get(shard)
+            if pipe is None:
+                pipe = self._pipes[shard] = self._sharded.nodes[shard].pipeline(transaction=False)
+            self._order.append((shard, len(pipe)))
+            getattr(pipe, name)(*args, **kwargs)
+            return self
+        return queued
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def execute(self, raise_on_error: bool = True) -> list[Any]:
+        shards = list(self._pipes)
+        replies = dict(zip(shards, self._sharded._pool.map(
+            lambda s: self._pipes[s].execute(raise_on_error=raise_on_error), shards
+        )))
+        out = [replies[shard][i] for shard, i in self._order]
+        self._order = []
+        return out
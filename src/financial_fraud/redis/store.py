@@ -0,0 +1,186 @@
+"""
+Thread-safe feature store client: bounded connection pools, NOSCRIPT recovery and pool metrics.
+
+FeatureStore stands in for the redis client (r=...) on every serving and warm start path.
+Scripts loaded through it are remembered, so after a Redis restart the first NOSCRIPT reply
+reloads them and the failed calls are retried.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from time import perf_counter
+from typing import Any
+
+import redis
+from redis.exceptions import ConnectionError as RedisConnectionError, NoScriptError
+
+from financial_fraud.redis.infra import RedisConfig
+from financial_fraud.redis.sharded import ShardedRedis, parse_shard
+
+log = logging.getLogger(__name__)
+
+# Message of the ConnectionError BlockingConnectionPool raises when no connection frees up in time.
+_POOL_EXHAUSTED = "No connection available."
+
+
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    """BlockingConnectionPool that records checkouts, wait time, checkout timeouts and connect errors.
+
+    timeouts counts only checkouts that found the pool exhausted for the whole timeout;
+    refused or reset connections while connecting are connect_errors.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connect_errors = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def get_connection(self, *args, **kwargs):
+        t0 = perf_counter()
+        try:
+            conn = super().get_connection(*args, **kwargs)
+        except RedisConnectionError as e:
+            exhausted = str(e) == _POOL_EXHAUSTED
+            with self._stats_lock:
+                if exhausted:
+                    self.timeouts += 1
+                else:
+                    self.connect_errors += 1
+            raise
+        waited = perf_counter() - t0
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return conn
+
+    def stats(self) -> dict[str, Any]:
+        idle = sum(1 for c in list(self.pool.queue) if c is not None)
+        created = len(self._connections)
+        with self._stats_lock:
+            checkouts = self.checkouts
+            return {
+                "max_connections": self.max_connections,
+                "created": created,
+                "in_use": created - idle,
+                "idle": idle,
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "connect_errors": self.connect_errors,
+                "wait_ms_avg": 1e3 * self.wait_seconds_total / checkouts if checkouts else 0.0,
+                "wait_ms_max": 1e3 * self.wait_seconds_max,
+            }
+
+
+class FeatureStore:
+    def __init__(self, cfg: RedisConfig, *, max_connections: int = 32, timeout: float = 5.0) -> None:
+        self.cfg = cfg
+        nodes = [(cfg.host, cfg.port)] if not cfg.shards else [parse_shard(s) for s in cfg.shards]
+        self.pools = [
+            MeteredConnectionPool(
+                host=host,
+                port=port,
+                db=cfg.db,
+                decode_responses=True,
+                max_connections=max_connections,
+                timeout=timeout,
+            )
+            for host, port in nodes
+        ]
+        clients = [redis.Redis(connection_pool=pool) for pool in self.pools]
+        self.client = ShardedRedis(clients, names=cfg.shards) if cfg.shards else clients[0]
+        self._scripts: dict[str, str] = {}
+        self._reload_lock = threading.Lock()
+        self._script_gen = 0
+        self.script_reloads = 0
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+    def script_load(self, script: str) -> str:
+        sha = self.client.script_load(script)
+        self._scripts[sha] = script
+        return sha
+
+    def reload_scripts(self, *, seen_gen: int | None = None) -> None:
+        """SCRIPT LOAD every remembered script. Callers that saw NOSCRIPT pass the generation they
+        started under, so concurrent failures from one restart trigger a single reload."""
+        with self._reload_lock:
+            if seen_gen is not None and seen_gen != self._script_gen:
+                return
+            for sha, script in self._scripts.items():
+                if self.client.script_load(script) != sha:
+                    raise RuntimeError(f"Reloaded script does not match SHA {sha}")
+            self._script_gen += 1
+            self.script_reloads += 1
+        log.warning("lua_scripts_reloaded count=%d reloads=%d", len(self._scripts), self.script_reloads)
+
+    def evalsha(self, sha: str, numkeys: int, *keys_and_args):
+        gen = self._script_gen
+        try:
+            return self.client.evalsha(sha, numkeys, *keys_and_args)
+        except NoScriptError:
+            if sha not in self._scripts:
+                raise
+            self.reload_scripts(seen_gen=gen)
+            return self.client.evalsha(sha, numkeys, *keys_and_args)
+
+    def pipeline(self, transaction: bool = False) -> "StorePipeline":
+        return StorePipeline(self, transaction=transaction)
+
+    def pool_stats(self) -> dict[str, Any]:
+        """Per-node pool utilisation, plus totals across nodes."""
+        nodes = [p.stats() for p in self.pools]
+        summed = ("max_connections", "created", "in_use", "idle", "checkouts", "timeouts", "connect_errors")
+        total: dict[str, Any] = {k: sum(n[k] for n in nodes) for k in summed}
+        total["wait_ms_max"] = max(n["wait_ms_max"] for n in nodes)
+        total["script_reloads"] = self.script_reloads
+        return {"total": total, "nodes": nodes}
+
+
+class StorePipeline:
+    """Pipeline that retries only the commands that failed with NOSCRIPT, after reloading scripts."""
+
+    def __init__(self, store: FeatureStore, *, transaction: bool) -> None:
+        self._store = store
+        self._transaction = transaction
+        self._pipe = store.client.pipeline(transaction=transaction)
+        self._calls: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queued(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            getattr(self._pipe, name)(*args, **kwargs)
+            return self
+        return queued
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def execute(self, raise_on_error: bool = True) -> list[Any]:
+        calls, self._calls = self._calls, []
+        gen = self._store._script_gen
+        results = self._pipe.execute(raise_on_error=False)
+
+        failed = [i for i, res in enumerate(results) if isinstance(res, NoScriptError)]
+        retryable = all(calls[i][0] == "evalsha" and calls[i][1][0] in self._store._scripts for i in failed)
+        if failed and retryable and not self._transaction:
+            self._store.reload_scripts(seen_gen=gen)
+            retry = self._store.client.pipeline(transaction=False)
+            for i in failed:
+                name, args, kwargs = calls[i]
+                getattr(retry, name)(*args, **kwargs)
+            for i, res in zip(failed, retry.execute(raise_on_error=False)):
+                results[i] = res
+
+        if raise_on_error:
+            for res in results:
+                if isinstance(res, Exception):
+                    raise res
+        return results
@@ -0,0 +1,92 @@
+"""
+Evict idle dest entities.
+
+A dest whose dest_last_seen_step is more than N steps behind the stream reads as all-zero
+features, and its next transaction resets the ring to the same state a fresh key gets, so
+deleting it changes nothing the model sees. current_step must be a low watermark: no
+transaction with a smaller step may still be served.
+"""
+
+from __future__ import annotations
+
+import logging
+
+import redis
+
+from financial_fraud.redis.infra import RedisConfig
+
+log = logging.getLogger(__name__)
+
+
+class IdleDestSweeper:
+    """Incremental SCAN over dest keys; each tick() checks one SCAN page and deletes idle keys."""
+
+    def __init__(self, r: redis.Redis, *, cfg: RedisConfig, lua_shas: dict[str, str], batch: int = 500) -> None:
+        self.r = r
+        self.cfg = cfg
+        self.sha = lua_shas["dest_sweep"]
+        self.batch = int(batch)
+        self.cursor = 0
+        self.scanned = 0
+        self.deleted = 0
+        self.passes = 0
+
+    def tick(self, current_step: int) -> int:
+        """Sweep the next page at current_step; returns keys deleted."""
+        self.cursor, keys = self.r.scan(
+            cursor=self.cursor,
+            match=f"{self.cfg.live_prefix}dest:*",
+            count=self.batch,
+        )
+        deleted = 0
+        if keys:
+            N = int(self.cfg.dest_bucket_N)
+            pipe = self.r.pipeline(transaction=False)
+            for k in keys:
+                pipe.evalsha(self.sha, 1, k, int(current_step), N)
+            deleted = sum(int(res) for res in pipe.execute())
+
+        self.scanned += len(keys)
+        self.deleted += deleted
+        if self.cursor == 0:
+            self.passes += 1
+            log.info(
+                "dest_sweep_pass passes=%d step=%d scanned=%d deleted=%d",
+                self.passes,
+                current_step,
+                self.scanned,
+                self.deleted,
+            )
+        return deleted
+
+
+def sweep_idle_dests(
+    r: redis.Redis,
+    *,
+    cfg: RedisConfig,
+    lua_shas: dict[str, str],
+    current_step: int,
+    batch: int = 1_000,
+) -> dict[str, int]:
+    """One full pass over the dest keys; returns counts of scanned and deleted keys."""
+    sweeper = IdleDestSweeper(r, cfg=cfg, lua_shas=lua_shas, batch=batch)
+    while True:
+        sweeper.tick(current_step)
+        if sweeper.cursor == 0:
+            return {"scanned": sweeper.scanned, "deleted": sweeper.deleted}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from financial_fraud.redis.connect import connect_redis, redis_config
+    from financial_fraud.serving.startup import register_lua_scripts
+
+    p = argparse.ArgumentParser()
+    p.add_argument("--step", type=int, required=True, help="Lowest step still to be served.")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cfg = redis_config()
+    r = connect_redis(cfg)
+    print(sweep_idle_dests(r, cfg=cfg, lua_shas=register_lua_scripts(r), current_step=args.step))
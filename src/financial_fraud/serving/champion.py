@@ -0,0 +1,270 @@
+"""
+Hot champion reload: serving keeps scoring while a newly promoted champion loads in the background.
+
+ChampionHolder.current is an immutable ServingModel (model, threshold, explainer). A request reads
+it once and uses that snapshot throughout, so replacing the reference never mixes two champions
+inside one request and nothing in flight is dropped. A poller thread watches the champion pointer:
+a local champion.json (such as the one jobs/30_promotion.py writes) or the registry's. On a new run
+it fetches the files through the artifact cache, loads the model, checks it against what serving
+produces (artifact_version and the feature spec's input columns), warms it on probe rows (and builds
+its explainer), and only then assigns the new snapshot. A rejected run is logged and skipped until
+the pointer moves again; a failed load is retried on the next poll. Either way the old champion
+keeps serving.
+
+Loading allocates enough objects to set off full garbage collections, which hold the GIL for
+50-150 ms and stall the serving threads. Collection is deferred while a champion loads and the
+loaded objects are then frozen out of later collections (gc.freeze). The cost is that a replaced
+champion's objects that are only reachable through reference cycles are never reclaimed; swaps are
+rare.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Sequence
+
+from financial_fraud.config import CURRENT_ARTIFACT_VERSION, REPO_ID, REVISION
+from financial_fraud.io.artifact_cache import ArtifactCache
+from financial_fraud.modeling.feature_spec.load import load_feature_spec
+from financial_fraud.serving.explain_worker import AsyncExplainer
+from financial_fraud.serving.startup import (
+    champion_pointer,
+    champion_run_id,
+    fetch_run_files,
+    hf_offline,
+    load_cached_artifact,
+    serving_model,
+)
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ServingModel:
+    """One champion as serve() takes it; replaced as a whole on reload."""
+    run_id: str
+    champion_ptr: dict[str, Any]
+    model: Any
+    threshold: float | None
+    artifact_version: int | None
+    explainer_bundle: Any = None
+
+
+@contextmanager
+def _collections_deferred():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.freeze()
+        if enabled:
+            gc.enable()
+
+
+def spec_features(model) -> list[str]:
+    """Input columns the model's feature spec step requires."""
+    return [c["name"] for c in model.named_steps["spec"].spec.get("features", [])]
+
+
+class ChampionHolder:
+    """Loads the champion on construction, then start() polls for a new one every poll_s seconds.
+
+    Use as a context manager or call close(). check() runs one poll on the calling thread.
+    """
+
+    def __init__(
+        self,
+        *,
+        repo_id: str = REPO_ID,
+        revision: str = REVISION,
+        pointer_path: str | Path | None = None,
+        fast_path: bool = True,
+        explain: bool = False,
+        explain_async: bool = False,
+        poll_s: float = 30.0,
+        artifact_version: int = CURRENT_ARTIFACT_VERSION,
+        expected_features: Sequence[str] | None = None,
+        warm_rows: list[dict[str, Any]] | None = None,
+        cache: ArtifactCache | None = None,
+        offline: bool | None = None,
+    ) -> None:
+        self.repo_id = repo_id
+        self.revision = revision
+        self.pointer_path = Path(pointer_path) if pointer_path is not None else None
+        self.fast_path = fast_path
+        self.explain = explain or explain_async
+        self.explain_async = explain_async
+        self.poll_s = float(poll_s)
+        self.artifact_version = artifact_version
+        if expected_features is None:
+            expected_features = [c["name"] for c in load_feature_spec().get("features", [])]
+        self.expected_features = list(expected_features)
+        self.warm_rows = warm_rows
+        self.cache = cache if cache is not None else ArtifactCache()
+        self.offline = hf_offline() if offline is None else offline
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # AsyncExplainers of replaced champions: requests that read the old snapshot just before
+        # the swap may still submit to them, so they are closed one poll later.
+        self._retired: list[AsyncExplainer] = []
+
+        self.swaps = 0
+        self.rejected = 0
+        self.failures = 0
+
+        champion_ptr = self._pointer()
+        run_id = champion_run_id(champion_ptr)
+        loaded, reason = self._load(champion_ptr)
+        if loaded is None:
+            raise ValueError(f"Champion run {run_id} rejected: {reason}")
+        self._current = loaded
+        self._seen = run_id
+
+    @property
+    def current(self) -> ServingModel:
+        return self._current
+
+    def __enter__(self) -> "ChampionHolder":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def start(self) -> "ChampionHolder":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="champion-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._close_retired()
+        if isinstance(self._current.explainer_bundle, AsyncExplainer):
+            self._current.explainer_bundle.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {"run_id": self._current.run_id, "swaps": self.swaps, "rejected": self.rejected, "failures": self.failures}
+
+    def check(self) -> bool:
+        """Poll the pointer once; True when a new champion was swapped in."""
+        self._close_retired()
+        try:
+            champion_ptr = self._pointer()
+            run_id = champion_run_id(champion_ptr)
+        except Exception:
+            self.failures += 1
+            log.warning("champion_pointer_check_failed", exc_info=True)
+            return False
+        if run_id == self._seen:
+            return False
+
+        try:
+            loaded, reason = self._load(champion_ptr)
+        except Exception:
+            self.failures += 1
+            log.exception("champion_load_failed run_id=%s", run_id)
+            return False
+        self._seen = run_id
+        if loaded is None:
+            self.rejected += 1
+            log.warning("champion_rejected run_id=%s reason=%s", run_id, reason)
+            return False
+
+        old, self._current = self._current, loaded
+        self.swaps += 1
+        if isinstance(old.explainer_bundle, AsyncExplainer):
+            self._retired.append(old.explainer_bundle)
+        log.info("champion_swapped run_id=%s previous=%s", run_id, old.run_id)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            self.check()
+
+    def _pointer(self) -> dict[str, Any]:
+        if self.pointer_path is not None:
+            return json.loads(self.pointer_path.read_text(encoding="utf-8"))
+        return champion_pointer(repo_id=self.repo_id, revision=self.revision, cache=self.cache, offline=self.offline)
+
+    def _load(self, champion_ptr: dict[str, Any]) -> tuple[ServingModel | None, str | None]:
+        """(the warmed champion, None), or (None, why it cannot serve)."""
+        with _collections_deferred():
+            return self._load_warm(champion_ptr)
+
+    def _load_warm(self, champion_ptr: dict[str, Any]) -> tuple[ServingModel | None, str | None]:
+        run_id = fetch_run_files(
+            champion_ptr,
+            repo_id=self.repo_id,
+            revision=self.revision,
+            fast_path=self.fast_path,
+            cache=self.cache,
+            offline=self.offline,
+        )
+        artifact = load_cached_artifact(run_id, cache=self.cache)
+        version = getattr(artifact, "artifact_version", None)
+        if version != self.artifact_version:
+            return None, f"artifact_version={version}, serving expects {self.artifact_version}"
+
+        model, threshold = serving_model(artifact, run_id, fast_path=self.fast_path, cache=self.cache)
+        features = spec_features(model)
+        if set(features) != set(self.expected_features):
+            missing = sorted(set(self.expected_features) - set(features))
+            extra = sorted(set(features) - set(self.expected_features))
+            return None, f"input features differ from serving's: model lacks {missing}, wants {extra}"
+
+        explainer_bundle = self._warm(model)
+        if self.explain_async and explainer_bundle is not None:
+            explainer_bundle = AsyncExplainer(explainer_bundle)
+        return ServingModel(
+            run_id=run_id,
+            champion_ptr=champion_ptr,
+            model=model,
+            threshold=threshold,
+            artifact_version=version,
+            explainer_bundle=explainer_bundle,
+        ), None
+
+    def _warm(self, model):
+        """Score the warm rows (probe rows of the serving plan by default) and build the explainer,
+        so the first requests after the swap cost what later ones do; returns the explainer bundle."""
+        import pandas as pd
+
+        from financial_fraud.serving.plan import probe_frame
+        from financial_fraud.serving.steps.explain import explain_rows, top_factor_explainer
+
+        rows = self.warm_rows
+        plan = getattr(model, "plan", None)
+        if rows is None and plan is not None:
+            rows = probe_frame(plan).to_dict(orient="records")
+        if rows:
+            for _ in range(3):
+                if plan is not None:
+                    model.predict_proba_rows(rows)
+                else:
+                    model.predict_proba(pd.DataFrame(rows))
+
+        if not self.explain:
+            return None
+        try:
+            explainer_bundle = top_factor_explainer(model)
+            if rows:
+                explain_rows(explainer_bundle, rows)
+        except Exception:
+            log.warning("explainer_unavailable", exc_info=True)
+            return None
+        return explainer_bundle
+
+    def _close_retired(self) -> None:
+        while self._retired:
+            self._retired.pop().close()
@@ -0,0 +1,296 @@
+"""
+Parallel scoring that keeps per-destination order.
+
+Each transaction is routed to a worker process by a stable hash of its nameDest, so a dest is
+only ever updated by one worker, and that worker applies its transactions in submission order.
+Every worker holds its own Redis connection and model copy. Results carry the submission
+sequence number and come back in submission order, so the audit log matches serve().
+
+model may also be a zero-argument loader (startup.cached_model_loader); each worker then loads it
+itself, memory-mapped from the local artifact cache, rather than unpickling a private copy.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import queue
+import traceback
+import zlib
+from typing import Any, Iterable, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from financial_fraud.redis.connect import connect_redis
+from financial_fraud.redis.infra import RedisConfig
+from financial_fraud.serving.serve import AUDIT_COLS, entity_items, score_batch, validated_columns
+from financial_fraud.serving.steps.base import silver_base
+from financial_fraud.serving.steps.entity_features import get_entity_features_many
+from financial_fraud.serving.steps.validate import validate_base
+
+log = logging.getLogger(__name__)
+
+
+def dest_partition(name_dest: Any, n_partitions: int) -> int:
+    """Worker index for a raw nameDest; stable across processes and runs."""
+    key = "" if name_dest is None else str(name_dest).strip()
+    return zlib.crc32(key.encode("utf-8")) % n_partitions
+
+
+class DestDispatcher:
+    """Scores transactions on `workers` processes, partitioned by destination.
+
+    Use as a context manager; score() yields (seq, out) in submission order, with out=None for
+    invalid transactions, and score_many() mirrors serve_many().
+    """
+
+    def __init__(
+        self,
+        *,
+        cfg: RedisConfig,
+        model,
+        threshold: float | None = None,
+        explain: bool = False,
+        workers: int = 4,
+        chunk: int = 1_024,
+        max_queued_chunks: int = 4,
+    ) -> None:
+        if int(workers) < 1:
+            raise ValueError(f"workers must be >= 1, got {workers}")
+        self.cfg = cfg
+        self.model = model
+        self.threshold = threshold
+        self.explain = explain
+        self.workers = int(workers)
+        self.chunk = max(1, int(chunk))
+        self.max_queued_chunks = int(max_queued_chunks)
+        self._procs: list = []
+        self._inboxes: list = []
+        self._results = None
+        self._seq = 0
+
+    def __enter__(self) -> "DestDispatcher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def start(self) -> None:
+        # spawn: each worker opens its own Redis connection; nothing is inherited.
+        ctx = mp.get_context("spawn")
+        self._results = ctx.Queue()
+        self._inboxes = [ctx.Queue(maxsize=self.max_queued_chunks) for _ in range(self.workers)]
+        self._procs = [
+            ctx.Process(
+                target=_worker,
+                args=(i, self.cfg, self.model, self.threshold, self.explain, inbox, self._results),
+                name=f"score-{i}",
+                daemon=True,
+            )
+            for i, inbox in enumerate(self._inboxes)
+        ]
+        for p in self._procs:
+            p.start()
+
+    def close(self) -> None:
+        # Keep draining results while stopping: a worker cannot exit until its queued results
+        # are flushed, and a full inbox only frees up while its worker runs.
+        pending = list(zip(self._procs, self._inboxes))
+        while pending:
+            blocked = []
+            for p, inbox in pending:
+                if not p.is_alive():
+                    continue
+                try:
+                    inbox.put(None, timeout=0.1)
+                except queue.Full:
+                    blocked.append((p, inbox))
+            pending = blocked
+            self._discard_results()
+        for p in self._procs:
+            while p.is_alive():
+                p.join(timeout=0.1)
+                self._discard_results()
+        self._procs, self._inboxes = [], []
+
+    def _discard_results(self) -> None:
+        try:
+            while True:
+                self._results.get_nowait()
+        except queue.Empty:
+            pass
+
+    def score(self, txs: Iterable[Mapping[str, Any]]) -> Iterator[tuple[int, dict[str, Any] | None]]:
+        """Submit txs and yield (seq, out) in submission order as results arrive.
+
+        An Arrow Table or RecordBatch is split by worker column-wise and each worker scores its
+        part through the columnar serve path; a list of mappings goes row by row.
+        """
+        if not self._procs:
+            raise RuntimeError("DestDispatcher is not started")
+
+        ready: dict[int, dict[str, Any] | None] = {}
+        next_seq = self._seq
+
+        for parts in self._chunks(txs):
+            for i, items in enumerate(parts):
+                if items:
+                    self._put(i, items, ready)
+            self._collect(ready, block=False)
+            while next_seq in ready:
+                yield next_seq, ready.pop(next_seq)
+                next_seq += 1
+
+        while next_seq < self._seq:
+            if next_seq not in ready:
+                self._collect(ready, block=True)
+                continue
+            yield next_seq, ready.pop(next_seq)
+            next_seq += 1
+
+    def _chunks(self, txs) -> Iterator[list]:
+        """Per-worker work items for each chunk of up to self.chunk txs, numbering them in order.
+
+        Items are lists of (seq, tx), or (seqs, Arrow batch) for Arrow input; None when empty.
+        """
+        if hasattr(txs, "to_pylist"):
+            for start in range(0, txs.num_rows, self.chunk):
+                part = txs.slice(start, self.chunk)
+                n = part.num_rows
+                seqs = np.arange(self._seq, self._seq + n, dtype=np.int64)
+                self._seq += n
+                names = part.column("nameDest").to_pylist() if "nameDest" in part.schema.names else [None] * n
+                owner = np.fromiter((dest_partition(x, self.workers) for x in names), dtype=np.int64, count=n)
+                yield [
+                    (seqs[mask], part.filter(pa.array(mask))) if mask.any() else None
+                    for mask in (owner == i for i in range(self.workers))
+                ]
+            return
+
+        buffers: list[list] = [[] for _ in range(self.workers)]
+        buffered = 0
+        for tx in txs:
+            buffers[dest_partition(tx.get("nameDest"), self.workers)].append((self._seq, tx))
+            self._seq += 1
+            buffered += 1
+            if buffered >= self.chunk:
+                yield buffers
+                buffers = [[] for _ in range(self.workers)]
+                buffered = 0
+        if buffered:
+            yield buffers
+
+    def score_many(self, txs: Iterable[Mapping[str, Any]]) -> tuple[list[dict[str, Any]], pd.DataFrame]:
+        outs = [out for _, out in self.score(txs) if out is not None]
+        return outs, pd.DataFrame(outs).reindex(columns=AUDIT_COLS)
+
+    def _collect(self, ready: dict, *, block: bool) -> None:
+        while True:
+            try:
+                msg = self._results.get(timeout=1.0) if block else self._results.get_nowait()
+            except queue.Empty:
+                if block:
+                    self._check_workers()
+                    continue
+                return
+            kind, payload = msg
+            if kind == "error":
+                raise RuntimeError(f"Scoring worker failed:\n{payload}")
+            ready.update(payload)
+            block = False
+
+    def _put(self, worker: int, items: list, ready: dict) -> None:
+        while True:
+            try:
+                self._inboxes[worker].put(items, timeout=0.1)
+                return
+            except queue.Full:
+                self._collect(ready, block=False)
+                self._check_workers()
+
+    def _check_workers(self) -> None:
+        dead = [p for p in self._procs if not p.is_alive()]
+        if not dead:
+            return
+        # A worker that failed posted its traceback before exiting; prefer that over the exit code.
+        try:
+            while True:
+                kind, payload = self._results.get(timeout=0.1)
+                if kind == "error":
+                    raise RuntimeError(f"Scoring worker failed:\n{payload}")
+        except queue.Empty:
+            pass
+        raise RuntimeError(f"Scoring worker {dead[0].name} exited with code {dead[0].exitcode}")
+
+
+def _worker(
+    index: int,
+    cfg: RedisConfig,
+    model,
+    threshold: float | None,
+    explain: bool,
+    inbox,
+    results,
+) -> None:
+    from financial_fraud.serving.startup import register_lua_scripts
+    from financial_fraud.serving.steps.explain import top_factor_explainer
+
+    if callable(model):
+        model = model()
+    r = connect_redis(cfg)
+    lua_shas = register_lua_scripts(r)
+    explainer_bundle = None
+    if explain:
+        try:
+            explainer_bundle = top_factor_explainer(model)
+        except Exception:
+            log.warning("explainer_unavailable worker=%d", index, exc_info=True)
+
+    try:
+        while True:
+            items = inbox.get()
+            if items is None:
+                return
+            try:
+                results.put(("ok", _score_items(
+                    items,
+                    r=r,
+                    cfg=cfg,
+                    model=model,
+                    threshold=threshold,
+                    explainer_bundle=explainer_bundle,
+                    lua_shas=lua_shas,
+                )))
+            except Exception:
+                results.put(("error", traceback.format_exc()))
+                return
+    finally:
+        r.close()
+
+
+def _score_items(items, *, r, cfg, model, threshold, explainer_bundle, lua_shas) -> dict[int, dict[str, Any] | None]:
+    if isinstance(items, tuple):
+        seqs, batch = items
+        idx, bases = validated_columns(batch)
+        out: dict[int, dict[str, Any] | None] = dict.fromkeys(seqs.tolist())
+        seqs = seqs[idx].tolist()
+        kept = batch.take(idx).to_pylist()
+    else:
+        out = {}
+        seqs, kept, bases = [], [], []
+        for seq, tx in items:
+            base = silver_base(tx)
+            if validate_base(base):
+                seqs.append(seq)
+                kept.append(tx)
+                bases.append(base)
+            else:
+                out[seq] = None
+    if kept:
+        dests = get_entity_features_many(r=r, cfg=cfg, items=entity_items(bases), lua_shas=lua_shas)
+        outs = score_batch(kept, bases, dests, model=model, threshold=threshold, explainer_bundle=explainer_bundle)
+        out.update(zip(seqs, outs))
+    return out
@@ -0,0 +1,171 @@
+"""
+Background SHAP explanations: flagged transactions are explained in batches off the scoring path.
+
+serve()/serve_many() given an AsyncExplainer in place of the explainer bundle return flagged
+results with EXPLANATION_PENDING and submit them here. A single worker thread gathers whatever
+was submitted within max_wait_ms (up to max_batch rows), runs one shap_values call for the lot and
+writes each explanation into its out dict, so the record picks up the text once it is ready.
+Anything copied from out before then (such as serve()'s audit DataFrame) still says
+EXPLANATION_PENDING; an on_explained callback, per explainer or per submit, is called with out once
+its text is in, so such copies can be updated.
+
+The bundle may also be given as a zero-argument factory (e.g. lambda: top_factor_explainer(model)); it
+is then built on the worker thread, so startup and the first scores do not wait for it.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from time import monotonic
+from typing import Any, Callable
+
+import numpy as np
+
+from financial_fraud.serving.steps.explain import explain_rows
+
+log = logging.getLogger(__name__)
+
+EXPLANATION_PENDING = "Flagged - explanation pending."
+EXPLANATION_MISSING = "Flagged - explanation missing for top factor."
+
+
+class AsyncExplainer:
+    """Owns the explainer bundle and one worker thread; use as a context manager or call close()."""
+
+    def __init__(
+        self,
+        explainer_bundle: tuple | Callable[[], tuple],
+        *,
+        max_batch: int = 256,
+        max_wait_ms: float = 20.0,
+        on_explained: Callable[[dict[str, Any]], None] | None = None,
+    ) -> None:
+        self.explainer_bundle = explainer_bundle
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = float(max_wait_ms) / 1e3
+        self.on_explained = on_explained
+
+        self._queue: queue.Queue = queue.Queue()
+        self._idle = threading.Condition()
+        self._pending = 0
+
+        self.submitted = 0
+        self.explained = 0
+        self.failed = 0
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, name="explainer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "AsyncExplainer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def submit(
+        self,
+        out: dict[str, Any],
+        *,
+        row: dict[str, Any],
+        x: np.ndarray | None = None,
+        on_explained: Callable[[dict[str, Any]], None] | None = None,
+    ) -> Future:
+        """Queue out for explanation. row is its feature row; x, when given, is that row already
+        transformed (the serving plan's vector) and is used as is. on_explained(out) is called after
+        the explainer-wide one. The future resolves to the text."""
+        fut: Future = Future()
+        with self._idle:
+            self._pending += 1
+            self.submitted += 1
+        self._queue.put((out, row, x, fut, on_explained))
+        return fut
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Wait until everything submitted so far is explained; False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self) -> None:
+        """Explain whatever is still queued, then stop the worker."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def stats(self) -> dict[str, int]:
+        with self._idle:
+            return {
+                "submitted": self.submitted,
+                "explained": self.explained,
+                "failed": self.failed,
+                "batches": self.batches,
+                "pending": self._pending,
+            }
+
+    def _run(self) -> None:
+        if callable(self.explainer_bundle):
+            try:
+                self.explainer_bundle = self.explainer_bundle()
+            except Exception:
+                log.exception("explainer_build_failed")
+                self.explainer_bundle = None
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = self._gather(batch)
+            self._explain(batch)
+
+    def _gather(self, batch: list) -> bool:
+        """Add items that arrive within max_wait, up to max_batch; True once the stop marker is seen."""
+        deadline = monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - monotonic()))
+            except queue.Empty:
+                return False
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    def _explain(self, batch: list) -> None:
+        rows = [row for _, row, *_ in batch]
+        if self.explainer_bundle is None:  # the factory failed (logged once in _run)
+            texts = [EXPLANATION_MISSING] * len(batch)
+            failed = len(batch)
+        else:
+            try:
+                if all(x is not None for _, _, x, *_ in batch):
+                    texts = explain_rows(self.explainer_bundle, rows, np.vstack([x for _, _, x, *_ in batch]))
+                else:
+                    texts = explain_rows(self.explainer_bundle, rows)
+                failed = 0
+            except Exception:
+                log.exception("explain_batch_failed rows=%d", len(batch))
+                texts = [EXPLANATION_MISSING] * len(batch)
+                failed = len(batch)
+
+        for (out, _, _, fut, on_explained), text in zip(batch, texts):
+            out["explanation"] = text
+            for callback in (self.on_explained, on_explained):
+                if callback is None:
+                    continue
+                try:
+                    callback(out)
+                except Exception:
+                    log.exception("on_explained_failed")
+            fut.set_result(text)
+
+        with self._idle:
+            self.batches += 1
+            self.explained += len(batch) - failed
+            self.failed += failed
+            self._pending -= len(batch)
+            if not self._pending:
+                self._idle.notify_all()
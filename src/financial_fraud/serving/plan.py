@@ -0,0 +1,298 @@
+"""
+Compile a fitted pipeline's spec + preprocessing into a pandas-free serving plan.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Mapping, Sequence
+import math
+
+import numpy as np
+import pandas as pd
+
+from financial_fraud.modeling.tree_ensemble import verify_tree_ensemble
+
+# sklearn is only needed to compile a plan (the pipeline being unpickled loads it anyway); the
+# isinstance checks import it locally so that importing the serving path does not.
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+
+def _to_float(v: Any) -> float:
+    if v is None:
+        return math.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _as_float_array(a: Any) -> np.ndarray:
+    a = np.asarray(a)
+    if a.dtype.kind in "fiub":
+        return a.astype(np.float64)
+    return pd.to_numeric(pd.Series(a, dtype=object), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _is_missing(v: Any) -> bool:
+    return v is None or v is pd.NA or (isinstance(v, float) and math.isnan(v))
+
+
+@dataclass(frozen=True)
+class NumBlock:
+    cols: tuple[str, ...]
+    fill: np.ndarray
+    log1p: bool
+    offset: np.ndarray
+    scale: np.ndarray
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        x = np.where(np.isnan(x), self.fill, x)
+        if self.log1p:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                x = np.log1p(x)
+        return (x - self.offset) / self.scale
+
+
+@dataclass(frozen=True)
+class CatBlock:
+    col: str
+    spec_categories: tuple[str, ...] | None
+    fill: str
+    categories: tuple[str, ...]
+
+    def index(self, v: Any) -> int:
+        """Position of the one-hot bit for v, or -1 for the all-zero row (handle_unknown='ignore')."""
+        s = None if _is_missing(v) else str(v)
+        if s is not None and self.spec_categories is not None and s not in self.spec_categories:
+            s = None
+        if s is None:
+            s = self.fill
+        try:
+            return self.categories.index(s)
+        except ValueError:
+            return -1
+
+
+@dataclass(frozen=True)
+class ServingPlan:
+    feature_names: tuple[str, ...]
+    blocks: tuple[tuple[int, NumBlock | CatBlock], ...]
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_names)
+
+    def transform_rows(self, rows: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        """Feature-row dicts (as assembled in serve) -> final float matrix."""
+        out = np.zeros((len(rows), self.n_features), dtype=np.float64)
+        for start, block in self.blocks:
+            if isinstance(block, CatBlock):
+                for i, row in enumerate(rows):
+                    j = block.index(row[block.col])
+                    if j >= 0:
+                        out[i, start + j] = 1.0
+            else:
+                x = np.array(
+                    [[_to_float(row[c]) for c in block.cols] for row in rows],
+                    dtype=np.float64,
+                ).reshape(len(rows), len(block.cols))
+                out[:, start:start + len(block.cols)] = block.apply(x)
+        return out
+
+    def transform_records(self, rec: Any) -> np.ndarray:
+        """NumPy record array (or any column mapping of equal-length arrays) -> final float matrix."""
+        n = len(rec[self._first_col()])
+        out = np.zeros((n, self.n_features), dtype=np.float64)
+        for start, block in self.blocks:
+            if isinstance(block, CatBlock):
+                idx = np.fromiter((block.index(v) for v in rec[block.col]), dtype=np.int64, count=n)
+                hit = idx >= 0
+                out[np.flatnonzero(hit), start + idx[hit]] = 1.0
+            else:
+                x = np.column_stack([_as_float_array(rec[c]) for c in block.cols])
+                out[:, start:start + len(block.cols)] = block.apply(x)
+        return out
+
+    def _first_col(self) -> str:
+        _, block = self.blocks[0]
+        return block.col if isinstance(block, CatBlock) else block.cols[0]
+
+
+def _num_block(cols: list[str], steps: list[tuple[str, Any]]) -> NumBlock:
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
+    k = len(cols)
+    fill = np.zeros(k)
+    log1p = False
+    offset = np.zeros(k)
+    scale = np.ones(k)
+    seen_imputer = False
+
+    for name, step in steps:
+        if isinstance(step, SimpleImputer) and not seen_imputer and not step.add_indicator:
+            fill = np.asarray(step.statistics_, dtype=np.float64)
+            seen_imputer = True
+        elif isinstance(step, FunctionTransformer) and step.func is np.log1p and not log1p and not step.validate:
+            if offset.any() or (scale != 1).any():
+                raise ValueError(f"Unsupported step order at {name!r}: log1p after scaling")
+            log1p = True
+        elif isinstance(step, StandardScaler):
+            if offset.any() or (scale != 1).any():
+                raise ValueError(f"Unsupported repeated scaler step {name!r}")
+            if step.with_mean:
+                offset = np.asarray(step.mean_, dtype=np.float64)
+            if step.with_std:
+                scale = np.asarray(step.scale_, dtype=np.float64)
+        else:
+            raise ValueError(f"Unsupported numeric step {name!r}: {type(step).__name__}")
+
+    if not seen_imputer:
+        raise ValueError(f"Numeric block {cols} has no imputer; NaN handling would differ")
+
+    return NumBlock(cols=tuple(cols), fill=fill, log1p=log1p, offset=offset, scale=scale)
+
+
+def _cat_block(col: str, steps: list[tuple[str, Any]], spec_categories: tuple[str, ...] | None) -> CatBlock:
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import OneHotEncoder
+
+    if len(steps) != 2:
+        raise ValueError(f"Unsupported categorical pipeline for {col!r}: {[n for n, _ in steps]}")
+    (_, imp), (_, ohe) = steps
+    if not isinstance(imp, SimpleImputer) or imp.strategy != "constant" or imp.add_indicator:
+        raise ValueError(f"Unsupported categorical imputer for {col!r}")
+    if not isinstance(ohe, OneHotEncoder) or ohe.handle_unknown != "ignore" or ohe.drop is not None:
+        raise ValueError(f"Unsupported one-hot encoder for {col!r}")
+    return CatBlock(
+        col=col,
+        spec_categories=spec_categories,
+        fill=str(imp.fill_value),
+        categories=tuple(str(c) for c in ohe.categories_[0]),
+    )
+
+
+def compile_serving_plan(pipe: Pipeline) -> ServingPlan:
+    """Bake the fitted spec/pre steps of pipe into constants. Raises ValueError if a step is unsupported."""
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    spec = pipe.named_steps["spec"].spec
+    pre = pipe.named_steps["pre"]
+
+    spec_cats = {
+        c["name"]: tuple(c["categories"])
+        for c in spec.get("features", [])
+        if c.get("dtype") == "category"
+    }
+
+    blocks: list[tuple[int, NumBlock | CatBlock]] = []
+    start = 0
+    for name, trans, cols in pre.transformers_:
+        if trans == "drop" or len(cols) == 0:
+            continue
+        if not isinstance(trans, Pipeline):
+            raise ValueError(f"Unsupported transformer {name!r}: {type(trans).__name__}")
+        cols = list(cols)
+        steps = list(trans.steps)
+
+        if any(isinstance(s, OneHotEncoder) for _, s in steps):
+            if len(cols) != 1:
+                raise ValueError(f"Unsupported multi-column one-hot block {name!r}")
+            block: NumBlock | CatBlock = _cat_block(cols[0], steps, spec_cats.get(cols[0]))
+            width = len(block.categories)
+        else:
+            block = _num_block(cols, steps)
+            width = len(cols)
+
+        blocks.append((start, block))
+        start += width
+
+    names = tuple(str(n) for n in pre.get_feature_names_out())
+    if start != len(names):
+        raise ValueError(f"Plan width {start} != preprocessor output width {len(names)}")
+
+    return ServingPlan(feature_names=names, blocks=tuple(blocks))
+
+
+def probe_frame(plan: ServingPlan) -> pd.DataFrame:
+    """Small frame covering every category, missing/unknown values and a spread of numbers."""
+    cat_values: dict[str, list[Any]] = {}
+    num_cols: list[str] = []
+    for _, block in plan.blocks:
+        if isinstance(block, CatBlock):
+            cat_values[block.col] = [*block.categories, None, "not_a_category"]
+        else:
+            num_cols.extend(block.cols)
+
+    nums = [None, 0.0, 1.0, 2.5, 1e3, 123456.78, 9.9e7]
+    n = max([len(v) for v in cat_values.values()] + [len(nums)])
+
+    rows = []
+    for i in range(n):
+        row: dict[str, Any] = {"step": i, "name_orig": "probe", "name_dest": "probe"}
+        for c, vals in cat_values.items():
+            row[c] = vals[i % len(vals)]
+        for j, c in enumerate(num_cols):
+            row[c] = nums[(i + j) % len(nums)]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def verify_serving_plan(plan: ServingPlan, pipe: Pipeline, X: pd.DataFrame | None = None, *, atol: float = 1e-9) -> float:
+    """Check plan output against pipe[:-1].transform on X; returns the max abs diff or raises ValueError."""
+    if X is None:
+        X = probe_frame(plan)
+
+    expected = np.asarray(pipe[:-1].transform(X), dtype=np.float64)
+    got = plan.transform_rows(X.to_dict(orient="records"))
+
+    if expected.shape != got.shape:
+        raise ValueError(f"Serving plan shape {got.shape} != pipeline shape {expected.shape}")
+    if not np.allclose(got, expected, rtol=0.0, atol=atol, equal_nan=True):
+        raise ValueError("Serving plan output does not match pipeline transform")
+
+    diff = np.abs(np.nan_to_num(got) - np.nan_to_num(expected))
+    return float(diff.max()) if diff.size else 0.0
+
+
+@dataclass(frozen=True)
+class PlannedModel:
+    """A fitted pipeline plus its compiled plan; rows skip the pandas/sklearn transform path.
+
+    When a native tree ensemble is attached it replaces the classifier's predict_proba.
+    """
+    pipeline: Pipeline
+    plan: ServingPlan
+    native: Any = None
+
+    @classmethod
+    def from_pipeline(cls, pipe: Pipeline, *, native: Any = None) -> "PlannedModel":
+        plan = compile_serving_plan(pipe)
+        verify_serving_plan(plan, pipe)
+        if native is not None:
+            verify_tree_ensemble(native, pipe.named_steps["clf"], plan.transform_rows(probe_frame(plan).to_dict(orient="records")))
+        return cls(pipeline=pipe, plan=plan, native=native)
+
+    @property
+    def named_steps(self):
+        return self.pipeline.named_steps
+
+    @property
+    def clf(self):
+        return self.pipeline.named_steps["clf"]
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        return self.pipeline.predict_proba(X)
+
+    @property
+    def scorer(self):
+        return self.native if self.native is not None else self.clf
+
+    def predict_proba_rows(self, rows: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        return self.scorer.predict_proba(self.plan.transform_rows(rows))
+
+    def predict_proba_records(self, rec: Any) -> np.ndarray:
+        return self.scorer.predict_proba(self.plan.transform_records(rec))
@@ -4,21 +4,70 @@ Take a transaction in run it through online pipeline and return the correctly fo
 
 from __future__ import annotations
 
-from typing import Any, Mapping
+from typing import Any, Callable, Iterable, Mapping
 import logging
+import math
+import numpy as np
 import pandas as pd
 import warnings
 
-from financial_fraud.serving.steps.base import silver_base
+from financial_fraud.serving.steps.base import silver_base, silver_base_columns, valid_base_mask
 from financial_fraud.serving.steps.validate import validate_base
-from financial_fraud.serving.steps.tx_features import tx_features
+from financial_fraud.serving.steps.tx_features import TX_BASE_COLS, tx_features
 from financial_fraud.serving.steps.delta_features import delta_features
-from financial_fraud.serving.steps.explain import top_factor
-from financial_fraud.serving.steps.factor_explanations import EXPLANATION_TEXT
-from financial_fraud.serving.steps.entity_features import get_entity_features
+from financial_fraud.serving.steps.explain import explain_rows
+from financial_fraud.serving.steps.entity_features import get_entity_features, get_entity_features_many
+from financial_fraud.serving.timing import Laps, StageTimer
+from financial_fraud.serving.explain_worker import EXPLANATION_MISSING, EXPLANATION_PENDING, AsyncExplainer
 
 log = logging.getLogger(__name__)
 
+AUDIT_COLS = ["decision", "proba", "explanation", "tx"]
+
+_NOT_FLAGGED = "No elevated risk signals detected."
+_UNAVAILABLE = "Flagged - explanation unavailable for this model type."
+
+
+def _predict_proba(model, rows: list[dict[str, Any]] | Mapping[str, Any]):
+    """rows: feature-row dicts, or one mapping of feature columns (see score_batch)."""
+    if isinstance(rows, Mapping):
+        if hasattr(model, "predict_proba_records"):
+            return model.predict_proba_records(rows)[:, 1]
+    elif hasattr(model, "predict_proba_rows"):
+        return model.predict_proba_rows(rows)[:, 1]
+
+    X = pd.DataFrame(rows)
+    with warnings.catch_warnings():
+        warnings.filterwarnings(
+            "ignore",
+            message=r".*does not have valid feature names.*",
+            category=UserWarning,
+        )
+        return model.predict_proba(X)[:, 1]
+
+
+def _score_rows(model, rows) -> tuple[np.ndarray, np.ndarray | None]:
+    """(P(fraud) per row, the model-ready matrix when the model has a serving plan, else None).
+
+    The matrix is returned so explanations reuse it instead of transforming the rows again.
+    """
+    plan = getattr(model, "plan", None)
+    if plan is None:
+        return _predict_proba(model, rows), None
+    X = plan.transform_records(rows) if isinstance(rows, Mapping) else plan.transform_rows(rows)
+    return model.scorer.predict_proba(X)[:, 1], X
+
+
+def _explain_many(rows: list[dict[str, Any]], X, *, explainer_bundle, dest_ids: list[str]) -> list[str]:
+    """Explanation text per flagged row, from one shap_values call."""
+    if explainer_bundle is None:
+        return [_UNAVAILABLE] * len(rows)
+    try:
+        return explain_rows(explainer_bundle, rows, X)
+    except Exception:
+        log.exception("explain_failed dests=%s", dest_ids)
+        return [EXPLANATION_MISSING] * len(rows)
+
 
 def serve(
     tx: Mapping[str, Any],
@@ -29,9 +78,34 @@ def serve(
     threshold: float | None = None,
     explainer_bundle=None,
     lua_shas: dict[str, str],
+    timer: StageTimer | None = None,
+    timings: bool = False,
+    shadow=None,
+    on_explained: Callable[[dict[str, Any]], None] | None = None,
 ) -> tuple[dict[str, Any], pd.DataFrame] | None:
+    """Score one transaction; None when it fails validation.
+
+    timer records the duration of each stage (validate, entity, features, predict, explain,
+    audit) and the total; timings=True also puts them on out["timings_ms"].
+
+    explainer_bundle may be an AsyncExplainer: a flagged result then comes back with
+    EXPLANATION_PENDING and its explanation is written into out when the worker gets to it.
+    The returned audit DataFrame is a snapshot taken now and keeps EXPLANATION_PENDING;
+    on_explained(out) is called once the text is in, to update whatever audit record the caller
+    stored (match it by out["tx"]).
+
+    shadow, a ShadowScorer, is handed the feature row and probability after the timed stages,
+    so candidates scoring in shadow never count toward the champion's latency.
+    """
+    laps = Laps() if timer is not None or timings else None
+
     base = silver_base(tx)
-    if not validate_base(base):
+    valid = validate_base(base)
+    if laps is not None:
+        laps.lap("validate")
+    if not valid:
+        if timer is not None:
+            timer.record(laps)
         return None
 
     step = int(base["step"])
@@ -46,38 +120,28 @@ def serve(
         step=step,
         amount=amount,
     )
+    if laps is not None:
+        laps.lap("entity")
 
     transaction = tx_features(base)
     delta = delta_features(base)
 
     row: dict[str, Any] = {**transaction, **delta, **dest}
-    X = pd.DataFrame([row])
+    if laps is not None:
+        laps.lap("features")
 
-    with warnings.catch_warnings():
-        warnings.filterwarnings(
-            "ignore",
-            message=r".*does not have valid feature names.*",
-            category=UserWarning,
-        )
-        proba = float(model.predict_proba(X)[0, 1])
-
-    decision = False
-    explanation = "No elevated risk signals detected."
-    if threshold is not None and proba >= threshold:
-        decision = True
-        try:
-            if explainer_bundle is not None:
-                spec, pre, names, explainer = explainer_bundle
-                factor = top_factor(spec, pre, names, explainer, X)
-                feat = factor.get("feature") if isinstance(factor, dict) else None
-                explanation = EXPLANATION_TEXT.get(
-                    feat, "Multiple risk signals contributed to this decision."
-                )
-            else:
-                explanation = "Flagged - explanation unavailable for this model type."
-        except Exception:
-            log.exception("explain_failed dest=%s", dest_id)
-            explanation = "Flagged - explanation missing for top factor."
+    probas, X = _score_rows(model, [row])
+    proba = float(probas[0])
+    if laps is not None:
+        laps.lap("predict")
+
+    decision = threshold is not None and proba >= threshold
+    deferred = decision and isinstance(explainer_bundle, AsyncExplainer)
+    explanation = _NOT_FLAGGED
+    if deferred:
+        explanation = EXPLANATION_PENDING
+    elif decision:
+        explanation = _explain_many([row], X, explainer_bundle=explainer_bundle, dest_ids=[dest_id])[0]
 
     out = {
         "tx": dict(tx),
@@ -85,6 +149,232 @@ def serve(
         "proba": proba,
         "explanation": explanation,
     }
-    audit_log = pd.DataFrame([out]).reindex(columns=["decision", "proba", "explanation", "tx"])
+    if deferred:
+        explainer_bundle.submit(out, row=row, x=None if X is None else X[0], on_explained=on_explained)
+    if decision and laps is not None:
+        laps.lap("explain")
+    audit_log = pd.DataFrame([out]).reindex(columns=AUDIT_COLS)
+
+    if laps is not None:
+        laps.lap("audit")
+        if timer is not None:
+            timer.record(laps)
+        if timings:
+            out["timings_ms"] = laps.ms()
+    if shadow is not None:
+        shadow.submit([row], probas, threshold=threshold)
 
     return out, audit_log
+
+
+def serve_many(
+    txs: Iterable[Mapping[str, Any]],
+    *,
+    r,
+    cfg,
+    model,
+    threshold: float | None = None,
+    explainer_bundle=None,
+    lua_shas: dict[str, str],
+    timer: StageTimer | None = None,
+    shadow=None,
+    on_explained: Callable[[dict[str, Any]], None] | None = None,
+) -> tuple[list[dict[str, Any]], pd.DataFrame]:
+    """Score a micro-batch (list of mappings or Arrow Table/RecordBatch) in transaction order.
+
+    Invalid transactions are skipped, as in serve(). Entity updates go out in one
+    pipelined round trip and the model is called once for the whole batch.
+    timer records serve()'s stages once per batch, not per transaction. As in serve(), the audit
+    DataFrame is a snapshot: with an AsyncExplainer, on_explained(out) reports each explanation
+    that lands after it was built.
+    """
+    laps = Laps() if timer is not None else None
+
+    kept, bases = validated_batch(txs)
+    if laps is not None:
+        laps.lap("validate")
+    if not kept:
+        if timer is not None:
+            timer.record(laps)
+        return [], pd.DataFrame(columns=AUDIT_COLS)
+
+    dests = get_entity_features_many(
+        r=r,
+        cfg=cfg,
+        lua_shas=lua_shas,
+        items=entity_items(bases),
+    )
+    if laps is not None:
+        laps.lap("entity")
+
+    outs = score_batch(
+        kept,
+        bases,
+        dests,
+        model=model,
+        threshold=threshold,
+        explainer_bundle=explainer_bundle,
+        laps=laps,
+        shadow=shadow,
+        on_explained=on_explained,
+    )
+    audit_log = pd.DataFrame(outs).reindex(columns=AUDIT_COLS)
+
+    if timer is not None:
+        laps.lap("audit")
+        timer.record(laps)
+
+    return outs, audit_log
+
+
+def validated_batch(txs: Iterable[Mapping[str, Any]]) -> tuple[list[Mapping[str, Any]], Any]:
+    """(kept transactions, their silver bases); invalid transactions are dropped.
+
+    A list of mappings gives one silver_base dict per kept transaction. An Arrow Table or
+    RecordBatch is cleaned column-wise instead and gives one mapping of columns (see
+    validated_columns), which entity_items() and score_batch() accept in place of the list.
+    """
+    if hasattr(txs, "to_pylist"):
+        idx, bases = validated_columns(txs)
+        return txs.take(idx).to_pylist(), bases
+
+    kept: list[Mapping[str, Any]] = []
+    bases: list[dict[str, Any]] = []
+    for tx in txs:
+        base = silver_base(tx)
+        if validate_base(base):
+            kept.append(tx)
+            bases.append(base)
+    return kept, bases
+
+
+def validated_columns(batch) -> tuple[np.ndarray, dict[str, Any]]:
+    """(row indices of the valid transactions, their silver base columns) for an Arrow batch.
+
+    Same values as silver_base/validate_base row by row; step is int64 and the string
+    fields are lists.
+    """
+    cols = silver_base_columns(batch)
+    idx = np.flatnonzero(valid_base_mask(cols))
+    bases = {
+        k: [v[i] for i in idx] if isinstance(v, list) else v[idx]
+        for k, v in cols.items()
+    }
+    bases["step"] = bases["step"].astype(np.int64)
+    return idx, bases
+
+
+def entity_items(bases) -> list[tuple[str, int, float]]:
+    if isinstance(bases, Mapping):
+        return list(zip(bases["name_dest"], bases["step"].tolist(), bases["amount"].tolist()))
+    return [(b["name_dest"], int(b["step"]), float(b["amount"])) for b in bases]
+
+
+def score_batch(
+    kept: list[Mapping[str, Any]],
+    bases,
+    dests: list[dict[str, float]],
+    *,
+    model,
+    threshold: float | None = None,
+    explainer_bundle=None,
+    laps: Laps | None = None,
+    shadow=None,
+    on_explained: Callable[[dict[str, Any]], None] | None = None,
+) -> list[dict[str, Any]]:
+    """Model and explanation stage for validated transactions whose entity features are already read.
+
+    laps, when given, is charged the features, predict and explain stages. shadow, a ShadowScorer,
+    is handed the feature rows and probabilities once those stages are lapped. on_explained is
+    passed to an AsyncExplainer's submit for every deferred explanation.
+    """
+    if isinstance(bases, Mapping):
+        rows = _feature_columns(bases, dests)
+        if rows is None:
+            # A kept transaction is missing a balance: the row path raises on it exactly as serve() does.
+            return score_batch(kept, _base_rows(bases), dests, model=model, threshold=threshold, explainer_bundle=explainer_bundle, laps=laps, shadow=shadow, on_explained=on_explained)
+    else:
+        rows = [
+            {**tx_features(base), **delta_features(base), **dest}
+            for base, dest in zip(bases, dests)
+        ]
+    if laps is not None:
+        laps.lap("features")
+    probas, X = _score_rows(model, rows)
+    if laps is not None:
+        laps.lap("predict")
+
+    flagged = [] if threshold is None else [i for i, p in enumerate(probas.tolist()) if p >= threshold]
+    deferred = isinstance(explainer_bundle, AsyncExplainer)
+    explanations = dict.fromkeys(flagged, EXPLANATION_PENDING)
+    if flagged and not deferred:
+        # One shap_values call for every flagged row, on the matrix the model already scored.
+        flagged_rows = [_row_at(rows, i) for i in flagged]
+        explanations.update(zip(flagged, _explain_many(
+            flagged_rows,
+            None if X is None else X[flagged],
+            explainer_bundle=explainer_bundle,
+            dest_ids=[row["name_dest"] for row in flagged_rows],
+        )))
+
+    outs: list[dict[str, Any]] = []
+    for i, tx in enumerate(kept):
+        outs.append({
+            "tx": dict(tx),
+            "decision": i in explanations,
+            "proba": float(probas[i]),
+            "explanation": explanations.get(i, _NOT_FLAGGED),
+        })
+    if deferred:
+        for i in flagged:
+            explainer_bundle.submit(
+                outs[i], row=_row_at(rows, i), x=None if X is None else X[i], on_explained=on_explained
+            )
+    if laps is not None:
+        laps.lap("explain")
+    if shadow is not None:
+        shadow.submit(rows, probas, threshold=threshold)
+    return outs
+
+
+_BALANCE_COLS = ("oldbalance_orig", "newbalance_orig", "oldbalance_dest", "newbalance_dest")
+
+
+def _feature_columns(bases: Mapping[str, Any], dests: list[dict[str, float]]) -> dict[str, Any] | None:
+    """tx_features + delta_features + dest features as columns, in the row path's key order.
+
+    None when a balance is missing: delta_features has no value for it.
+    """
+    if any(np.isnan(bases[c]).any() for c in _BALANCE_COLS):
+        return None
+    amount = bases["amount"]
+    orig_delta = bases["oldbalance_orig"] - bases["newbalance_orig"]
+    dest_delta = bases["newbalance_dest"] - bases["oldbalance_dest"]
+    cols: dict[str, Any] = {k: bases[k] for k in TX_BASE_COLS}
+    cols.update({
+        "orig_balance_delta": orig_delta,
+        "orig_delta_minus_amount": orig_delta - amount,
+        "dest_balance_delta": dest_delta,
+        "dest_delta_minus_amount": dest_delta - amount,
+    })
+    if dests:
+        for k in dests[0]:
+            cols[k] = np.array([d[k] for d in dests])
+    return cols
+
+
+def _row_at(rows, i: int) -> dict[str, Any]:
+    """Row i of a list of feature rows or of a column mapping, with plain Python values."""
+    if not isinstance(rows, Mapping):
+        return rows[i]
+    return {k: v[i].item() if isinstance(v, np.ndarray) else v[i] for k, v in rows.items()}
+
+
+def _base_rows(bases: Mapping[str, Any]) -> list[dict[str, Any]]:
+    """Column bases back to silver_base dicts, NaN -> None."""
+    rows = [_row_at(bases, i) for i in range(len(bases["name_dest"]))]
+    for row in rows:
+        for c in _BALANCE_COLS:
+            if math.isnan(row[c]):
+                row[c] = None
+    return rows
@@ -0,0 +1,230 @@
+"""
+Asyncio scoring service: concurrent callers, micro-batched model calls, per-dest ordering kept.
+
+Requests queue up in arrival order. The batcher takes whatever arrived within max_wait_ms
+(up to max_batch), sends the batch's dest updates to Redis in one pipelined round trip and hands
+the model + explanation stage to an executor. Round trips are issued one batch at a time, so every
+dest sees its updates in arrival order; inference for batch k overlaps the round trip for batch k+1.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Mapping
+
+import redis.asyncio as aioredis
+from redis.exceptions import NoScriptError
+
+from financial_fraud.redis.infra import RedisConfig, make_entity_key
+from financial_fraud.redis.lua.lua_scripts import SCRIPT_DEST_FUSED, SCRIPT_DEST_FUSED_PACKED
+from financial_fraud.serving.serve import entity_items, score_batch
+from financial_fraud.serving.steps.base import silver_base
+from financial_fraud.serving.steps.validate import validate_base
+from financial_fraud.serving.steps.dest_aggregates import fused_aggregates
+
+log = logging.getLogger(__name__)
+
+_FUSED = {"hash": SCRIPT_DEST_FUSED, "packed": SCRIPT_DEST_FUSED_PACKED}
+
+
+class ScoringService:
+    """Async front end for serve(); score(tx) returns serve()'s out dict, or None for invalid transactions."""
+
+    def __init__(
+        self,
+        *,
+        cfg: RedisConfig,
+        model,
+        threshold: float | None = None,
+        explainer_bundle=None,
+        shadow=None,
+        max_batch: int = 256,
+        max_wait_ms: float = 2.0,
+        executor: Executor | None = None,
+        max_inflight_batches: int = 2,
+        max_connections: int = 8,
+    ) -> None:
+        if cfg.shards:
+            raise ValueError("ScoringService talks to a single Redis node; unset REDIS_SHARDS")
+        self.cfg = cfg
+        self.model = model
+        self.threshold = threshold
+        self.explainer_bundle = explainer_bundle
+        self.shadow = shadow
+        self.max_batch = int(max_batch)
+        self.max_wait = float(max_wait_ms) / 1e3
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="score")
+        self._max_inflight = int(max_inflight_batches)
+        self._max_connections = int(max_connections)
+
+        self.r: aioredis.Redis | None = None
+        self._script = _FUSED[cfg.dest_encoding]
+        self._sha: str | None = None
+        self._queue: asyncio.Queue | None = None
+        self._batcher: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self._slots: asyncio.Semaphore | None = None
+
+        self.batches = 0
+        self.scored = 0
+        self.script_reloads = 0
+
+    async def __aenter__(self) -> "ScoringService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        self.r = aioredis.Redis(
+            host=self.cfg.host,
+            port=self.cfg.port,
+            db=self.cfg.db,
+            decode_responses=True,
+            max_connections=self._max_connections,
+        )
+        self._sha = await self.r.script_load(self._script)
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self._max_inflight)
+        self._batcher = asyncio.create_task(self._run(), name="scoring-batcher")
+
+    async def stop(self) -> None:
+        """Finish every queued request, then close the Redis client."""
+        if self._batcher is not None:
+            await self._queue.put(None)
+            await self._batcher
+            self._batcher = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self.r is not None:
+            await self.r.aclose()
+            self.r = None
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+        log.info("scoring_service_stopped batches=%d scored=%d", self.batches, self.scored)
+
+    async def score(self, tx: Mapping[str, Any]) -> dict[str, Any] | None:
+        if self._batcher is None:
+            raise RuntimeError("ScoringService is not started")
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((tx, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            stopping = self._drain(batch)
+            if not stopping and len(batch) < self.max_batch and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+                stopping = self._drain(batch)
+            await self._dispatch(batch)
+
+    def _drain(self, batch: list) -> bool:
+        """Move queued requests into batch, up to max_batch; True once the stop marker is reached."""
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return False
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    async def _dispatch(self, batch: list) -> None:
+        kept, bases, live = [], [], []
+        for tx, fut in batch:
+            if fut.done():
+                continue
+            try:
+                base = silver_base(tx)
+                valid = validate_base(base)
+            except Exception as e:
+                fut.set_exception(e)
+                continue
+            if valid:
+                kept.append(tx)
+                bases.append(base)
+                live.append(fut)
+            else:
+                fut.set_result(None)
+        if not bases:
+            return
+
+        try:
+            dests = await self._entity_features(entity_items(bases))
+        except Exception as e:
+            _fail(live, e)
+            return
+
+        await self._slots.acquire()
+        task = asyncio.create_task(self._finish(kept, bases, dests, live))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        self.batches += 1
+
+    async def _finish(self, kept, bases, dests, futs) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            outs = await loop.run_in_executor(
+                self.executor,
+                lambda: score_batch(
+                    kept,
+                    bases,
+                    dests,
+                    model=self.model,
+                    threshold=self.threshold,
+                    explainer_bundle=self.explainer_bundle,
+                    shadow=self.shadow,
+                ),
+            )
+        except Exception as e:
+            _fail(futs, e)
+            return
+        finally:
+            self._slots.release()
+        for fut, out in zip(futs, outs):
+            if not fut.done():
+                fut.set_result(out)
+        self.scored += len(outs)
+
+    async def _entity_features(self, items: list[tuple[str, int, float]]) -> list[dict[str, float]]:
+        """One pipelined dest_fused round trip; calls that hit NOSCRIPT are retried once after reloading."""
+        N = int(self.cfg.dest_bucket_N)
+        keys = [make_entity_key(self.cfg.live_prefix, "dest", dest_id) for dest_id, _, _ in items]
+
+        pipe = self.r.pipeline(transaction=False)
+        for key, (_, step, amount) in zip(keys, items):
+            pipe.evalsha(self._sha, 1, key, step, amount, N)
+        replies = await pipe.execute(raise_on_error=False)
+
+        failed = [i for i, res in enumerate(replies) if isinstance(res, NoScriptError)]
+        if failed:
+            self._sha = await self.r.script_load(self._script)
+            self.script_reloads += 1
+            log.warning("scoring_service_script_reloaded failed=%d", len(failed))
+            pipe = self.r.pipeline(transaction=False)
+            for i in failed:
+                _, step, amount = items[i]
+                pipe.evalsha(self._sha, 1, keys[i], step, amount, N)
+            for i, res in zip(failed, await pipe.execute(raise_on_error=False)):
+                replies[i] = res
+
+        for res in replies:
+            if isinstance(res, Exception):
+                raise res
+        return [fused_aggregates(reply) for reply in replies]
+
+
+def _fail(futs, exc: BaseException) -> None:
+    for fut in futs:
+        if not fut.done():
+            fut.set_exception(exc)
@@ -0,0 +1,311 @@
+"""
+Shadow scoring: candidate models score live traffic next to the champion, off the serving path.
+
+serve()/serve_many()/score_batch() given a ShadowScorer hand it every scored batch: the feature
+rows the champion saw and its probabilities. That is one queue put. A gather thread collects what
+was submitted within max_wait_ms (up to max_batch rows) and sends it to a single worker process,
+which loads the candidates once (memory-mapped from the artifact cache with from_cache), scores each
+batch with every candidate on the same rows and appends to a Parquet side log under log_dir, one
+row per transaction and candidate:
+
+    logged_at, step, name_orig, name_dest, amount, champion_run_id, champion_proba, champion_flag,
+    candidate_run_id, candidate_proba, candidate_flag, candidate_batch_ms
+
+The candidates run in their own process, so their CPU time and the GIL stay off the serving
+threads, and serve()'s timer only ever covers the champion; the worker also runs at a lower CPU
+priority (niceness), so where cores are short the scheduler favours serving. When the worker falls behind
+(max_inflight batches outstanding) new shadow batches are dropped and counted, never waited for.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import Any, Callable, Iterable, Mapping
+
+import numpy as np
+
+from financial_fraud.config import SHADOW_LOG_DIR
+
+log = logging.getLogger(__name__)
+
+ID_COLS = ("step", "name_orig", "name_dest", "amount")
+
+# A zero-argument, picklable callable returning (model, threshold), run in the worker process.
+CandidateLoader = Callable[[], tuple[Any, float | None]]
+
+
+class ShadowScorer:
+    """Owns the gather thread and the worker process; use as a context manager or call close()."""
+
+    def __init__(
+        self,
+        candidates: Mapping[str, CandidateLoader],
+        *,
+        champion_run_id: str | Callable[[], str] | None = None,
+        log_dir: str | Path = SHADOW_LOG_DIR,
+        max_batch: int = 1_024,
+        max_wait_ms: float = 50.0,
+        max_inflight: int = 4,
+        flush_rows: int = 65_536,
+        niceness: int = 10,
+    ) -> None:
+        if not candidates:
+            raise ValueError("ShadowScorer needs at least one candidate")
+        # A callable is read at every submit, e.g. lambda: holder.current.run_id under hot reload.
+        self.champion_run_id = champion_run_id
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = float(max_wait_ms) / 1e3
+        self.max_inflight = max(1, int(max_inflight))
+        log_dir = Path(log_dir)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        self.log_path = log_dir / f"shadow_{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}.parquet"
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(dict(candidates), str(self.log_path), int(flush_rows), int(niceness)),
+        )
+        # Spawns the worker and loads the candidates now rather than on the first batch.
+        self._started = self._executor.submit(_loaded_candidates)
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._inflight: set[Future] = set()
+
+        self.submitted = 0
+        self.scored = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, name="shadow", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_cache(cls, run_ids: Iterable[str], *, cache=None, fast_path: bool = True, **kwargs) -> "ShadowScorer":
+        """Candidates by run_id, loaded by the worker from the local artifact cache."""
+        from financial_fraud.serving.startup import load_cached_model
+
+        return cls({r: partial(load_cached_model, r, fast_path=fast_path, cache=cache) for r in run_ids}, **kwargs)
+
+    def __enter__(self) -> "ShadowScorer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def ready(self, timeout: float | None = None) -> list[str]:
+        """Wait for the worker to load the candidates; their run_ids. Batches sent before then
+        queue in the worker and count toward max_inflight."""
+        return self._started.result(timeout)
+
+    def submit(self, rows, probas, *, threshold: float | None = None) -> None:
+        """Queue a scored batch: feature rows (list of dicts or mapping of columns, as score_batch
+        has them) and the champion's probabilities for them."""
+        run_id = self.champion_run_id() if callable(self.champion_run_id) else self.champion_run_id
+        self._queue.put((rows, probas, threshold, run_id, time.time()))
+
+    def close(self) -> None:
+        """Score whatever is still queued, then flush the side log and stop the worker."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        with self._lock:
+            inflight = list(self._inflight)
+        for fut in inflight:
+            fut.exception()
+        try:
+            self._executor.submit(_close_worker).result()
+        except Exception:
+            log.exception("shadow_log_close_failed path=%s", self.log_path)
+        self._executor.shutdown()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "scored": self.scored,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "inflight": len(self._inflight),
+            }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = self._gather(batch)
+            self._send(batch)
+
+    def _gather(self, batch: list) -> bool:
+        """Add submissions that arrive within max_wait, up to max_batch rows; True once the stop marker is seen."""
+        deadline = monotonic() + self.max_wait
+        n = sum(len(probas) for _, probas, *_ in batch)
+        while n < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - monotonic()))
+            except queue.Empty:
+                return False
+            if item is None:
+                return True
+            batch.append(item)
+            n += len(item[1])
+        return False
+
+    def _send(self, batch: list) -> None:
+        rows: list[dict[str, Any]] = []
+        champion_proba: list[float] = []
+        champion_flag: list[bool] = []
+        champion_run_id: list[str | None] = []
+        logged_at: list[float] = []
+        for sub_rows, probas, threshold, run_id, at in batch:
+            probas = np.asarray(probas, dtype=np.float64)
+            rows.extend(_as_rows(sub_rows))
+            champion_proba.extend(probas.tolist())
+            champion_flag.extend((probas >= threshold).tolist() if threshold is not None else [False] * len(probas))
+            champion_run_id.extend([run_id] * len(probas))
+            logged_at.extend([at] * len(probas))
+
+        with self._lock:
+            self.submitted += len(rows)
+            if len(self._inflight) >= self.max_inflight:
+                self.dropped += len(rows)
+                return
+            try:
+                fut = self._executor.submit(
+                    _score_batch, rows, champion_proba, champion_flag, champion_run_id, logged_at
+                )
+            except Exception:
+                log.exception("shadow_submit_failed rows=%d", len(rows))
+                self.failed += len(rows)
+                return
+            self._inflight.add(fut)
+        fut.add_done_callback(partial(self._done, rows=len(rows)))
+
+    def _done(self, fut: Future, *, rows: int) -> None:
+        exc = fut.exception()
+        if exc is not None:
+            log.error("shadow_batch_failed rows=%d", rows, exc_info=exc)
+        with self._lock:
+            self._inflight.discard(fut)
+            self.batches += 1
+            if exc is None:
+                self.scored += rows
+            else:
+                self.failed += rows
+
+
+def _as_rows(rows) -> list[dict[str, Any]]:
+    """Feature-row dicts for a list of them or a mapping of feature columns."""
+    if not isinstance(rows, Mapping):
+        return list(rows)
+    cols = {k: v.tolist() if isinstance(v, np.ndarray) else list(v) for k, v in rows.items()}
+    return [dict(zip(cols, values)) for values in zip(*cols.values())]
+
+
+# Worker process state: the loaded candidates and the side log writer.
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(candidates: dict[str, CandidateLoader], log_path: str, flush_rows: int, niceness: int) -> None:
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    _worker["candidates"] = [(run_id, *loader()) for run_id, loader in candidates.items()]
+    _worker["log"] = _SideLog(log_path, flush_rows=flush_rows)
+
+
+def _loaded_candidates() -> list[str]:
+    return [run_id for run_id, *_ in _worker["candidates"]]
+
+
+def _score_batch(
+    rows: list[dict[str, Any]],
+    champion_proba: list[float],
+    champion_flag: list[bool],
+    champion_run_id: list[str | None],
+    logged_at: list[float],
+) -> int:
+    import pyarrow as pa
+
+    n = len(rows)
+    base = {
+        "logged_at": pa.array(logged_at, type=pa.float64()),
+        **{c: [row.get(c) for row in rows] for c in ID_COLS},
+        "champion_run_id": pa.array(champion_run_id, type=pa.string()),
+        "champion_proba": pa.array(champion_proba, type=pa.float64()),
+        "champion_flag": pa.array(champion_flag, type=pa.bool_()),
+    }
+    for run_id, model, threshold in _worker["candidates"]:
+        t0 = perf_counter()
+        proba = _candidate_proba(model, rows)
+        batch_ms = (perf_counter() - t0) * 1e3
+        flag = proba >= threshold if threshold is not None else np.zeros(n, dtype=bool)
+        _worker["log"].append(pa.table({
+            **base,
+            "candidate_run_id": pa.array([run_id] * n, type=pa.string()),
+            "candidate_proba": pa.array(proba, type=pa.float64()),
+            "candidate_flag": pa.array(flag, type=pa.bool_()),
+            "candidate_batch_ms": pa.array(np.full(n, batch_ms), type=pa.float64()),
+        }))
+    return n
+
+
+def _candidate_proba(model, rows: list[dict[str, Any]]) -> np.ndarray:
+    if hasattr(model, "predict_proba_rows"):
+        return model.predict_proba_rows(rows)[:, 1]
+    import pandas as pd
+
+    return model.predict_proba(pd.DataFrame(rows))[:, 1]
+
+
+def _close_worker() -> None:
+    side_log = _worker.pop("log", None)
+    if side_log is not None:
+        side_log.close()
+
+
+class _SideLog:
+    """Appends Arrow tables to one Parquet file, a row group per flush_rows rows."""
+
+    def __init__(self, path: str, *, flush_rows: int) -> None:
+        self.path = path
+        self.flush_rows = flush_rows
+        self._pending: list = []
+        self._rows = 0
+        self._writer = None
+
+    def append(self, table) -> None:
+        self._pending.append(table)
+        self._rows += table.num_rows
+        if self._rows >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        self._pending, self._rows = [], 0
+
+    def close(self) -> None:
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
@@ -4,38 +4,206 @@ Cache serving start up for demo to ensure load only once on startup.
 
 from __future__ import annotations
 
+import logging
+import os
+from functools import partial
 from typing import Any
 
-from financial_fraud.redis.connect import redis_config, connect_redis
-from financial_fraud.io.hf import read_model_json, load_model_hf
-from financial_fraud.redis.lua.lua_scripts import SCRIPT_DEST_ADVANCE, SCRIPT_DEST_ADD 
+from financial_fraud.redis.connect import redis_config
+from financial_fraud.redis.store import FeatureStore
+from financial_fraud.io.artifact_cache import ArtifactCache
+from financial_fraud.io.hf import read_model_json, download_model_file_hf
+from financial_fraud.modeling.tree_ensemble import TreeEnsemble
+from financial_fraud.redis.lua.lua_scripts import (
+    SCRIPT_DEST_ADVANCE, SCRIPT_DEST_ADD, SCRIPT_DEST_FUSED, SCRIPT_DEST_MIGRATE, SCRIPT_DEST_SWEEP,
+    SCRIPT_CHECKPOINT,
+    SCRIPT_DEST_ADVANCE_PACKED, SCRIPT_DEST_ADD_PACKED, SCRIPT_DEST_FUSED_PACKED,
+)
+from financial_fraud.serving.plan import PlannedModel
 from financial_fraud.config import REPO_ID, REVISION
 
-def load_champion_model(*, repo_id: str = REPO_ID, revision: str = REVISION) -> tuple[Any, dict[str, Any]]:
-    champion_ptr = read_model_json(repo_id=repo_id, revision=revision, path_in_repo="champion.json")
-    if not champion_ptr:
-        raise RuntimeError("No champion.json found")
+log = logging.getLogger(__name__)
+
+def load_champion_model(
+    *,
+    repo_id: str = REPO_ID,
+    revision: str = REVISION,
+    fast_path: bool = False,
+    offline: bool | None = None,
+    cache: ArtifactCache | None = None,
+    mmap: bool = True,
+) -> tuple[Any, dict[str, Any]]:
+    """Champion model through the local artifact cache: only files the cache lacks are downloaded.
+
+    offline (default: HF_HUB_OFFLINE set) never touches the registry and serves the last champion
+    pointer and files cached; an unreachable registry falls back to them as well.
+    """
+    cache = cache if cache is not None else ArtifactCache()
+    offline = hf_offline() if offline is None else offline
 
-    artifact = load_model_hf(
-        repo_id=repo_id,
-        revision=revision,
-        path_in_repo=f"{champion_ptr['path_in_repo']}/model.joblib",
+    champion_ptr = champion_pointer(repo_id=repo_id, revision=revision, cache=cache, offline=offline)
+    run_id = fetch_run_files(
+        champion_ptr, repo_id=repo_id, revision=revision, fast_path=fast_path, cache=cache, offline=offline
     )
+    model, threshold = load_cached_model(run_id, fast_path=fast_path, cache=cache, mmap=mmap)
+    return model, champion_ptr, threshold
+
+def hf_offline() -> bool:
+    return os.environ.get("HF_HUB_OFFLINE", "").strip().lower() in ("1", "true", "yes", "on")
+
+def champion_pointer(*, repo_id: str, revision: str, cache: ArtifactCache, offline: bool) -> dict[str, Any]:
+    """champion.json from the registry (remembered in the cache), or the cached one when offline or
+    the registry is unreachable."""
+    if not offline:
+        try:
+            champion_ptr = read_model_json(repo_id=repo_id, revision=revision, path_in_repo="champion.json")
+        except Exception:
+            champion_ptr = cache.read_ref(repo_id, revision, "champion.json")
+            if champion_ptr is None:
+                raise
+            log.warning("champion_pointer_unreachable; using cached run_id=%s", champion_ptr.get("run_id"), exc_info=True)
+            return champion_ptr
+        if not champion_ptr:
+            raise RuntimeError("No champion.json found")
+        cache.write_ref(repo_id, revision, "champion.json", champion_ptr)
+        return champion_ptr
+
+    champion_ptr = cache.read_ref(repo_id, revision, "champion.json")
+    if not champion_ptr:
+        raise RuntimeError(f"No cached champion.json for {repo_id}@{revision} in {cache.root}")
+    return champion_ptr
+
+def fetch_run_files(
+    champion_ptr: dict[str, Any],
+    *,
+    repo_id: str,
+    revision: str,
+    fast_path: bool,
+    cache: ArtifactCache,
+    offline: bool,
+) -> str:
+    """Download the pointed-to run's serving files the cache lacks; returns the run_id."""
+    run_id = champion_ptr.get("run_id") or champion_ptr["path_in_repo"].rsplit("/", 1)[-1]
+    for filename in ("model.joblib", "trees.npz") if fast_path else ("model.joblib",):
+        cache.fetch(
+            run_id,
+            filename,
+            offline=offline,
+            download=partial(
+                download_model_file_hf,
+                repo_id=repo_id,
+                revision=revision,
+                path_in_repo=f"{champion_ptr['path_in_repo']}/{filename}",
+            ),
+        )
+    return run_id
+
+def load_cached_artifact(run_id: str, *, cache: ArtifactCache | None = None, mmap: bool = True) -> Any:
+    """A run's model.joblib (ModelArtifact or bare pipeline) from the local artifact cache alone.
+
+    mmap maps its NumPy arrays read-only from the cache object (bundles are written uncompressed),
+    so the processes on a host share one copy of them.
+    """
+    import joblib
+
+    cache = cache if cache is not None else ArtifactCache()
+    model_path = cache.get(run_id, "model.joblib")
+    if model_path is None:
+        raise FileNotFoundError(f"model.joblib of run {run_id} is not in the artifact cache {cache.root}")
+    return joblib.load(model_path, mmap_mode="r" if mmap else None)
+
+def serving_model(
+    artifact: Any,
+    run_id: str,
+    *,
+    fast_path: bool = False,
+    cache: ArtifactCache | None = None,
+    mmap: bool = True,
+) -> tuple[Any, float | None]:
+    """(model as serve() takes it, threshold) for a loaded artifact; fast_path attaches the run's
+    cached trees.npz, memory-mapped like the artifact."""
     model = getattr(artifact, "model", artifact)
     threshold = getattr(artifact, "threshold", None)
     threshold = float(threshold) if threshold is not None else None
 
-    return model, champion_ptr, threshold
+    if fast_path:
+        cache = cache if cache is not None else ArtifactCache()
+        trees_path = cache.get(run_id, "trees.npz")
+        native = TreeEnsemble.load_npz(trees_path, mmap=mmap) if trees_path else None
+        model = planned_or_pipeline(model, native=native)
+
+    return model, threshold
+
+def load_cached_model(
+    run_id: str,
+    *,
+    fast_path: bool = False,
+    cache: ArtifactCache | None = None,
+    mmap: bool = True,
+) -> tuple[Any, float | None]:
+    """A run's (model, threshold) from the local artifact cache alone (no network)."""
+    artifact = load_cached_artifact(run_id, cache=cache, mmap=mmap)
+    return serving_model(artifact, run_id, fast_path=fast_path, cache=cache, mmap=mmap)
+
+def cached_model_loader(run_id: str, *, fast_path: bool = False, cache: ArtifactCache | None = None):
+    """Picklable zero-argument loader of a cached run's model, for DestDispatcher workers: each maps
+    the cached files instead of unpickling its own copy of the parent's model."""
+    return partial(_cached_model, run_id, fast_path=fast_path, cache=cache)
+
+def _cached_model(run_id: str, *, fast_path: bool, cache: ArtifactCache | None):
+    return load_cached_model(run_id, fast_path=fast_path, cache=cache)[0]
+
+def load_model_file(model_path: str) -> tuple[Any, float | None]:
+    """(model as serve() takes it, threshold) from a local joblib ModelArtifact or bare pipeline."""
+    import joblib
+
+    artifact = joblib.load(model_path)
+    return planned_or_pipeline(getattr(artifact, "model", artifact)), getattr(artifact, "threshold", None)
+
+def champion_run_id(champion_ptr: dict[str, Any]) -> str:
+    """The run a champion pointer names."""
+    return champion_ptr.get("run_id") or champion_ptr["path_in_repo"].rsplit("/", 1)[-1]
+
+def planned_or_pipeline(model, *, native=None):
+    """The pipeline behind its serving plan (with the native tree evaluator when given), or the
+    pipeline itself when it has no plan."""
+    if native is not None:
+        try:
+            return PlannedModel.from_pipeline(model, native=native)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            log.warning("native_tree_ensemble_rejected; using classifier predict_proba", exc_info=True)
+
+    try:
+        return PlannedModel.from_pipeline(model)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        log.warning("serving_plan_unavailable; using pipeline transform", exc_info=True)
+        return model
 
-def connect_feature_store():
+def connect_feature_store(*, max_connections: int = 32):
+    """Pooled, thread-safe client for serving; register_lua_scripts(store) lets it reload SHAs on NOSCRIPT."""
     cfg = redis_config()
-    r = connect_redis(cfg)
-    return r, cfg
+    store = FeatureStore(cfg, max_connections=max_connections)
+    store.ping()
+    return store, cfg
 
 def register_lua_scripts(r) -> dict[str, str]:
     sha_adv = r.script_load(SCRIPT_DEST_ADVANCE)
     sha_add = r.script_load(SCRIPT_DEST_ADD)
+    sha_fused = r.script_load(SCRIPT_DEST_FUSED)
+    sha_migrate = r.script_load(SCRIPT_DEST_MIGRATE)
+    sha_sweep = r.script_load(SCRIPT_DEST_SWEEP)
+    sha_adv_packed = r.script_load(SCRIPT_DEST_ADVANCE_PACKED)
+    sha_add_packed = r.script_load(SCRIPT_DEST_ADD_PACKED)
+    sha_fused_packed = r.script_load(SCRIPT_DEST_FUSED_PACKED)
+    sha_checkpoint = r.script_load(SCRIPT_CHECKPOINT)
     return {
         "dest_advance": sha_adv,
         "dest_add": sha_add,
+        "dest_fused": sha_fused,
+        "dest_migrate": sha_migrate,
+        "dest_sweep": sha_sweep,
+        "dest_advance_packed": sha_adv_packed,
+        "dest_add_packed": sha_add_packed,
+        "dest_fused_packed": sha_fused_packed,
+        "checkpoint": sha_checkpoint,
     }
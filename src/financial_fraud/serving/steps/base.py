@@ -7,6 +7,10 @@ from __future__ import annotations
 from typing import Any, Mapping
 import math
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
 _ALLOWED_TYPES = {"payment", "transfer", "cash_out", "debit", "cash_in"}
 
 
@@ -94,3 +98,93 @@ def silver_base(tx: Mapping[str, Any]) -> dict[str, Any]:
         "oldbalance_dest": oldbalance_dest,
         "newbalance_dest": newbalance_dest,
     }
+
+
+def _float_column(col: pa.Array) -> np.ndarray:
+    """_try_float_nullable over a column as float64, NaN where it returns None."""
+    if pa.types.is_integer(col.type) or pa.types.is_float32(col.type) or pa.types.is_float64(col.type):
+        return pc.cast(col, pa.float64(), safe=False).to_numpy(zero_copy_only=False)
+
+    vals = [_try_float_nullable(x) for x in col.to_pylist()]
+    return np.array([math.nan if v is None else v for v in vals], dtype=np.float64)
+
+
+def _nonneg_float_column(col: pa.Array | None, n: int) -> np.ndarray:
+    """silver_base's float cleaning (non-finite or negative -> None) as float64 with NaN for None."""
+    if col is None:
+        return np.full(n, math.nan)
+    x = _float_column(col)
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isfinite(x) & (x >= 0), x, math.nan)
+
+
+def _str_column(col: pa.Array | None, n: int) -> list[str | None]:
+    if col is None:
+        return [None] * n
+    return [_nullif_blank_str(x) for x in col.to_pylist()]
+
+
+def silver_base_columns(batch: pa.RecordBatch | pa.Table) -> dict[str, Any]:
+    """Columnar silver_base over an Arrow batch: silver field name -> column for every row.
+
+    Float fields (and step) are float64 arrays with NaN where silver_base gives None; step is
+    already truncated to an integer value. String fields are lists with None.
+    """
+    n = batch.num_rows
+    names = set(batch.schema.names)
+
+    def col(name: str) -> pa.Array | None:
+        return batch.column(name) if name in names else None
+
+    step = _float_column(col("step")) if col("step") is not None else np.full(n, math.nan)
+    with np.errstate(invalid="ignore"):
+        step = np.trunc(step)
+        step = np.where(np.isfinite(step) & (step >= 0), step, math.nan)
+    types = [t.lower() if t is not None else None for t in _str_column(col("type"), n)]
+
+    return {
+        "step": step,
+        "type": [t if t in _ALLOWED_TYPES else None for t in types],
+        "amount": _nonneg_float_column(col("amount"), n),
+        "name_orig": _str_column(col("nameOrig"), n),
+        "oldbalance_orig": _nonneg_float_column(col("oldbalanceOrg"), n),
+        "newbalance_orig": _nonneg_float_column(col("newbalanceOrig"), n),
+        "name_dest": _str_column(col("nameDest"), n),
+        "oldbalance_dest": _nonneg_float_column(col("oldbalanceDest"), n),
+        "newbalance_dest": _nonneg_float_column(col("newbalanceDest"), n),
+    }
+
+
+def valid_base_mask(cols: Mapping[str, Any]) -> np.ndarray:
+    """validate_base over silver_base_columns output."""
+    names = cols["name_dest"]
+    return (
+        ~np.isnan(cols["step"])
+        & ~np.isnan(cols["amount"])
+        & np.fromiter((v is not None for v in names), dtype=bool, count=len(names))
+    )
+
+
+def silver_dest_columns(batch: pa.RecordBatch) -> tuple[list[str], list[int], list[float]]:
+    """Columnar silver_base + validate_base restricted to the dest update fields.
+
+    Returns (name_dest, step, amount) lists for the valid rows of an Arrow batch, in row order,
+    with the same values silver_base() gives row by row.
+    """
+    step = _float_column(batch.column("step"))
+    amount = _float_column(batch.column("amount"))
+    names = [_nullif_blank_str(x) for x in batch.column("nameDest").to_pylist()]
+
+    with np.errstate(invalid="ignore"):
+        valid = (
+            np.isfinite(step) & (np.trunc(step) >= 0)
+            & np.isfinite(amount) & (amount >= 0)
+            & np.fromiter((n is not None for n in names), dtype=bool, count=len(names))
+        )
+    idx = np.flatnonzero(valid)
+
+    return (
+        [names[i] for i in idx],
+        [int(v) for v in step[idx].tolist()],
+        amount[idx].tolist(),
+    )
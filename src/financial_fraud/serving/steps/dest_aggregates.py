@@ -4,8 +4,8 @@ From the read entity Dest assemble aggregate features.
 
 from __future__ import annotations
 
-from typing import Mapping, Any
-from financial_fraud.config import DEST_BUCKET_N
+from typing import Mapping, Any, Sequence
+from financial_fraud.config import DEST_BUCKET_N, DEST_SCHEMA_VERSION
 
 
 def _get_int(d: Mapping[str, Any], k: str, default: int = 0) -> int:
@@ -29,6 +29,20 @@ def _get_float(d: Mapping[str, Any], k: str, default: float = 0.0) -> float:
 
 
 def dest_aggregates(*, dest_state: Mapping[str, Any], N: int = DEST_BUCKET_N) -> dict[str, float]:
+    if _get_int(dest_state, "dest_schema_v", 1) != DEST_SCHEMA_VERSION:
+        return _dest_aggregates_v1(dest_state=dest_state, N=N)
+
+    prev = (_get_int(dest_state, "dest_last_seen_step", 0) - 1) % (N + 1)
+    return {
+        "dest_txn_count_1h": float(_get_int(dest_state, f"dest_cnt_s{prev}", 0)),
+        "dest_txn_count_24h": float(_get_int(dest_state, "dest_cnt_win", 0)),
+        "dest_amount_sum_1h": _get_float(dest_state, f"dest_sum_s{prev}", 0.0),
+        "dest_amount_sum_24h": _get_float(dest_state, "dest_sum_win", 0.0),
+    }
+
+
+def _dest_aggregates_v1(*, dest_state: Mapping[str, Any], N: int) -> dict[str, float]:
+    # Hashes written before the ring layout; the dest scripts migrate them on next touch.
     cnt_1h = float(_get_int(dest_state, "dest_cnt_b1", 0))
     sum_1h = float(_get_float(dest_state, "dest_sum_b1", 0.0))
 
@@ -44,3 +58,13 @@ def dest_aggregates(*, dest_state: Mapping[str, Any], N: int = DEST_BUCKET_N) ->
         "dest_amount_sum_1h": sum_1h,
         "dest_amount_sum_24h": sum_24h,
     }
+
+
+def fused_aggregates(reply: Sequence[Any]) -> dict[str, float]:
+    cnt_1h, cnt_24h, sum_1h, sum_24h = reply[:4]
+    return {
+        "dest_txn_count_1h": float(cnt_1h),
+        "dest_txn_count_24h": float(cnt_24h),
+        "dest_amount_sum_1h": float(sum_1h),
+        "dest_amount_sum_24h": float(sum_24h),
+    }
@@ -1,23 +1,39 @@
 """
-Use shap to get the top feature factor for positive fraud predictions.
+Get the top feature factor for positive fraud predictions, from path/linear attributions or shap.
 """
 
 import numpy as np
-import shap
+import pandas as pd
 import warnings
 
-def top_factor_explainer(pipe):
+from financial_fraud.serving.steps.attribution import fast_attribution
+from financial_fraud.serving.steps.factor_explanations import explanation_text
+
+def top_factor_explainer(pipe, *, method: str = "fast"):
+    """method="fast" uses exact path-dependent TreeSHAP for LightGBM/XGBoost and coefficient x value for a
+    linear model, falling back to shap.TreeExplainer for anything else; method="shap" always uses shap."""
+    if method not in ("fast", "shap"):
+        raise ValueError(f"Unknown explainer method {method!r}")
     spec = pipe.named_steps["spec"]
     pre = pipe.named_steps["pre"]
     clf = pipe.named_steps["clf"]
 
     names = list(pre.get_feature_names_out())
-    explainer = shap.TreeExplainer(clf)
+    explainer = fast_attribution(pipe) if method == "fast" else None
+    if explainer is None:
+        import shap
+
+        explainer = shap.TreeExplainer(clf)
     return spec, pre, names, explainer
 
 def top_factor(spec, pre, names, explainer, X_row):
     X_row2 = spec.transform(X_row)
     X_t = pre.transform(X_row2)
+    return top_factors(explainer, names, X_t)[0]
+
+def top_factors(explainer, names, X_t) -> list[dict]:
+    """Top factor of every row of an already transformed matrix, from one shap_values call."""
+    X_t = X_t.toarray() if hasattr(X_t, "toarray") else np.asarray(X_t)
 
     with warnings.catch_warnings():
         warnings.filterwarnings(
@@ -26,16 +42,22 @@ def top_factor(spec, pre, names, explainer, X_row):
             category=UserWarning,
         )
         sv = explainer.shap_values(X_t)
-    sv_row = sv[1][0] if isinstance(sv, list) else sv[0]
-
-    i = int(np.argmax(np.abs(sv_row)))
-    row_vals = (
-        X_t[0].toarray().ravel()
-        if hasattr(X_t[0], "toarray")
-        else np.asarray(X_t[0]).ravel()
-    )
-    return {
-        "feature": names[i],
-        "value": float(row_vals[i]),
-        "contribution": float(sv_row[i]),
-    }
\ No newline at end of file
+    sv = np.asarray(sv[1] if isinstance(sv, list) else sv)
+
+    top = np.argmax(np.abs(sv), axis=1)
+    return [
+        {
+            "feature": names[i],
+            "value": float(X_t[r, i]),
+            "contribution": float(sv[r, i]),
+        }
+        for r, i in enumerate(top.tolist())
+    ]
+
+def explain_rows(explainer_bundle, rows: list[dict], X_t=None) -> list[str]:
+    """Explanation text for each feature row. X_t, the rows already through spec + pre (e.g. the
+    serving plan's matrix), skips transforming them again."""
+    spec, pre, names, explainer = explainer_bundle
+    if X_t is None:
+        X_t = pre.transform(spec.transform(pd.DataFrame(rows)))
+    return [explanation_text(f["feature"]) for f in top_factors(explainer, names, X_t)]
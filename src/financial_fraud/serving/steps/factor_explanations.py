@@ -15,3 +15,9 @@ EXPLANATION_TEXT: dict[str, str] = {
     "num__dest_amount_sum_1h": "A large total amount flowed to this recipient in the previous step.",
     "num__dest_amount_sum_24h": "The recipient accumulated a high total amount over the last 24 steps.",
 }
+
+MULTIPLE_FACTORS_TEXT = "Multiple risk signals contributed to this decision."
+
+
+def explanation_text(feature: str | None) -> str:
+    return EXPLANATION_TEXT.get(feature, MULTIPLE_FACTORS_TEXT)
@@ -0,0 +1,168 @@
+"""
+Per-stage latency timers for the serving path: log-linear (HDR-style) histograms, dict and Prometheus export.
+"""
+
+from __future__ import annotations
+
+import threading
+from time import perf_counter_ns
+from typing import Any, Mapping
+
+# Below 2 * _SUB ns every value has its own bucket; above, each power of two is split into _SUB
+# buckets, so a recorded value is known to within 1 / _SUB (3.1%).
+_SUB_BITS = 5
+_SUB = 1 << _SUB_BITS
+_LINEAR = 2 * _SUB
+_MAX_SHIFT = 36  # top bucket starts around 2**41 ns (~37 min); longer values are clamped into it
+_N_BUCKETS = _LINEAR + _MAX_SHIFT * _SUB
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Prometheus bucket bounds in seconds (1-2-5 from 10us to 10s); counts are read off the histogram.
+PROM_BOUNDS = tuple(m * 10.0 ** e for e in range(-5, 1) for m in (1, 2, 5)) + (10.0,)
+
+
+def _bucket(ns: int) -> int:
+    if ns < _LINEAR:
+        return ns if ns > 0 else 0
+    shift = ns.bit_length() - _SUB_BITS - 1
+    if shift > _MAX_SHIFT:
+        return _N_BUCKETS - 1
+    return _LINEAR + (shift - 1) * _SUB + (ns >> shift) - _SUB
+
+
+def _upper(i: int) -> int:
+    """Highest value (ns) that lands in bucket i."""
+    if i < _LINEAR:
+        return i
+    shift, m = divmod(i - _LINEAR, _SUB)
+    shift += 1
+    return ((m + _SUB + 1) << shift) - 1
+
+
+def _lower(i: int) -> int:
+    """Lowest value (ns) that lands in bucket i."""
+    return _upper(i - 1) + 1 if i > 0 else 0
+
+
+class LatencyHistogram:
+    """Counts of durations in ns; record() is O(1) and allocation-free. Not locked (see StageTimer)."""
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self.counts = [0] * _N_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int) -> None:
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def value_at(self, percentile: float) -> int:
+        """Upper bound (ns) of the bucket holding the given percentile; 0 when empty."""
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(_upper(i), self.max_ns)
+        return self.max_ns
+
+    def count_le(self, ns: float) -> int:
+        """Observations in buckets that start at or below ns, so none <= ns is left out. The bucket
+        straddling ns also brings its values just above it: they exceed ns by under 1 / _SUB."""
+        return sum(c for i, c in enumerate(self.counts) if c and _lower(i) <= ns)
+
+    def snapshot(self) -> dict[str, float]:
+        out: dict[str, float] = {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "max_ms": self.max_ns / 1e6,
+        }
+        for p in PERCENTILES:
+            out[f"p{p:g}_ms"] = self.value_at(p) / 1e6
+        return out
+
+
+class Laps:
+    """Stage durations of one request: lap(stage) charges the time since the previous lap to stage."""
+
+    __slots__ = ("t0", "t", "ns")
+
+    def __init__(self) -> None:
+        self.t0 = self.t = perf_counter_ns()
+        self.ns: dict[str, int] = {}
+
+    def lap(self, stage: str) -> None:
+        now = perf_counter_ns()
+        self.ns[stage] = self.ns.get(stage, 0) + now - self.t
+        self.t = now
+
+    def ms(self) -> dict[str, float]:
+        out = {stage: ns / 1e6 for stage, ns in self.ns.items()}
+        out["total"] = (self.t - self.t0) / 1e6
+        return out
+
+
+class StageTimer:
+    """One LatencyHistogram per stage plus "total"; safe to share across serving threads."""
+
+    def __init__(self, name: str = "serve") -> None:
+        self.name = name
+        self.stages: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, laps: Laps) -> None:
+        with self._lock:
+            for stage, ns in laps.ns.items():
+                self._hist(stage).record(ns)
+            self._hist("total").record(laps.t - laps.t0)
+
+    def _hist(self, stage: str) -> LatencyHistogram:
+        h = self.stages.get(stage)
+        if h is None:
+            h = self.stages[stage] = LatencyHistogram()
+        return h
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages = {}
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {stage: h.snapshot() for stage, h in self.stages.items()}
+
+    def to_prometheus(self, *, labels: Mapping[str, Any] | None = None) -> str:
+        """Text exposition: one histogram family, <name>_stage_seconds, labelled by stage.
+
+        Every observation <= le is in its le bucket; a bucket may also count observations up to
+        1/32 above le, which share a histogram bucket with le (see count_le).
+        """
+        metric = f"{self.name}_stage_seconds"
+        extra = "".join(f',{k}="{v}"' for k, v in (labels or {}).items())
+        lines = [
+            f"# HELP {metric} Latency of each {self.name} stage.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for stage, h in self.stages.items():
+                lbl = f'stage="{stage}"{extra}'
+                for le in PROM_BOUNDS:
+                    lines.append(f'{metric}_bucket{{{lbl},le="{le:g}"}} {h.count_le(le * 1e9)}')
+                lines.append(f'{metric}_bucket{{{lbl},le="+Inf"}} {h.count}')
+                lines.append(f"{metric}_sum{{{lbl}}} {h.total_ns / 1e9:.9f}")
+                lines.append(f"{metric}_count{{{lbl}}} {h.count}")
+        return "\n".join(lines) + "\n"
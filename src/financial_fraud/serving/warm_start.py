@@ -2,12 +2,26 @@
 Fill redis feature store by streaming last x steps from transaction log.
 """
 
+import logging
+import multiprocessing as mp
+import queue
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+from time import perf_counter
+from typing import Callable, Iterator, Literal
+
 from financial_fraud.config import REVISION, TRANSACTION_LOG, REPO_ID
 from financial_fraud.io.hf import download_dataset_hf
+from financial_fraud.stream.checkpoint import checkpoint_key, load_checkpoint
 from financial_fraud.stream.stream import TxnStream
-from financial_fraud.serving.steps.base import silver_base
-from financial_fraud.serving.steps.validate import validate_base
-from financial_fraud.redis.infra import make_entity_key
+from financial_fraud.serving.steps.base import silver_dest_columns
+from financial_fraud.serving.warm_start_bulk import load_dest_states
+from financial_fraud.redis.infra import dest_script, make_entity_key
+from financial_fraud.redis.connect import connect_redis
+
+log = logging.getLogger(__name__)
+
+WarmStartMode = Literal["replay", "pipelined", "bulk"]
+
 
 def warm_start(
     *,
@@ -15,42 +29,314 @@ def warm_start(
     cfg,
     lua_shas: dict[str, str],
     start_step: int | None = None,
+    mode: WarmStartMode = "replay",
+    parquet_path: str | None = None,
+    pipeline_depth: int = 5_000,
+    workers: int = 1,
+    progress_every: int = 50_000,
+    checkpoint: bool = False,
+    checkpoint_batch: int = 250,
+    presorted: bool = False,
 ) -> int:
-    parquet_path = download_dataset_hf(
-        repo_id=REPO_ID,
-        filename=TRANSACTION_LOG,
-        revision=REVISION,
+    """Load dest state for every transaction since start_step; returns the number applied.
+
+    mode="replay" runs advance/add per transaction and waits on each reply. mode="pipelined"
+    sends the same commands in pipelines of pipeline_depth commands. mode="bulk" computes each
+    dest's final hash in DuckDB and HSETs it; it expects the dest keys not to exist yet
+    (flushed store).
+
+    workers > 1 (replay/pipelined only) splits the log by hash of the dest id; each worker
+    process streams its own partition over its own connection, so per-key order is kept.
+    Aggregate progress is logged every progress_every transactions.
+
+    checkpoint=True (pipelined only) records the stream position in Redis and a later run over
+    the same file, start_step and partition resumes after it instead of starting over. Updates
+    are then sent in MULTI/EXECs of at most checkpoint_batch transactions (2 * checkpoint_batch
+    EVALSHAs plus the position), in place of pipeline_depth: Redis runs each one atomically and
+    every other client of the node waits for it, so the unit stays small. Replay commits every command on its own and dest_add is not idempotent, so
+    it has no position to resume from without re-applying updates.
+
+    presorted=True streams a step-ordered file as written instead of sorting it (TxnStream.presorted).
+    """
+    if parquet_path is None:
+        parquet_path = download_dataset_hf(
+            repo_id=REPO_ID,
+            filename=TRANSACTION_LOG,
+            revision=REVISION,
+        )
+
+    if mode not in ("replay", "pipelined", "bulk"):
+        raise ValueError(f"Unknown warm start mode {mode!r}. Options: ['replay', 'pipelined', 'bulk']")
+    workers = int(workers)
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if workers > 1 and mode == "bulk":
+        raise ValueError("workers > 1 applies to mode='replay' or 'pipelined'; bulk is a single DuckDB query")
+    if checkpoint and mode != "pipelined":
+        raise ValueError(
+            "checkpoint=True needs mode='pipelined': its updates and position commit in one MULTI/EXEC"
+        )
+    if checkpoint and cfg.shards:
+        raise ValueError("checkpoint=True needs a single Redis node: sharded pipelines cannot be transactional")
+
+    t0 = perf_counter()
+
+    if mode == "bulk":
+        applied = load_dest_states(r=r, cfg=cfg, parquet_path=str(parquet_path), start_step=start_step)
+    elif workers == 1:
+        progress = _ProgressLog(t0=t0, every=progress_every)
+        applied = _replay_partition(
+            r=r,
+            cfg=cfg,
+            lua_shas=lua_shas,
+            parquet_path=str(parquet_path),
+            start_step=start_step,
+            mode=mode,
+            pipeline_depth=pipeline_depth,
+            on_progress=progress.add,
+            checkpoint=checkpoint,
+            checkpoint_batch=checkpoint_batch,
+            presorted=presorted,
+        )
+    else:
+        applied = _replay_parallel(
+            cfg=cfg,
+            lua_shas=lua_shas,
+            parquet_path=str(parquet_path),
+            start_step=start_step,
+            mode=mode,
+            pipeline_depth=pipeline_depth,
+            workers=workers,
+            progress=_ProgressLog(t0=t0, every=progress_every),
+            checkpoint=checkpoint,
+            checkpoint_batch=checkpoint_batch,
+            presorted=presorted,
+        )
+
+    seconds = perf_counter() - t0
+    log.info(
+        "warm_start_done mode=%s workers=%d applied=%d seconds=%.2f tps=%.0f",
+        mode,
+        workers,
+        applied,
+        seconds,
+        applied / seconds if seconds > 0 else 0.0,
     )
+    return applied
+
+
+class _ProgressLog:
+    def __init__(self, *, t0: float, every: int) -> None:
+        self.t0 = t0
+        self.every = max(1, int(every))
+        self.applied = 0
+        self._next = self.every
+
+    def add(self, n: int) -> None:
+        self.applied += n
+        if self.applied >= self._next:
+            seconds = perf_counter() - self.t0
+            log.info(
+                "warm_start_progress applied=%d seconds=%.2f tps=%.0f",
+                self.applied,
+                seconds,
+                self.applied / seconds if seconds > 0 else 0.0,
+            )
+            self._next = (self.applied // self.every + 1) * self.every
 
+
+def _replay_partition(
+    *,
+    r,
+    cfg,
+    lua_shas: dict[str, str],
+    parquet_path: str,
+    start_step: int | None,
+    mode: WarmStartMode,
+    pipeline_depth: int,
+    partition: int | None = None,
+    n_partitions: int = 1,
+    on_progress: Callable[[int], None] | None = None,
+    report_every: int = 10_000,
+    checkpoint: bool = False,
+    checkpoint_batch: int = 250,
+    presorted: bool = False,
+) -> int:
+    # Half the depth in transactions: each one sends two commands.
+    per_batch = max(1, int(pipeline_depth) // 2)
     stream = TxnStream(
-        parquet_path=str(parquet_path),
+        parquet_path=parquet_path,
         start_step=start_step,
-        batch_size=2048,
+        # Checkpoints are taken at stream batch boundaries, so a batch is one checkpointed unit.
+        batch_size=max(1, int(checkpoint_batch)) if checkpoint else 2048,
+        partition=partition,
+        n_partitions=n_partitions,
+        presorted=presorted,
     )
 
-    sha_adv = lua_shas["dest_advance"]
-    sha_add = lua_shas["dest_add"]
+    ckpt_key = None
+    if checkpoint:
+        fresh = stream.checkpoint()
+        ckpt_key = checkpoint_key(cfg, f"warm_start:{fresh.stream_id()}:{partition or 0}/{n_partitions}")
+        saved = load_checkpoint(r, ckpt_key)
+        if saved is not None and not saved.same_stream(fresh):
+            log.warning("warm_start_stale_checkpoint key=%s saved=%s; starting fresh", ckpt_key, saved)
+        elif saved is not None:
+            stream = TxnStream.from_checkpoint(saved, batch_size=stream.batch_size, presorted=presorted)
+            log.info("warm_start_resume key=%s pos=%d last_step=%s eof=%s", ckpt_key, saved.pos, saved.last_step, saved.eof)
+
+    sha_adv = lua_shas[dest_script("dest_advance", cfg.dest_encoding)]
+    sha_add = lua_shas[dest_script("dest_add", cfg.dest_encoding)]
     N = int(cfg.dest_bucket_N)
 
     applied = 0
+    unreported = 0
 
-    while True:
-        tx = stream.next_one()
-        if tx is None:
-            break
+    def report(force: bool = False) -> None:
+        nonlocal unreported
+        if on_progress is not None and unreported and (force or unreported >= report_every):
+            on_progress(unreported)
+            unreported = 0
+
+    if mode == "replay":
+        for batch in stream.iter_batches():
+            for dest_key, step, amount in _batch_updates(batch, cfg=cfg):
+                r.evalsha(sha_adv, 1, dest_key, step, N)
+                r.evalsha(sha_add, 1, dest_key, step, str(amount), N)
+                applied += 1
+                unreported += 1
+                report()
+    else:
+        # One connection, one non-transactional pipeline: commands reach Redis in send order,
+        # so advance/add for a key keep their transaction order without waiting on replies.
+        # With checkpoints each pipeline is a MULTI/EXEC holding exactly one stream batch
+        # (at most checkpoint_batch transactions), so the recorded position is that batch's end.
+        pipe = r.pipeline(transaction=ckpt_key is not None)
+        pending = 0
+
+        def flush() -> None:
+            nonlocal pending, unreported
+            if ckpt_key is not None:
+                # EVALSHA rather than SET: on NOSCRIPT the position fails along with the updates.
+                pipe.evalsha(lua_shas["checkpoint"], 1, ckpt_key, stream.checkpoint().to_json())
+            pipe.execute()
+            unreported += pending
+            pending = 0
+
+        for batch in stream.iter_batches():
+            for dest_key, step, amount in _batch_updates(batch, cfg=cfg):
+                pipe.evalsha(sha_adv, 1, dest_key, step, N)
+                pipe.evalsha(sha_add, 1, dest_key, step, str(amount), N)
+                applied += 1
+                pending += 1
+                if ckpt_key is None and pending >= per_batch:
+                    flush()
+                    report()
+            if ckpt_key is not None and pending:
+                flush()
+                report()
+        if pending or ckpt_key is not None:
+            flush()
+
+    report(force=True)
+    return applied
+
+
+def _partition_worker(
+    cfg,
+    lua_shas: dict[str, str],
+    parquet_path: str,
+    start_step: int | None,
+    mode: WarmStartMode,
+    pipeline_depth: int,
+    partition: int,
+    n_partitions: int,
+    progress_q,
+    checkpoint: bool,
+    checkpoint_batch: int,
+    presorted: bool,
+) -> int:
+    r = connect_redis(cfg)
+    try:
+        return _replay_partition(
+            r=r,
+            cfg=cfg,
+            lua_shas=lua_shas,
+            parquet_path=parquet_path,
+            start_step=start_step,
+            mode=mode,
+            pipeline_depth=pipeline_depth,
+            partition=partition,
+            n_partitions=n_partitions,
+            on_progress=progress_q.put,
+            checkpoint=checkpoint,
+            checkpoint_batch=checkpoint_batch,
+            presorted=presorted,
+        )
+    finally:
+        r.close()
+
+
+def _replay_parallel(
+    *,
+    cfg,
+    lua_shas: dict[str, str],
+    parquet_path: str,
+    start_step: int | None,
+    mode: WarmStartMode,
+    pipeline_depth: int,
+    workers: int,
+    progress: _ProgressLog,
+    checkpoint: bool,
+    checkpoint_batch: int,
+    presorted: bool,
+) -> int:
+    # spawn: workers open their own DuckDB and Redis connections, nothing is inherited.
+    ctx = mp.get_context("spawn")
+    with ctx.Manager() as manager, ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        progress_q = manager.Queue()
+        futures = [
+            pool.submit(
+                _partition_worker,
+                cfg,
+                lua_shas,
+                parquet_path,
+                start_step,
+                mode,
+                pipeline_depth,
+                i,
+                workers,
+                progress_q,
+                checkpoint,
+                checkpoint_batch,
+                presorted,
+            )
+            for i in range(workers)
+        ]
 
-        base = silver_base(tx)
-        if not validate_base(base):
-            continue
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_EXCEPTION)
+            _drain(progress_q, progress)
+            for f in done:
+                if f.exception() is not None:
+                    for other in pending:
+                        other.cancel()
+                    raise f.exception()
 
-        step = int(base["step"])
-        amount = float(base["amount"])
-        dest_id = base["name_dest"]
-        dest_key = make_entity_key(cfg.live_prefix, "dest", dest_id)
+        _drain(progress_q, progress)
+        return sum(f.result() for f in futures)
 
-        r.evalsha(sha_adv, 1, dest_key, step, N)
-        r.evalsha(sha_add, 1, dest_key, step, str(amount), N)
 
-        applied += 1
+def _drain(progress_q, progress: _ProgressLog) -> None:
+    while True:
+        try:
+            progress.add(progress_q.get_nowait())
+        except queue.Empty:
+            return
+
 
-    return applied
\ No newline at end of file
+def _batch_updates(batch, *, cfg) -> Iterator[tuple[str, int, float]]:
+    names, steps, amounts = silver_dest_columns(batch)
+    for name_dest, step, amount in zip(names, steps, amounts):
+        yield make_entity_key(cfg.live_prefix, "dest", name_dest), step, amount
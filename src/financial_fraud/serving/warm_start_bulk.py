@@ -0,0 +1,296 @@
+"""
+Bulk warm start: group each dest's transactions by step in DuckDB, fold them into its final
+ring-buffer state in Python and load it with pipelined HSETs (SETs for the packed encoding).
+
+The loaded hashes match what replaying advance.lua/add.lua produces, field for field
+(packed strings byte for byte). Hash bucket sums are rebuilt the way Redis HINCRBYFLOAT builds them, which needs the same
+long double width as the Redis host (x86-64 Linux in practice).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterator
+
+import numpy as np
+
+from financial_fraud.config import DEST_SCHEMA_VERSION
+from financial_fraud.redis.infra import make_entity_key
+from financial_fraud.redis.reader import PACKED_HEADER, PACKED_SLOT
+from financial_fraud.stream.stream import DEST_NAME_EXPR
+
+# step is truncated like silver_base's int(); a plain cast to BIGINT would round it.
+_STEPS_SQL = f"""
+WITH base AS (
+  SELECT
+    file_row_number AS rn,
+    TRY_CAST(trunc(TRY_CAST(step AS DOUBLE)) AS BIGINT) AS step,
+    TRY_CAST(amount AS DOUBLE) AS amount,
+    NULLIF({DEST_NAME_EXPR}, '') AS name_dest
+  FROM read_parquet(?, file_row_number = true)
+  {{where}}
+),
+valid AS (
+  SELECT *
+  FROM base
+  WHERE step IS NOT NULL AND step >= 0
+    AND amount IS NOT NULL AND amount >= 0 AND isfinite(amount)
+    AND name_dest IS NOT NULL
+)
+SELECT
+  name_dest,
+  step,
+  LIST(amount ORDER BY rn) AS amounts
+FROM valid
+GROUP BY name_dest, step
+ORDER BY name_dest, step
+"""
+
+
+_PROBE_LUA = """
+redis.call("DEL", KEYS[1])
+redis.call("HSET", KEYS[1], "n", tonumber(ARGV[1]))
+local n = redis.call("HGET", KEYS[1], "n")
+for i = 2, #ARGV do
+  redis.call("HINCRBYFLOAT", KEYS[1], "s", ARGV[i])
+end
+local s = redis.call("HGET", KEYS[1], "s")
+redis.call("DEL", KEYS[1])
+return {n, s}
+"""
+
+_PROBE_INCRS = ("0.1", "0.2", "1234567.89", "0.3", "1e-7", "98765.4321")
+
+
+def redis_incrbyfloat(cur: str, incr: str) -> str:
+    """Value string HINCRBYFLOAT stores: strtold both sides, add, "%.17Lf", trim trailing zeros."""
+    v = np.longdouble(cur) + np.longdouble(incr)
+    s = np.format_float_positional(v, precision=17, unique=False, fractional=True, trim="-")
+    return "0" if s == "-0" else s
+
+
+def _lua_number_repr(x: float) -> str:
+    return repr(float(x))
+
+
+def _lua_number_g17(x: float) -> str:
+    return "%.17g" % float(x)
+
+
+def probe_lua_number_format(r, *, probe_key: str):
+    """Pick how this server stringifies Lua numbers passed to redis.call, and check HINCRBYFLOAT emulation.
+
+    Redis < 7.2 uses "%.17g", newer servers the shortest round-trip form; add.lua hands
+    HINCRBYFLOAT a Lua number, so the bulk sums depend on which one is in use.
+    """
+    n, s = r.eval(_PROBE_LUA, 1, probe_key, "0.1", *_PROBE_INCRS)
+    n = n.decode() if isinstance(n, bytes) else n
+    s = s.decode() if isinstance(s, bytes) else s
+
+    fmt = _lua_number_repr if n == "0.1" else _lua_number_g17
+    if n != fmt(0.1):
+        raise RuntimeError(f"Unrecognised Lua number format from Redis: {n!r}")
+
+    expected = "0"
+    for incr in _PROBE_INCRS:
+        expected = redis_incrbyfloat(expected, incr)
+    if s != expected:
+        raise RuntimeError(
+            f"HINCRBYFLOAT emulation mismatch (redis={s!r} local={expected!r}); "
+            "bulk warm start cannot reproduce replay sums on this host"
+        )
+    return fmt
+
+
+class DestRing:
+    """Python mirror of ring.lua: same fields and the same HINCRBYFLOAT sequence, for in-order steps.
+
+    dest_sum_win is a running HINCRBYFLOAT total, so its exact string depends on every advance
+    since the key was created; the whole history is replayed here, not just the last N steps.
+    """
+
+    ZERO: Any = "0"
+
+    def __init__(self, *, N: int, step: int, fmt=_lua_number_repr) -> None:
+        self.N = N
+        self.m = N + 1
+        self.fmt = fmt
+        self.last_seen = step
+        self.cnt = [0] * self.m
+        self.sums = [self.ZERO] * self.m
+        self.cnt_win = 0
+        self.sum_win = self.ZERO
+
+    def _incr(self, cur, incr):
+        return redis_incrbyfloat(cur, incr)
+
+    def _decr(self, cur, decr):
+        return redis_incrbyfloat(cur, _negate(decr))
+
+    def _amount(self, amount: float):
+        return self.fmt(amount)
+
+    def advance(self, step: int) -> None:
+        gap = step - self.last_seen
+        if gap <= 0:
+            return
+        if gap > self.N:
+            self.cnt = [0] * self.m
+            self.sums = [self.ZERO] * self.m
+            self.cnt_win = 0
+            self.sum_win = self.ZERO
+            self.last_seen = step
+            return
+
+        head = self.last_seen % self.m
+        delta = self.cnt[head]
+        if delta > 0:
+            self.sum_win = self._incr(self.sum_win, self.sums[head])
+        for t in range(self.last_seen - self.N, step - self.N):
+            j = t % self.m
+            c = self.cnt[j]
+            if c > 0:
+                delta -= c
+                self.sum_win = self._decr(self.sum_win, self.sums[j])
+                self.cnt[j] = 0
+                self.sums[j] = self.ZERO
+
+        self.cnt_win += delta
+        if self.cnt_win == 0:
+            self.sum_win = self.ZERO
+        self.last_seen = step
+
+    def add(self, amount: float) -> None:
+        head = self.last_seen % self.m
+        self.cnt[head] += 1
+        self.sums[head] = self._incr(self.sums[head], self._amount(amount))
+
+    def state(self) -> dict[str, str]:
+        """Hash fields in the order ring_init in ring.lua writes them."""
+        state = {
+            "dest_schema_N": str(self.N),
+            "dest_schema_v": str(DEST_SCHEMA_VERSION),
+            "dest_last_seen_step": str(self.last_seen),
+            "dest_cnt_win": str(self.cnt_win),
+            "dest_sum_win": self.sum_win,
+        }
+        for j in range(self.m):
+            state[f"dest_cnt_s{j}"] = str(self.cnt[j])
+            state[f"dest_sum_s{j}"] = self.sums[j]
+        return state
+
+
+class PackedDestRing(DestRing):
+    """Python mirror of ring_packed.lua; sums are plain doubles, as in Lua."""
+
+    ZERO: Any = 0.0
+
+    def _incr(self, cur, incr):
+        return cur + incr
+
+    def _decr(self, cur, decr):
+        return cur - decr
+
+    def _amount(self, amount: float):
+        return float(amount)
+
+    def state(self) -> bytes:
+        """The packed string ring_packed.lua stores for this state."""
+        parts = [PACKED_HEADER.pack(self.N, DEST_SCHEMA_VERSION, self.last_seen, self.cnt_win, self.sum_win)]
+        parts.extend(PACKED_SLOT.pack(c, s) for c, s in zip(self.cnt, self.sums))
+        return b"".join(parts)
+
+
+def _negate(s: str) -> str:
+    return s[1:] if s.startswith("-") else "-" + s
+
+
+def iter_dest_states(
+    parquet_path: str,
+    *,
+    N: int,
+    start_step: int | None = None,
+    fetch_size: int = 50_000,
+    fmt=_lua_number_repr,
+    encoding: str = "hash",
+) -> Iterator[tuple[str, int, dict[str, str] | bytes]]:
+    """Yield (dest_id, n_tx, state) for every dest with a valid transaction at or after start_step.
+
+    state is a hash mapping, or the packed string when encoding="packed".
+    """
+    ring_cls = PackedDestRing if encoding == "packed" else DestRing
+    where = ""
+    params: list[Any] = [parquet_path]
+    if start_step is not None:
+        where = "WHERE step >= ?"
+        params.append(start_step)
+
+    import duckdb
+
+    con = duckdb.connect(database=":memory:")
+    try:
+        cur = con.execute(_STEPS_SQL.format(where=where), params)
+
+        dest_id: str | None = None
+        ring: DestRing | None = None
+        n_tx = 0
+
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            for name_dest, step, amounts in rows:
+                step = int(step)
+                if name_dest != dest_id:
+                    if ring is not None:
+                        yield dest_id, n_tx, ring.state()
+                    dest_id, n_tx = name_dest, 0
+                    ring = ring_cls(N=N, step=step, fmt=fmt)
+                else:
+                    ring.advance(step)
+                for a in amounts:
+                    ring.add(a)
+                n_tx += len(amounts)
+
+        if ring is not None:
+            yield dest_id, n_tx, ring.state()
+    finally:
+        con.close()
+
+
+def load_dest_states(
+    *,
+    r,
+    cfg,
+    parquet_path: str,
+    start_step: int | None = None,
+    chunk_size: int = 5_000,
+) -> int:
+    """Write every dest's final state (HSET, or SET when packed) in non-transactional pipelines of
+    chunk_size keys; returns tx count."""
+    N = int(cfg.dest_bucket_N)
+    packed = cfg.dest_encoding == "packed"
+    fmt = _lua_number_repr
+    if not packed:
+        fmt = probe_lua_number_format(r, probe_key=f"{cfg.run_meta_prefix}lua_number_probe")
+
+    applied = 0
+    pending = 0
+    pipe = r.pipeline(transaction=False)
+
+    states = iter_dest_states(parquet_path, N=N, start_step=start_step, fmt=fmt, encoding=cfg.dest_encoding)
+    for dest_id, n_tx, state in states:
+        key = make_entity_key(cfg.live_prefix, "dest", dest_id)
+        if packed:
+            pipe.set(key, state)
+        else:
+            pipe.hset(key, mapping=state)
+        applied += n_tx
+        pending += 1
+        if pending >= chunk_size:
+            pipe.execute()
+            pending = 0
+
+    if pending:
+        pipe.execute()
+
+    return applied
@@ -2,9 +2,9 @@
 Compute start transaction from most recent transaction for warm start history.
 """
 
-import duckdb
-
 def compute_start_step(parquet_path: str, k: int) -> int:
+    import duckdb
+
     con = duckdb.connect()
     max_step = con.execute(
         "SELECT MAX(step) FROM read_parquet(?)",
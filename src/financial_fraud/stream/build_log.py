@@ -8,6 +8,14 @@ def local_log(rows: list[dict], one_row_df: pd.DataFrame, *, max_len: int = 200)
     if one_row_df is None or one_row_df.empty:
         return rows
     rows.append(one_row_df.iloc[0].to_dict())
-    if len(rows) > max_len:
-        rows = rows[-max_len:]
-    return rows
\ No newline at end of file
+    # Trimmed in place: explain_log_row holds on to this list.
+    del rows[:-max_len]
+    return rows
+
+
+def explain_log_row(rows: list[dict], out: dict) -> None:
+    """serve()'s on_explained hook: put a deferred explanation into the logged row of its transaction."""
+    for row in reversed(rows):
+        if row.get("tx") is out["tx"]:
+            row["explanation"] = out["explanation"]
+            return
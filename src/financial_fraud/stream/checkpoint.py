@@ -0,0 +1,58 @@
+"""
+Durable TxnStream positions.
+
+A checkpoint names the last consumed row by (step, file_row_number), which is stable under the
+stream's ORDER BY step, file_row_number, together with the parameters that define the stream.
+Checkpoints are stored as JSON strings in Redis under the run meta prefix, next to the state
+they describe, so flushing the feature store also forgets them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class StreamCheckpoint:
+    parquet_path: str
+    start_step: int | None
+    partition: int | None
+    n_partitions: int
+    pos: int
+    last_step: int | None
+    # Step and file_row_number of the last consumed row; row is None before the first row.
+    row_step: int | None = None
+    row: int | None = None
+    eof: bool = False
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), sort_keys=True)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "StreamCheckpoint":
+        return cls(**json.loads(raw))
+
+    def same_stream(self, other: "StreamCheckpoint") -> bool:
+        keys = ("parquet_path", "start_step", "partition", "n_partitions")
+        return all(getattr(self, k) == getattr(other, k) for k in keys)
+
+    def stream_id(self) -> str:
+        """Short id of the source (file and start_step), for keys that must not mix streams."""
+        raw = json.dumps([self.parquet_path, self.start_step])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def checkpoint_key(cfg, name: str) -> str:
+    return f"{cfg.run_meta_prefix}checkpoint:{name}"
+
+
+def save_checkpoint(r, key: str, checkpoint: StreamCheckpoint) -> None:
+    r.set(key, checkpoint.to_json())
+
+
+def load_checkpoint(r, key: str) -> StreamCheckpoint | None:
+    raw: Any = r.get(key)
+    return None if raw is None else StreamCheckpoint.from_json(raw)
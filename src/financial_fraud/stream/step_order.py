@@ -0,0 +1,119 @@
+"""
+Step order of a Parquet transaction log, for streaming it without a global sort.
+
+A file is in step order when its step column never decreases in file order and NULL steps, if
+any, come last. File order is then the stream order (ORDER BY step, file_row_number), so row
+groups can be read as written, and groups whose max step is below start_step skipped.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+STEP_COL = "step"
+
+
+@dataclass(frozen=True)
+class StepIndex:
+    parquet_path: str
+    # (min step, max step, rows, null steps) per row group; min/max are None for an all-NULL group.
+    row_groups: tuple[tuple[int | None, int | None, int, int], ...]
+    # True when the writer declared step sorting in the row group metadata; otherwise verified by a scan.
+    declared: bool
+
+
+def step_sorting_columns(schema: pa.Schema) -> list[pq.SortingColumn]:
+    """sorting_columns= for pq.write_table, recording that rows are in step order, NULLs last."""
+    return [pq.SortingColumn(schema.get_field_index(STEP_COL), descending=False, nulls_first=False)]
+
+
+def declares_step_order(parquet_path: str) -> bool:
+    """True when every row group carries the step_sorting_columns metadata (a footer read only)."""
+    pf = pq.ParquetFile(parquet_path)
+    return _declared(pf)
+
+
+def _declared(pf: pq.ParquetFile) -> bool:
+    md = pf.metadata
+    if pf.schema_arrow.get_field_index(STEP_COL) < 0:
+        return False
+    expected = tuple(step_sorting_columns(pf.schema_arrow))
+    return md.num_row_groups > 0 and all(
+        tuple(md.row_group(i).sorting_columns) == expected for i in range(md.num_row_groups)
+    )
+
+
+def step_index(parquet_path: str) -> StepIndex:
+    """Row-group step ranges of a file in step order; raises ValueError if it is not."""
+    st = os.stat(parquet_path)
+    return _step_index(str(parquet_path), st.st_size, st.st_mtime_ns)
+
+
+@lru_cache(maxsize=16)
+def _step_index(parquet_path: str, size: int, mtime_ns: int) -> StepIndex:
+    pf = pq.ParquetFile(parquet_path)
+    md = pf.metadata
+    col = pf.schema_arrow.get_field_index(STEP_COL)
+    if col < 0:
+        raise ValueError(f"{parquet_path} has no {STEP_COL!r} column")
+
+    declared = _declared(pf)
+
+    groups = []
+    if declared:
+        for i in range(md.num_row_groups):
+            rg = md.row_group(i)
+            stats = rg.column(col).statistics
+            if stats is None or not stats.has_null_count or (rg.num_rows > stats.null_count and not stats.has_min_max):
+                declared = False
+                break
+            has_values = rg.num_rows > stats.null_count
+            groups.append((
+                int(stats.min) if has_values else None,
+                int(stats.max) if has_values else None,
+                rg.num_rows,
+                stats.null_count,
+            ))
+
+    if not declared:
+        groups = [_scan_group(pf, i, parquet_path) for i in range(md.num_row_groups)]
+
+    _check_order(parquet_path, groups)
+    return StepIndex(parquet_path=parquet_path, row_groups=tuple(groups), declared=declared)
+
+
+def _scan_group(pf: pq.ParquetFile, i: int, parquet_path: str) -> tuple[int | None, int | None, int, int]:
+    steps = pf.read_row_group(i, columns=[STEP_COL]).column(0)
+    if not pa.types.is_integer(steps.type):
+        raise ValueError(f"{parquet_path}: step column must be an integer type, got {steps.type}")
+
+    n_values = len(steps) - steps.null_count
+    # NULLs must trail the values: the first n_values rows are exactly the non-NULL ones.
+    if steps.slice(0, n_values).null_count:
+        raise ValueError(f"{parquet_path}: row group {i} has NULL steps before non-NULL ones")
+    values = steps.slice(0, n_values).to_numpy()
+    if n_values > 1 and not bool(np.all(values[1:] >= values[:-1])):
+        raise ValueError(f"{parquet_path}: row group {i} is not in step order")
+
+    if not n_values:
+        return None, None, len(steps), steps.null_count
+    return int(values[0]), int(values[-1]), len(steps), steps.null_count
+
+
+def _check_order(parquet_path: str, groups: list[tuple[int | None, int | None, int, int]]) -> None:
+    prev_max = None
+    seen_null = False
+    for i, (lo, hi, _, nulls) in enumerate(groups):
+        if lo is not None:
+            if seen_null:
+                raise ValueError(f"{parquet_path}: row group {i} has steps after NULL steps")
+            if prev_max is not None and lo < prev_max:
+                raise ValueError(f"{parquet_path}: row group {i} starts at step {lo} below previous max {prev_max}")
+            prev_max = hi
+        seen_null = seen_null or nulls > 0
@@ -6,66 +6,174 @@ from __future__ import annotations
 
 from collections import deque
 from dataclasses import dataclass, field
-from typing import Any
+from typing import TYPE_CHECKING, Any, Iterator
 
-import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+
+if TYPE_CHECKING:
+    import duckdb
+
+from financial_fraud.stream.checkpoint import StreamCheckpoint
+from financial_fraud.stream.step_order import step_index
+
+# The characters str.strip() removes (Unicode whitespace all lies below U+3001). DuckDB's
+# one-argument trim() strips spaces only.
+_STRIP_CHARS = "".join(chr(c) for c in range(0x3001) if chr(c).isspace())
+
+# nameDest stripped as silver_base strips it, so SQL sees the same dest key as the live path.
+DEST_NAME_EXPR = f"trim(CAST(nameDest AS VARCHAR), '{_STRIP_CHARS}')"
+
+# Partition on the cleaned dest id so every transaction for one dest key lands in one partition.
+DEST_PARTITION_EXPR = f"hash({DEST_NAME_EXPR})"
+
+# Row id within the Parquet file: the tiebreak inside a step, read along with each row.
+_ROW = "file_row_number"
 
 @dataclass
 class TxnStream:
     parquet_path: str
     start_step: int | None = None
     batch_size: int = 2048
+    partition: int | None = None
+    n_partitions: int = 1
+    # The file is in step order (see step_order.py): read row groups as written, no global sort.
+    presorted: bool = False
 
     pos: int = 0
     last_step: int | None = None
 
     _con: duckdb.DuckDBPyConnection | None = field(default=None, init=False, repr=False)
     _cur: Any = field(default=None, init=False, repr=False)
+    _reader: pa.RecordBatchReader | None = field(default=None, init=False, repr=False)
     _cols: list[str] | None = field(default=None, init=False, repr=False)
+    _batch: pa.RecordBatch | None = field(default=None, init=False, repr=False)
     _buf: deque[tuple[Any, ...]] = field(default_factory=deque, init=False, repr=False)
     _eof: bool = field(default=False, init=False, repr=False)
+    _row_step: int | None = field(default=None, init=False, repr=False)
+    _row: int | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_checkpoint(
+        cls,
+        checkpoint: StreamCheckpoint,
+        *,
+        batch_size: int = 2048,
+        presorted: bool = False,
+    ) -> "TxnStream":
+        """Continue after the checkpointed row without re-reading anything before it."""
+        stream = cls(
+            parquet_path=checkpoint.parquet_path,
+            start_step=checkpoint.start_step,
+            batch_size=batch_size,
+            partition=checkpoint.partition,
+            n_partitions=checkpoint.n_partitions,
+            presorted=presorted,
+            pos=checkpoint.pos,
+            last_step=checkpoint.last_step,
+        )
+        stream._row_step = checkpoint.row_step
+        stream._row = checkpoint.row
+        stream._eof = checkpoint.eof
+        return stream
+
+    def checkpoint(self) -> StreamCheckpoint:
+        return StreamCheckpoint(
+            parquet_path=self.parquet_path,
+            start_step=self.start_step,
+            partition=self.partition,
+            n_partitions=self.n_partitions,
+            pos=self.pos,
+            last_step=self.last_step,
+            row_step=self._row_step,
+            row=self._row,
+            eof=self._eof and not self._buf,
+        )
 
     def _open(self) -> None:
         if self._cur is not None:
             return
 
+        if self.presorted:
+            step_index(self.parquet_path)  # raises ValueError unless the file is in step order
+
+        import duckdb  # only once a stream is read; importing the serving path should not load it
+
         self._con = duckdb.connect(database=":memory:")
 
-        where = ""
+        conds: list[str] = []
         params: list[Any] = [self.parquet_path]
         if self.start_step is not None:
-            where = "WHERE step >= ?"
+            conds.append("step >= ?")
             params.append(self.start_step)
+        if self.partition is not None:
+            conds.append(f"{DEST_PARTITION_EXPR} % ? = ?")
+            params.extend([self.n_partitions, self.partition])
+        if self._row is not None and self._row_step is None:
+            conds.append(f"step IS NULL AND {_ROW} > ?")
+            params.append(self._row)
+        elif self._row is not None:
+            # Rows after (row_step, row) in stream order (NULL steps sort last). The plain step
+            # bound is pushed into the Parquet scan, which skips row groups by their min/max step.
+            conds.append("(step >= ? OR step IS NULL)")
+            conds.append(f"(step > ? OR step IS NULL OR (step = ? AND {_ROW} > ?))")
+            params.extend([self._row_step, self._row_step, self._row_step, self._row])
+        where = f"WHERE {' AND '.join(conds)}" if conds else ""
+        if self.presorted:
+            # File order is stream order; DuckDB keeps it for a filtered scan and prunes
+            # row groups below the step bound on their min/max statistics.
+            self._con.execute("SET preserve_insertion_order = true")
+            order = ""
+        else:
+            order = f"ORDER BY step, {_ROW}"
 
         q = f"""
         SELECT
           step, type, amount,
           nameOrig, nameDest,
           oldbalanceOrg, newbalanceOrig,
-          oldbalanceDest, newbalanceDest
-        FROM read_parquet(?)
+          oldbalanceDest, newbalanceDest,
+          {_ROW}
+        FROM read_parquet(?, file_row_number = true)
         {where}
-        ORDER BY step
+        {order}
         """
 
         self._cur = self._con.execute(q, params)
-        self._cols = [c[0] for c in self._cur.description]
+        self._reader = self._cur.fetch_record_batch(self.batch_size)
+        self._cols = [c for c in self._reader.schema.names if c != _ROW]
+
+    def _read_batch(self) -> pa.RecordBatch | None:
+        while True:
+            try:
+                batch = self._reader.read_next_batch()
+            except StopIteration:
+                self._eof = True
+                return None
+            if batch.num_rows:
+                return batch
 
     def cursor(self) -> dict[str, Any]:
-        return {"pos": self.pos, "last_step": self.last_step, "start_step": self.start_step}
+        return {
+            "pos": self.pos,
+            "last_step": self.last_step,
+            "start_step": self.start_step,
+            "partition": self.partition,
+            "n_partitions": self.n_partitions,
+        }
 
     def next_one(self) -> dict[str, Any] | None:
-        if self._eof:
+        if self._eof and not self._buf:
             return None
 
         self._open()
 
         if not self._buf:
-            rows = self._cur.fetchmany(self.batch_size)
-            if not rows:
-                self._eof = True
+            batch = self._read_batch()
+            if batch is None:
                 return None
-            self._buf.extend(rows)
+            self._batch = batch
+            self._buf.extend(zip(*(col.to_pylist() for col in batch.columns)))
 
         row = self._buf.popleft()
         tx = dict(zip(self._cols or [], row))
@@ -74,15 +182,54 @@ class TxnStream:
         step_val = tx.get("step")
         if step_val is not None:
             self.last_step = int(step_val)
+        self._row_step = step_val
+        self._row = row[-1]
 
         return tx
 
+    def iter_batches(self) -> Iterator[pa.RecordBatch]:
+        """Yield the remaining transactions as Arrow RecordBatches (up to batch_size rows each).
+
+        Rows already buffered by next_one() come first, as a zero-copy slice of their batch.
+        pos and last_step advance per batch; next_one() and iter_batches() can be mixed.
+        """
+        if self._eof and not self._buf:
+            return
+        self._open()
+
+        if self._buf:
+            batch = self._batch.slice(self._batch.num_rows - len(self._buf))
+            self._buf.clear()
+            self._advance(batch)
+            yield batch.select(self._cols)
+
+        while not self._eof:
+            batch = self._read_batch()
+            if batch is None:
+                return
+            self._batch = batch
+            self._advance(batch)
+            yield batch.select(self._cols)
+
+    def _advance(self, batch: pa.RecordBatch) -> None:
+        self.pos += batch.num_rows
+        # Rows are in step order with NULL steps last, so the max is the last non-null step.
+        step_val = pc.max(batch.column("step")).as_py()
+        if step_val is not None:
+            self.last_step = int(step_val)
+        self._row_step = batch.column("step")[-1].as_py()
+        self._row = batch.column(_ROW)[-1].as_py()
+
     def reset(self) -> None:
         self.pos = 0
         self.last_step = None
+        self._row_step = None
+        self._row = None
         self._buf.clear()
+        self._batch = None
         self._eof = False
         self._cols = None
+        self._reader = None
         self._cur = None
         if self._con is not None:
             try: